@@ -13,14 +13,10 @@ It also handles application-level error logging and ensures a smooth user experi
 
 import logging
 import os
-import time
 from PyQt5.QtWidgets import QApplication, QSplashScreen
 from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import Qt
-from modules.ui import MidiGeneratorApp
+from PyQt5.QtCore import Qt, QTimer
 from logging.handlers import RotatingFileHandler
-import pygame 
-from pygame import mixer
 
 # Ensure the logs directory exists
 # This creates a directory named "logs" if it doesn't already exist
@@ -46,13 +42,13 @@ logging.basicConfig(
     format="%(asctime)s - %(levelname)s - %(message)s"
 )
 
-# Initialize pygame.mixer
-try:
-    mixer.init()
-    logging.info("Pygame mixer initialized successfully.")
-except Exception as e:
-    logging.error(f"Failed to initialize pygame mixer: {e}")
-    raise
+# The pygame mixer is initialised by the first preview (see modules.ui.get_mixer), so the
+# window opens without loading the audio stack
+
+# Set by scripts/benchmark_startup.py: quit as soon as the main window is shown
+EXIT_AFTER_STARTUP = os.environ.get("MIDI_GENERATOR_EXIT_AFTER_STARTUP") == "1"
+# Set to 1 to reload the files in config/ whenever they change, without restarting the application
+WATCH_CONFIG = os.environ.get("MIDI_GENERATOR_WATCH_CONFIG") == "1"
 
 # Main entry point of the application
 if __name__ == "__main__":
@@ -80,13 +76,18 @@ if __name__ == "__main__":
         splash.show()
         app.processEvents()  # Ensure the splash screen is displayed immediately
 
-        # Simulate loading time (e.g., for initializing resources)
-        time.sleep(2)
+        # Import the GUI only now, so the splash screen appears before the heavy modules load
+        from modules.ui import MidiGeneratorApp
+        if WATCH_CONFIG:
+            from modules.config_registry import get_registry
+            get_registry().watch()
 
         # Initialize and display the main application window
         window = MidiGeneratorApp()
         window.show()
         splash.finish(window)  # Close the splash screen once the main window is ready
+        if EXIT_AFTER_STARTUP:
+            QTimer.singleShot(0, app.quit)
 
         # Start the application's event loop
         app.exec_()
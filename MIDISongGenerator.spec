@@ -0,0 +1,70 @@
+# -*- mode: python ; coding: utf-8 -*-
+'''
+PyInstaller build configuration for MIDI Song Generator Application
+
+Build with:
+    pyinstaller MIDISongGenerator.spec
+
+The app is built in onedir mode (dist/MIDISongGenerator/), so nothing has to be unpacked to a
+temporary directory at every launch. Qt modules and libraries the app does not use are
+excluded to keep the bundle small, and UPX is off because decompressing every DLL at start-up
+costs more than the disk it saves. pygame is only imported when the first preview starts (see
+modules.ui.get_mixer). Measure the result with scripts/benchmark_startup.py.
+
+'''
+
+import os
+
+# Qt modules that the GUI never imports (it only uses QtCore, QtGui and QtWidgets)
+UNUSED_QT_MODULES = [
+    "PyQt5.QtBluetooth", "PyQt5.QtDBus", "PyQt5.QtDesigner", "PyQt5.QtHelp", "PyQt5.QtLocation",
+    "PyQt5.QtMultimedia", "PyQt5.QtMultimediaWidgets", "PyQt5.QtNetwork", "PyQt5.QtNfc",
+    "PyQt5.QtOpenGL", "PyQt5.QtPositioning", "PyQt5.QtPrintSupport", "PyQt5.QtQml", "PyQt5.QtQuick",
+    "PyQt5.QtQuickWidgets", "PyQt5.QtRemoteObjects", "PyQt5.QtSensors", "PyQt5.QtSerialPort",
+    "PyQt5.QtSql", "PyQt5.QtSvg", "PyQt5.QtTest", "PyQt5.QtTextToSpeech", "PyQt5.QtWebChannel",
+    "PyQt5.QtWebEngine", "PyQt5.QtWebEngineCore", "PyQt5.QtWebEngineWidgets", "PyQt5.QtWebSockets",
+    "PyQt5.QtXml", "PyQt5.QtXmlPatterns",
+]
+
+# Other packages pulled in by hooks or optional imports that the app does not need
+UNUSED_PACKAGES = ["tkinter", "numpy", "unittest", "pydoc", "doctest", "xmlrpc", "lib2to3"]
+
+datas = [("config", "config")]
+if os.path.isdir("resources"):
+    datas.append(("resources", "resources"))
+
+a = Analysis(
+    ["MIDISongGenerator.py"],
+    pathex=[],
+    binaries=[],
+    datas=datas,
+    hiddenimports=["pygame.mixer"],  # Imported lazily by modules.ui
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=UNUSED_QT_MODULES + UNUSED_PACKAGES,
+    noarchive=False,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,  # onedir: binaries are collected next to the executable
+    name="MIDISongGenerator",
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=False,
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    name="MIDISongGenerator",
+)
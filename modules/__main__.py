@@ -0,0 +1,9 @@
+'''
+Entry point for "python -m modules": the headless command-line interface (see modules.cli).
+
+'''
+
+import sys
+from modules.cli import main
+
+sys.exit(main())
@@ -0,0 +1,99 @@
+'''
+Arrangement Module for MIDI Song Generator Application
+
+This module decides which parts play in each section of a song. It includes functions for:-
+                - looking up the roles a genre plays in a section (SECTION_ARRANGEMENTS, GENRE_ARRANGEMENTS)
+                - planning an activity mask for every section of a song
+                - filtering a section's composed parts through its mask
+
+Every part is still composed for every section; the arrangement only filters the composed
+streams when the song is written (or fingerprinted). Sparse intros, drum-only breaks and full
+choruses therefore cost nothing extra, and the same composition can be written arranged or
+with every track playing throughout.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.config_registry import get_config
+from functools import lru_cache
+import logging
+
+ARRANGEMENT_ROLES = ("melody", "harmony", "rhythm", "bass", "percussion", "countermelody")
+
+# 1. Section Roles
+def get_section_roles(genre, section_name, config=None):
+    """
+    Return the roles a genre plays in a section.
+
+    Args:
+        genre (str): The musical genre.
+        section_name (str): The section name (matched case-insensitively).
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
+
+    Returns:
+        frozenset: The active roles, or None if every track plays.
+    """
+    return _section_roles(genre, section_name.lower(), config or get_config())
+
+@lru_cache(maxsize=256)
+def _section_roles(genre, section_key, config):
+    genre_arrangements = config.genre_arrangements.get(genre, {})
+    roles = genre_arrangements.get(section_key, config.section_arrangements.get(section_key))
+    if roles is None:
+        return None
+    unknown = sorted(set(roles) - set(ARRANGEMENT_ROLES))
+    if unknown:
+        raise ValueError(f"Arrangement of '{section_key}' for '{genre}' has unknown roles: {unknown}. "
+                         f"Valid roles are: {list(ARRANGEMENT_ROLES)}")
+    return frozenset(roles)
+
+# 2. Plan Arrangement
+def plan_arrangement(genre, section_names, roles, config=None):
+    """
+    Plan the activity mask of every section.
+
+    A section whose arranged roles have no track in this song (e.g. a drum-only break in a
+    song without percussion) keeps every track, so no section falls silent.
+
+    Args:
+        genre (str): The musical genre.
+        section_names (list): The section names, in song order.
+        roles (iterable): The roles that have tracks in this song.
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
+
+    Returns:
+        list: One frozenset of active roles per section.
+    """
+    config = config or get_config()
+    available = frozenset(roles)
+    masks = []
+    for section_name in section_names:
+        section_roles = get_section_roles(genre, section_name, config)
+        mask = available if section_roles is None else section_roles & available
+        if not mask:
+            logging.debug(f"No track plays the arrangement of '{section_name}'; using every track.")
+            mask = available
+        masks.append(mask)
+    return masks
+
+# 3. Apply Arrangement
+def apply_arrangement(section_streams, mask):
+    """
+    Keep the parts of a section whose role is active.
+
+    Args:
+        section_streams (list): The section's (parts, NoteStream) pairs.
+        mask (frozenset): The active roles, or None to keep every part.
+
+    Returns:
+        list: The active (parts, NoteStream) pairs.
+    """
+    if mask is None:
+        return section_streams
+    return [(parts, stream) for parts, stream in section_streams if parts[0].role in mask]
@@ -0,0 +1,283 @@
+'''
+Batch Render Module for MIDI Song Generator Application
+
+This module renders many songs in parallel using a process pool. It includes functions for:-
+                - rendering a song spec to MIDI bytes inside a worker process
+                - handing the bytes back through multiprocessing.shared_memory
+                - writing the results to disk straight from the shared segments
+
+Workers only return a small handle (segment name and size) instead of pickling the
+encoded MIDI data back to the parent, and the parent writes each segment's buffer
+without copying it.
+
+With a FingerprintIndex (see modules.fingerprint), each worker fingerprints the song it
+has composed; near-duplicates are regenerated with a new seed or dropped, and a song close
+to one indexed before the batch started is dropped before it is encoded.
+
+Very large batches can be written to one song archive (see modules.song_archive) instead
+of one file per song, which saves an open, write and close per song.
+
+A song spec is a dictionary of create_midi keyword arguments, including "file_name".
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.midi_generator import compose_song, encode_song
+from modules.fingerprint import DEFAULT_MAX_DISTANCE, FingerprintIndex, get_song_fingerprint
+from modules.note_stream import DEFAULT_PPQ
+from modules.song_archive import ArchiveWriter
+from modules.config_registry import get_registry
+from modules.metrics import drain_metrics, enable_metrics, increment, merge_metrics, metrics_enabled, time_stage
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from multiprocessing import resource_tracker, shared_memory
+import random
+import logging
+
+# Handle returned by a worker: where the song should go, which segment holds its bytes (None
+# if the song was not encoded), the metrics the worker recorded for it (see modules.metrics)
+# and the song's fingerprint when deduplicating
+SharedResult = namedtuple("SharedResult", ["file_name", "shm_name", "size", "metrics", "fingerprint"])
+
+MAX_PENDING_PER_WORKER = 4  # Bound on queued specs, so huge batches are not submitted all at once
+DEDUPE_ATTEMPTS = 3  # Times a near-duplicate song is regenerated before it is dropped
+
+_known_fingerprints = None  # Worker side: the fingerprints indexed when the pool started
+_reload_config = False  # Worker side: follow configuration changes, as the parent's watcher does
+
+# 1. Worker Setup
+def _init_worker(collect_metrics, reload_config, fingerprints=None, max_distance=DEFAULT_MAX_DISTANCE):
+    """Enable metrics and configuration reloads in a worker if the parent has them, and load the index snapshot."""
+    global _known_fingerprints, _reload_config
+    if collect_metrics:
+        enable_metrics()
+    _reload_config = reload_config
+    if fingerprints is not None:
+        _known_fingerprints = FingerprintIndex(max_distance=max_distance)
+        for fingerprint in fingerprints:
+            _known_fingerprints.add(fingerprint)
+
+# 2. Render Into Shared Memory (worker side)
+def render_to_shared_memory(spec, dedupe=False):
+    """
+    Render one song spec and store the encoded MIDI bytes in a new shared memory segment.
+
+    When deduplicating, the composed song is fingerprinted before it is encoded; a
+    near-duplicate of a song indexed before the batch started is not encoded at all.
+
+    Args:
+        spec (dict): create_midi keyword arguments, including "file_name".
+        dedupe (bool): Fingerprint the song.
+
+    Returns:
+        SharedResult: Handle to the segment holding the encoded song.
+    """
+    if _reload_config:
+        get_registry().reload()  # Only stats the files unless they changed
+    options = dict(spec)
+    file_name = options.pop("file_name")
+    ppq = options.pop("ppq", DEFAULT_PPQ)
+    song = compose_song(**options)
+    fingerprint = None
+    if dedupe:
+        fingerprint = get_song_fingerprint(song)
+        if _known_fingerprints is not None and _known_fingerprints.find(fingerprint) is not None:
+            return SharedResult(file_name, None, 0, drain_metrics(), fingerprint)
+    data = encode_song(song, ppq)
+
+    segment = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+    segment.buf[:len(data)] = data
+    segment.close()
+
+    # The parent attaches to and unlinks the segment, so this worker must not clean it up on exit
+    if os.name == "posix":
+        resource_tracker.unregister(segment._name, "shared_memory")
+    return SharedResult(file_name, segment.name, len(data), drain_metrics(), fingerprint)
+
+# 3. Release Shared Memory (parent side)
+def release_shared_result(result):
+    """
+    Free the shared memory segment behind a result without reading it.
+
+    Args:
+        result (SharedResult): The handle returned by a worker.
+    """
+    if result.shm_name is None:
+        return
+    segment = shared_memory.SharedMemory(name=result.shm_name)
+    segment.close()
+    segment.unlink()
+
+# 4. Iterate Batch Results
+def iter_batch_results(specs, processes=None, dedupe_index=None, max_attempts=DEDUPE_ATTEMPTS, accepted=None):
+    """
+    Render song specs in a process pool and yield their encoded bytes in completion order.
+
+    Each buffer is a zero-copy view of a shared memory segment and is only valid until
+    the generator is resumed; the segment is then closed and unlinked.
+
+    With a dedupe index, every spec is given a seed (so the archived spec reproduces the
+    song) and each worker fingerprints the song it composes. A song close to one indexed
+    before the batch started is not encoded; one close to a song accepted during the batch
+    is caught when its result arrives. A near-duplicate is retried with a new seed up to
+    max_attempts times in all, then dropped.
+
+    Accepted fingerprints are only added to the index in memory; the caller saves them to
+    the index file once their songs have been written, so a song that fails to render (or a
+    run that is interrupted) does not leave a fingerprint behind for a song that does not exist.
+
+    Args:
+        specs (iterable): Song specs; consumed lazily.
+        processes (int): Number of worker processes (defaults to the CPU count).
+        dedupe_index (FingerprintIndex): Optional index; near-duplicate songs are regenerated or skipped.
+        max_attempts (int): Compositions tried per spec when deduplicating.
+        accepted (dict): Receives file name -> fingerprint for every song yielded when deduplicating.
+
+    Yields:
+        tuple: (spec, memoryview) for every song that rendered successfully.
+    """
+    processes = processes or os.cpu_count() or 1
+    max_pending = processes * MAX_PENDING_PER_WORKER
+    dedupe = dedupe_index is not None
+    if dedupe:
+        specs = (dict(spec, seed=spec.get("seed", random.getrandbits(32))) for spec in specs)
+        initargs = (metrics_enabled(), get_registry().watching, list(dedupe_index), dedupe_index.max_distance)
+    else:
+        initargs = (metrics_enabled(), get_registry().watching)
+    pending = {}  # future -> (spec, attempt)
+    retries = []  # (spec, attempt) pairs to compose again with a new seed
+    spec_iter = iter(specs)
+    exhausted = False
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker, initargs=initargs) as executor:
+        try:
+            while pending or retries or not exhausted:
+                # Keep the pool busy without materialising the whole batch
+                while len(pending) < max_pending:
+                    if retries:
+                        spec, attempt = retries.pop()
+                    elif exhausted:
+                        break
+                    else:
+                        try:
+                            spec, attempt = next(spec_iter), 1
+                        except StopIteration:
+                            exhausted = True
+                            break
+                    pending[executor.submit(render_to_shared_memory, spec, dedupe)] = spec, attempt
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    spec, attempt = pending.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logging.error(f"Failed to render '{spec.get('file_name')}': {e}")
+                        increment("render_failures_total")
+                        continue
+
+                    merge_metrics(result.metrics)
+                    if dedupe:
+                        if not dedupe_index.add_if_new(result.fingerprint, persist=False):
+                            release_shared_result(result)
+                            increment("duplicates_total")
+                            if attempt < max_attempts:
+                                retries.append((dict(spec, seed=random.getrandbits(32)), attempt + 1))
+                            else:
+                                logging.warning(f"Dropping '{spec.get('file_name')}': still a near-duplicate "
+                                                f"after {max_attempts} attempts.")
+                            continue
+                        if accepted is not None:
+                            accepted[spec["file_name"]] = result.fingerprint
+
+                    segment = shared_memory.SharedMemory(name=result.shm_name)
+                    view = segment.buf[:result.size]
+                    try:
+                        yield spec, view
+                    finally:
+                        view.release()
+                        segment.close()
+                        segment.unlink()
+        finally:
+            # Free the segments of songs that were still in flight when iteration stopped
+            for future in pending:
+                if not future.cancel() and future.exception() is None:
+                    release_shared_result(future.result())
+
+# 5. Render Batch To Files
+def render_batch(specs, output_dir=None, processes=None, dedupe_index=None):
+    """
+    Render song specs in parallel and write each one to its "file_name".
+
+    Args:
+        specs (iterable): Song specs; consumed lazily.
+        output_dir (str): Optional directory that relative file names are resolved against.
+        processes (int): Number of worker processes (defaults to the CPU count).
+        dedupe_index (FingerprintIndex): Optional index; near-duplicate songs are regenerated or skipped.
+
+    Returns:
+        list: Paths of the files that were written.
+    """
+    accepted = {}  # file name -> fingerprint, saved to the index once the file is written
+    written = []
+    for spec, view in iter_batch_results(specs, processes, dedupe_index, accepted=accepted):
+        file_name = spec["file_name"]
+        if output_dir:
+            file_name = os.path.join(output_dir, file_name)
+        os.makedirs(os.path.dirname(file_name) or ".", exist_ok=True)
+        with time_stage("store"), open(file_name, "wb") as output_file:
+            output_file.write(view)
+        if spec["file_name"] in accepted:
+            dedupe_index.save(accepted.pop(spec["file_name"]))
+        written.append(file_name)
+
+    logging.info(f"Batch render wrote {len(written)} MIDI files.")
+    return written
+
+# 6. Render Batch To Archive
+def render_batch_archive(specs, archive_file, processes=None, dedupe_index=None, append=True):
+    """
+    Render song specs in parallel and append them, with their specs, to one song archive.
+
+    Each song's metadata records its encoded size and, when deduplicating, its fingerprint
+    (as 16 hex digits).
+
+    Args:
+        specs (iterable): Song specs; consumed lazily.
+        archive_file (str): The archive file (see modules.song_archive).
+        processes (int): Number of worker processes (defaults to the CPU count).
+        dedupe_index (FingerprintIndex): Optional index; near-duplicate songs are regenerated or skipped.
+        append (bool): Keep the songs already in the archive.
+
+    Returns:
+        list: Names of the songs that were archived.
+    """
+    accepted = {}  # file name -> fingerprint, saved to the index once the archive is closed
+    archived = []
+    try:
+        with ArchiveWriter(archive_file, append) as archive:
+            for spec, view in iter_batch_results(specs, processes, dedupe_index, accepted=accepted):
+                options = dict(spec)
+                file_name = options.pop("file_name")
+                fingerprint = accepted.get(file_name)
+                metadata = {"size": len(view),
+                            "fingerprint": None if fingerprint is None else f"{fingerprint:016x}"}
+                with time_stage("store"):
+                    archive.add(file_name, view, options, metadata)
+                archived.append(file_name)
+    finally:
+        # The archive has been closed (its records flushed) whether or not the batch finished
+        for file_name in archived:
+            if file_name in accepted:
+                dedupe_index.save(accepted.pop(file_name))
+
+    logging.info(f"Batch render archived {len(archived)} songs in {archive_file}.")
+    return archived
@@ -0,0 +1,236 @@
+'''
+Command-Line Module for MIDI Song Generator Application
+
+This module generates songs without the GUI. It includes functions for:-
+                - building the argument parser, with a flag for every create_midi option
+                - reading a song spec from a file or stdin
+                - writing the MIDI bytes to a file or stdout
+                - rendering a JSON-Lines manifest in parallel
+                - exporting metrics of long runs (see modules.metrics)
+                - reloading the configuration files during long runs when they change
+
+Run it with "python -m modules". Only the generator modules are imported; PyQt5 and
+pygame are never loaded, so it starts quickly and needs no display or audio device.
+
+Examples:
+    python -m modules --genre Jazz --bpm 140 -o jazz.mid
+    python -m modules --genre Rock --section Intro:4 --section Verse:16 --section Bridge:8:7/8 > rock.mid
+    echo '{"genre": "Folk", "key": "D"}' | python -m modules --spec - | aplaymidi -
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.midi_generator import render_midi_bytes
+from modules.song_spec import BOOLEAN_OPTIONS, parse_song_spec, validate_song_spec, render_manifest
+from modules.config_registry import WATCH_INTERVAL, get_config, get_registry
+from modules.metrics import DEFAULT_DUMP_INTERVAL, MetricsDump, start_metrics_server
+import argparse
+import logging
+
+SPEC_FORMATS = {".json": "json", ".toml": "toml", ".yaml": "yaml", ".yml": "yaml"}
+
+# 1. Parse Section Argument
+def parse_section(value):
+    """
+    Parse a --section value of the form NAME:BARS or NAME:BARS:TIME_SIGNATURE.
+
+    Args:
+        value (str): The argument value.
+
+    Returns:
+        list: [name, bars] or [name, bars, time_signature], as accepted by song specs.
+    """
+    parts = value.split(":")
+    if len(parts) not in (2, 3) or not parts[0]:
+        raise argparse.ArgumentTypeError(f"expected NAME:BARS or NAME:BARS:TIME_SIGNATURE, got {value!r}")
+    try:
+        parts[1] = int(parts[1])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"bars must be a whole number, got {parts[1]!r}")
+    return parts
+
+# 2. Build Argument Parser
+def build_parser():
+    """
+    Build the command-line argument parser.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m modules",
+        description="Generate a MIDI song without the GUI. Missing settings come from the genre defaults.")
+    parser.add_argument("--spec", help="Song spec file (.json, .toml, .yaml), or '-' to read it from stdin. "
+                                       "Other flags override its fields.")
+    parser.add_argument("--spec-format", choices=sorted(set(SPEC_FORMATS.values())),
+                        help="Format of the spec (default: from the file extension, json for stdin).")
+    parser.add_argument("--manifest", help="JSON-Lines manifest of song specs to render in parallel.")
+    parser.add_argument("--output-dir", help="Directory for the files of a manifest.")
+    parser.add_argument("--archive", metavar="ARCHIVE_FILE",
+                        help="Append the songs of a manifest to one song archive instead of writing files.")
+    parser.add_argument("--processes", type=int, help="Worker processes for a manifest (default: CPU count).")
+    parser.add_argument("--dedupe", nargs="?", const="", metavar="INDEX_FILE",
+                        help="Regenerate or skip near-duplicate songs of a manifest; fingerprints are kept "
+                             "in INDEX_FILE across runs if given.")
+    parser.add_argument("-o", "--output", default="-", help="Output MIDI file, or '-' for stdout (default).")
+
+    song = parser.add_argument_group("song settings")
+    song.add_argument("--genre", help="Musical genre.")
+    song.add_argument("--bpm", type=float, help="Tempo in beats per minute.")
+    song.add_argument("--time-signature", help="Time signature, e.g. 4/4 or 6/8.")
+    song.add_argument("--scale", help="Scale, e.g. Major or Dorian.")
+    song.add_argument("--key", help="Key, e.g. C or F#.")
+    song.add_argument("--instrument", dest="instruments", action="append",
+                      help="Instrument name; repeat for several instruments.")
+    song.add_argument("--section", dest="sections", action="append", type=parse_section,
+                      help="Section as NAME:BARS or NAME:BARS:TIME_SIGNATURE; repeat in song order.")
+
+    options = parser.add_argument_group("generation options")
+    for option in BOOLEAN_OPTIONS:
+        flag = "--" + option[len("enable_"):].replace("_", "-")
+        options.add_argument(flag, dest=option, action=argparse.BooleanOptionalAction,
+                             help=f"Turn {option} on or off.")
+    options.add_argument("--melody-model-dir", help="Directory of trained Markov melody tables.")
+    options.add_argument("--tempo-resolution", type=float, help="Quarter notes between tempo ramp samples.")
+    options.add_argument("--seed", type=int, help="Random seed, for reproducible songs.")
+    options.add_argument("--ppq", type=int, help="Resolution in ticks per quarter note (default 960).")
+
+    parser.add_argument("--metrics-port", type=int, metavar="PORT",
+                        help="Serve Prometheus metrics at http://127.0.0.1:PORT/metrics while running.")
+    parser.add_argument("--metrics-json", metavar="FILE", help="Dump metrics as JSON to FILE while running.")
+    parser.add_argument("--metrics-interval", type=float, default=DEFAULT_DUMP_INTERVAL,
+                        help=f"Seconds between JSON metrics dumps (default {DEFAULT_DUMP_INTERVAL:g}).")
+    parser.add_argument("--watch-config", nargs="?", type=float, const=WATCH_INTERVAL, metavar="SECONDS",
+                        help="Reload the configuration files when they change while a manifest renders "
+                             f"(checked every SECONDS, default {WATCH_INTERVAL:g}).")
+    parser.add_argument("--list", choices=["genres", "keys", "scales", "instruments"],
+                        help="Print the available values and exit.")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log progress to stderr.")
+    return parser
+
+# 3. Read Spec
+def read_spec(args):
+    """
+    Load the raw song spec named by --spec and apply the command-line overrides.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        dict: The raw (unvalidated) spec.
+    """
+    raw_spec = {}
+    if args.spec:
+        if args.spec == "-":
+            raw_spec = parse_song_spec(sys.stdin.read(), args.spec_format or "json")
+        else:
+            file_format = args.spec_format or SPEC_FORMATS.get(os.path.splitext(args.spec)[1].lower())
+            if file_format is None:
+                raise ValueError(f"Unsupported song spec file: {args.spec}")
+            with open(args.spec, "r", encoding="utf-8") as spec_file:
+                raw_spec = parse_song_spec(spec_file.read(), file_format)
+        if not isinstance(raw_spec, dict):
+            raise ValueError("The song spec must be a mapping.")
+
+    for field in ("genre", "bpm", "time_signature", "scale", "key", "instruments", "sections"):
+        value = getattr(args, field)
+        if value is not None:
+            raw_spec[field] = value
+
+    options = dict(raw_spec.get("options") or {})
+    for option in BOOLEAN_OPTIONS + ("melody_model_dir", "tempo_resolution", "seed", "ppq"):
+        value = getattr(args, option)
+        if value is not None:
+            options[option] = value
+    if options:
+        raw_spec["options"] = options
+    return raw_spec
+
+# 4. Main
+def main(argv=None):
+    """
+    Run the command-line interface.
+
+    Args:
+        argv (list): Arguments (defaults to sys.argv[1:]).
+
+    Returns:
+        int: The process exit code.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format="%(levelname)s - %(message)s", stream=sys.stderr)
+
+    if args.list:
+        config = get_config()
+        values = {"genres": config.genre_defaults, "keys": config.keys,
+                  "scales": config.scales, "instruments": config.instrument_map}[args.list]
+        print("\n".join(values))
+        return 0
+
+    # Metrics are only collected when they are exported somewhere
+    metrics_server = start_metrics_server(args.metrics_port) if args.metrics_port is not None else None
+    metrics_dump = MetricsDump(args.metrics_json, args.metrics_interval) if args.metrics_json else None
+    if args.watch_config is not None:
+        get_registry().watch(args.watch_config)
+    try:
+        return run(args)
+    finally:
+        if args.watch_config is not None:
+            get_registry().stop_watching()
+        if metrics_dump is not None:
+            metrics_dump.stop()
+        if metrics_server is not None:
+            metrics_server.shutdown()
+
+# 5. Run
+def run(args):
+    """
+    Render the song or manifest described by the parsed arguments.
+
+    Args:
+        args (argparse.Namespace): The parsed arguments.
+
+    Returns:
+        int: The process exit code.
+    """
+    try:
+        if args.manifest:
+            dedupe_index = None
+            if args.dedupe is not None:
+                from modules.fingerprint import FingerprintIndex
+                dedupe_index = FingerprintIndex(args.dedupe or None)
+            try:
+                written = render_manifest(args.manifest, args.output_dir, args.processes, dedupe_index,
+                                          args.archive)
+            finally:
+                if dedupe_index is not None:
+                    dedupe_index.close()
+            logging.info(f"Wrote {len(written)} {'archived songs' if args.archive else 'files'}.")
+            return 0
+
+        spec = validate_song_spec(read_spec(args))
+        spec.pop("file_name")
+        data = render_midi_bytes(**spec)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+
+    if args.output == "-":
+        sys.stdout.buffer.write(data)
+        sys.stdout.buffer.flush()
+    else:
+        with open(args.output, "wb") as output_file:
+            output_file.write(data)
+        logging.info(f"MIDI file written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,337 @@
+'''
+Configuration Registry Module for MIDI Song Generator Application
+
+This module serves the application's musical configuration as immutable snapshots.
+It includes functions for:-
+                - merging the built-in tables of modules.configuration with JSON files in config/
+                - freezing the result into a hashable snapshot with a version hash
+                - hot reloading the snapshot when the files change on disk
+                - notifying caches and worker pools when the version changes
+
+Each file in config/ overrides the table with the same name, e.g. config/genre_chord_maps.json
+adds or replaces genres in GENRE_CHORD_MAPS, and each genre plug-in in config/genres/ is merged
+into the genre tables (see modules.genre_plugins). Snapshots never change once created, so a song
+that pins one snapshot sees consistent data even if the files are reloaded meanwhile, and
+caches can key on snapshot.version.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules import configuration
+from modules.genre_plugins import PLUGIN_TABLES, check_genre_plugin
+from collections import namedtuple
+from collections.abc import Mapping
+import glob
+import hashlib
+import json
+import threading
+import logging
+
+CONFIG_DIR = os.path.join(project_root, "config")
+GENRE_PLUGIN_DIR = "genres"  # Sub-directory of the configuration directory holding genre plug-ins
+WATCH_INTERVAL = 2.0  # Seconds between checks of the configuration files while watching
+
+# Caches keyed on a snapshot (module, function); cleared on reload so old snapshots are released
+SNAPSHOT_CACHES = (
+    ("modules.rhythm_grid", "_build_grid"),
+    ("modules.rhythm_grid", "get_section_tables"),
+    ("modules.genre_plugins", "_compiled_rules"),
+    ("modules.progression_engine", "_compiled_table"),
+    ("modules.progression_engine", "_completion_levels"),
+    ("modules.percussion_library", "_compile_bar_template"),
+    ("modules.arrangement", "_section_roles"),
+)
+
+# Built-in tables and the snapshot field each one is exposed as
+BUILTIN_TABLES = {
+    "keys": configuration.KEYS,
+    "scales": configuration.SCALES,
+    "genre_defaults": configuration.GENRE_DEFAULTS,
+    "genre_sections": configuration.GENRE_SECTIONS,
+    "genre_chord_maps": configuration.GENRE_CHORD_MAPS,
+    "genre_progressions": configuration.GENRE_PROGRESSIONS,
+    "genre_rhythms": configuration.GENRE_RHYTHMS,
+    "groove_templates": configuration.GROOVE_TEMPLATES,
+    "instrument_map": configuration.INSTRUMENT_MAP,
+    "drum_instruments": configuration.DRUM_INSTRUMENTS,
+    "key_map": configuration.KEY_MAP,
+    "scale_intervals": configuration.SCALE_INTERVALS,
+    "genre_rules": configuration.GENRE_RULES,
+    "section_dynamics": configuration.SECTION_DYNAMICS,
+    "section_tempo": configuration.SECTION_TEMPO,
+    "section_arrangements": configuration.SECTION_ARRANGEMENTS,
+    "genre_arrangements": configuration.GENRE_ARRANGEMENTS,
+    "percussion_patterns": {},  # Only provided by config/percussion_patterns.json
+}
+
+# Immutable mapping that can be hashed and used as a cache key
+class FrozenDict(Mapping):
+    __slots__ = ("_data", "_hash")
+
+    def __init__(self, *args, **kwargs):
+        self._data = dict(*args, **kwargs)
+        self._hash = None
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(frozenset(self._data.items()))
+        return self._hash
+
+    def __repr__(self):
+        return f"FrozenDict({self._data!r})"
+
+# One immutable version of the whole configuration
+class ConfigSnapshot(namedtuple("ConfigSnapshot", ["version"] + list(BUILTIN_TABLES))):
+    __slots__ = ()
+
+    # Snapshots are identified by their content hash, which keeps hashing and comparison cheap
+    def __hash__(self):
+        return hash(self.version)
+
+    def __eq__(self, other):
+        return isinstance(other, ConfigSnapshot) and self.version == other.version
+
+    def __ne__(self, other):
+        return not self == other
+
+# 1. Freeze Values
+def freeze(value):
+    """
+    Recursively convert dicts, lists and sets into immutable equivalents.
+
+    Args:
+        value: A value loaded from configuration.
+
+    Returns:
+        The value with dicts as FrozenDict, lists as tuples and sets as frozensets.
+    """
+    if isinstance(value, Mapping):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    return value
+
+# 2. Version Hash
+def compute_version(tables):
+    """
+    Hash the merged configuration tables.
+
+    Args:
+        tables (dict): Table name -> plain (unfrozen) table data.
+
+    Returns:
+        str: A short hexadecimal content hash.
+    """
+    def default(value):
+        if isinstance(value, (set, frozenset)):
+            return sorted(value)
+        raise TypeError(f"Cannot hash configuration value {value!r}")
+
+    canonical = json.dumps(tables, sort_keys=True, separators=(",", ":"), default=default)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+# 3. Build Snapshot
+def build_snapshot(config_dir=CONFIG_DIR):
+    """
+    Merge the built-in tables with the files in a configuration directory.
+
+    Args:
+        config_dir (str): Directory holding the override files.
+
+    Returns:
+        ConfigSnapshot: The frozen configuration.
+    """
+    tables = {}
+    for name, builtin in BUILTIN_TABLES.items():
+        tables[name] = dict(builtin) if isinstance(builtin, dict) else builtin
+
+    for file_name in sorted(glob.glob(os.path.join(config_dir, "*.json"))):
+        name = os.path.splitext(os.path.basename(file_name))[0]
+        if name not in tables:
+            logging.debug(f"Ignoring unknown configuration file: {file_name}")
+            continue
+        with open(file_name, "r", encoding="utf-8") as config_file:
+            override = json.load(config_file)
+        if isinstance(tables[name], dict):
+            if not isinstance(override, dict):
+                raise ValueError(f"Configuration file {file_name} must contain a JSON object.")
+            tables[name].update((key, value) for key, value in override.items() if not key.startswith("_"))
+        else:
+            if not isinstance(override, list):
+                raise ValueError(f"Configuration file {file_name} must contain a JSON array.")
+            tables[name] = type(tables[name])(override)
+
+    for file_name in sorted(glob.glob(os.path.join(config_dir, GENRE_PLUGIN_DIR, "*.json"))):
+        with open(file_name, "r", encoding="utf-8") as plugin_file:
+            plugin = json.load(plugin_file)
+        genre = check_genre_plugin(plugin, file_name)
+        for section, table in PLUGIN_TABLES.items():
+            if section in plugin:
+                tables[table][genre] = plugin[section]
+        logging.info(f"Loaded genre plug-in '{genre}' from {file_name}")
+
+    version = compute_version(tables)
+    return ConfigSnapshot(version, **{name: freeze(table) for name, table in tables.items()})
+
+# 4. File Signature
+def get_files_signature(config_dir=CONFIG_DIR):
+    """
+    Return a cheap fingerprint of the configuration files (names, sizes and modification times).
+
+    Args:
+        config_dir (str): Directory holding the override files.
+
+    Returns:
+        tuple: The signature; it changes whenever a file is added, removed or edited.
+    """
+    signature = []
+    file_names = glob.glob(os.path.join(config_dir, "*.json"))
+    file_names += glob.glob(os.path.join(config_dir, GENRE_PLUGIN_DIR, "*.json"))
+    for file_name in sorted(file_names):
+        try:
+            stat = os.stat(file_name)
+        except OSError:
+            continue
+        signature.append((file_name, stat.st_size, stat.st_mtime_ns))
+    return tuple(signature)
+
+# Holder of the current snapshot, with hot reload
+class ConfigRegistry:
+    def __init__(self, config_dir=CONFIG_DIR):
+        self.config_dir = config_dir
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._watcher = None
+        self._stop_event = threading.Event()
+        self._signature = get_files_signature(config_dir)
+        self._snapshot = build_snapshot(config_dir)
+        logging.info(f"Configuration loaded (version {self._snapshot.version}).")
+
+    def snapshot(self):
+        """Return the current configuration snapshot."""
+        return self._snapshot
+
+    def subscribe(self, callback):
+        """Call callback(snapshot) whenever a reload produces a new version."""
+        self._listeners.append(callback)
+
+    def reload(self, force=False):
+        """
+        Reload the configuration if its files changed.
+
+        Args:
+            force (bool): Rebuild even if the files look unchanged.
+
+        Returns:
+            bool: True if the version changed.
+        """
+        with self._lock:
+            signature = get_files_signature(self.config_dir)
+            if not force and signature == self._signature:
+                return False
+            try:
+                snapshot = build_snapshot(self.config_dir)
+            except Exception as e:
+                # Keep serving the last good snapshot (a bad file must not stop the watcher);
+                # retry when the files change again
+                logging.error(f"Configuration reload failed, keeping version {self._snapshot.version}: {e}")
+                self._signature = signature
+                return False
+            self._signature = signature
+            changed = snapshot.version != self._snapshot.version
+            self._snapshot = snapshot
+
+        if changed:
+            logging.info(f"Configuration reloaded (version {snapshot.version}).")
+            for callback in list(self._listeners):
+                callback(snapshot)
+        return changed
+
+    @property
+    def watching(self):
+        """True while the background watcher thread runs."""
+        return self._watcher is not None
+
+    def watch(self, interval=WATCH_INTERVAL):
+        """Start a background thread that checks the configuration files every interval seconds."""
+        if self._watcher is not None:
+            return
+        self._stop_event.clear()
+
+        def poll():
+            while not self._stop_event.wait(interval):
+                self.reload()
+
+        self._watcher = threading.Thread(target=poll, name="config-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self):
+        """Stop the background watcher thread."""
+        if self._watcher is not None:
+            self._stop_event.set()
+            self._watcher.join()
+            self._watcher = None
+
+_registry = None
+_registry_lock = threading.Lock()
+
+# 5. Clear Snapshot Caches
+def clear_snapshot_caches(snapshot=None):
+    """
+    Empty the caches keyed on configuration snapshots, so replaced snapshots can be freed.
+
+    Modules that have not been imported are skipped. Subscribed to the application-wide
+    registry, so it runs after every reload that changes the version.
+
+    Args:
+        snapshot (ConfigSnapshot): The new snapshot (unused; the subscribe callback signature).
+    """
+    for module_name, function_name in SNAPSHOT_CACHES:
+        function = getattr(sys.modules.get(module_name), function_name, None)
+        if function is not None and hasattr(function, "cache_clear"):
+            function.cache_clear()
+    logging.debug("Cleared the configuration caches.")
+
+# 6. Default Registry
+def get_registry():
+    """
+    Return the application-wide registry, creating it on first use.
+
+    Returns:
+        ConfigRegistry: The shared registry.
+    """
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                registry = ConfigRegistry()
+                registry.subscribe(clear_snapshot_caches)
+                _registry = registry
+    return _registry
+
+# 7. Current Configuration
+def get_config():
+    """
+    Return the current configuration snapshot of the application-wide registry.
+
+    Returns:
+        ConfigSnapshot: The frozen configuration.
+    """
+    return get_registry().snapshot()
@@ -95,52 +95,6 @@ GENRE_SECTIONS = {
     "User": [("Intro", 8), ("Verse", 8), ("Chorus", 16), ("Bridge", 8), ("Outro", 16)],
 }
 
-# Song Sections (Customizable)
-# List to store user-defined song sections
-SONG_SECTIONS = []
-
-def load_default_sections(genre):
-    """
-    Load default sections for a given genre into SONG_SECTIONS.
-
-    Args:
-        genre (str): The genre name.
-    """
-    global SONG_SECTIONS
-    SONG_SECTIONS.clear()  # Clear existing sections
-    default_sections = GENRE_SECTIONS.get(genre, [])
-    SONG_SECTIONS.extend(default_sections)
-    logging.info(f"Loaded sections for genre '{genre}': {SONG_SECTIONS}")
-
-def add_section(name, length):
-    """
-    Add a new section to SONG_SECTIONS.
-
-    Args:
-        name (str): The name of the section.
-        length (int): The length of the section in bars.
-    """
-    SONG_SECTIONS.append((name, length))
-
-def remove_section(index):
-    """
-    Remove a section from SONG_SECTIONS by index.
-
-    Args:
-        index (int): The index of the section to remove.
-    """
-    if 0 <= index < len(SONG_SECTIONS):
-        SONG_SECTIONS.pop(index)
-
-def get_song_sections():
-    """
-    Retrieve the current song sections.
-
-    Returns:
-        list: A list of the current song sections.
-    """
-    return SONG_SECTIONS
-
 # Chord Definitions
 # Dictionary defining chord progressions for each genre
 GENRE_CHORD_MAPS = {
@@ -205,6 +159,181 @@ GENRE_CHORD_MAPS = {
     },
 }
 
+# Chord Progression Rules
+# Dictionary describing how the chords of GENRE_CHORD_MAPS follow each other (see modules.progression_engine):
+#   "start":       relative weights of the chords a section may open with
+#   "transitions": for each chord, the relative weights of the chords that may follow it
+#   "cadences":    chord sequences a section may close with (one is chosen when the section is long enough)
+GENRE_PROGRESSIONS = {
+    "Pop": {
+        "start": {"I": 3, "vi": 1, "IV": 1},
+        "transitions": {
+            "I": {"IV": 3, "V": 3, "vi": 3, "ii": 1},
+            "ii": {"V": 4, "IV": 1},
+            "IV": {"I": 2, "V": 3, "vi": 1, "ii": 1},
+            "V": {"I": 4, "vi": 3, "IV": 1},
+            "vi": {"IV": 4, "ii": 2, "V": 1, "I": 1},
+        },
+        "cadences": [["V", "I"], ["IV", "I"], ["IV", "V", "I"]],
+    },
+    "Rock": {
+        "start": {"I": 3, "IV": 1},
+        "transitions": {
+            "I": {"IV": 3, "V": 2, "bVII": 3, "bIII": 1, "bVI": 1},
+            "bIII": {"IV": 2, "bVII": 2, "I": 1},
+            "IV": {"I": 3, "V": 2, "bVII": 1},
+            "V": {"I": 3, "IV": 2},
+            "bVI": {"bVII": 4, "V": 1},
+            "bVII": {"IV": 2, "I": 3},
+        },
+        "cadences": [["bVI", "bVII", "I"], ["IV", "V", "I"], ["bVII", "I"]],
+    },
+    "Jazz": {
+        "start": {"ii": 2, "I": 2, "maj7": 1},
+        "transitions": {
+            "ii": {"V": 5, "m7": 1},
+            "V": {"I": 4, "maj7": 2, "vi": 1},
+            "I": {"vi": 3, "ii": 2, "maj7": 1},
+            "vi": {"ii": 4, "m7": 1},
+            "maj7": {"vi": 2, "ii": 3, "m7": 1},
+            "m7": {"V": 3, "ii": 1},
+        },
+        "cadences": [["ii", "V", "I"], ["ii", "V", "maj7"]],
+    },
+    "Classical": {
+        "start": {"I": 1},
+        "transitions": {
+            "I": {"IV": 3, "V": 3, "vi": 2, "ii": 2, "iii": 1},
+            "ii": {"V": 4, "vii°": 2},
+            "iii": {"vi": 3, "IV": 2},
+            "IV": {"V": 3, "I": 2, "ii": 2, "vii°": 1},
+            "V": {"I": 5, "vi": 2},
+            "vi": {"ii": 3, "IV": 3, "V": 1},
+            "vii°": {"I": 4, "V": 1},
+        },
+        "cadences": [["IV", "V", "I"], ["ii", "V", "I"], ["V", "I"], ["IV", "I"]],
+    },
+    "Electronic": {
+        "start": {"i": 3, "VI": 1},
+        "transitions": {
+            "i": {"VI": 3, "VII": 2, "III": 2, "v": 1},
+            "III": {"VI": 2, "VII": 3},
+            "VI": {"VII": 3, "III": 2, "i": 1},
+            "VII": {"i": 3, "III": 2},
+            "v": {"i": 2, "VI": 2},
+        },
+        "cadences": [["VI", "VII", "i"], ["v", "i"]],
+    },
+    "Hip-Hop": {
+        "start": {"i": 3},
+        "transitions": {
+            "i": {"iv": 3, "VI": 3, "VII": 1, "v": 1},
+            "iv": {"i": 2, "v": 2, "VI": 1},
+            "v": {"i": 3, "VI": 1},
+            "VI": {"VII": 2, "iv": 2, "i": 1},
+            "VII": {"i": 3},
+        },
+        "cadences": [["iv", "v", "i"], ["VI", "VII", "i"], ["iv", "i"]],
+    },
+    "Folk": {
+        "start": {"I": 1},
+        "transitions": {
+            "I": {"IV": 3, "V": 3, "vi": 1},
+            "IV": {"I": 3, "V": 2},
+            "V": {"I": 4, "vi": 1, "IV": 1},
+            "vi": {"IV": 2, "V": 2, "ii": 1},
+            "ii": {"V": 3},
+        },
+        "cadences": [["IV", "V", "I"], ["V", "I"], ["IV", "I"]],
+    },
+    "User": {
+        "start": {"I": 1},
+        "transitions": {
+            "I": {"IV": 1, "V": 1, "vi": 1},
+            "IV": {"I": 1, "V": 1, "vi": 1},
+            "V": {"I": 2, "vi": 1},
+            "vi": {"IV": 1, "V": 1},
+        },
+        "cadences": [["V", "I"], ["IV", "I"]],
+    },
+}
+
+# Rhythm Settings for Each Genre
+# Dictionary defining the grid subdivision (4 = quarter notes, 8 = eighth notes, 12 = eighth-note triplets,
+# 16 = sixteenth notes)
+# used by the melodic and rhythmic parts, the swing ratio (0.5 = straight) and the groove template
+GENRE_RHYTHMS = {
+    "Pop": {"melody": 4, "rhythm": 8, "swing": 0.5, "groove": "straight"},
+    "Rock": {"melody": 4, "rhythm": 8, "swing": 0.5, "groove": "backbeat"},
+    "Jazz": {"melody": 8, "rhythm": 4, "swing": 0.66, "groove": "laid_back"},
+    "Classical": {"melody": 4, "rhythm": 4, "swing": 0.5, "groove": "straight"},
+    "Electronic": {"melody": 8, "rhythm": 16, "swing": 0.5, "groove": "four_on_the_floor"},
+    "Hip-Hop": {"melody": 8, "rhythm": 16, "swing": 0.56, "groove": "laid_back"},
+    "Folk": {"melody": 8, "rhythm": 8, "swing": 0.5, "groove": "straight"},
+    "User": {"melody": 4, "rhythm": 4, "swing": 0.5, "groove": "straight"},
+}
+
+# Genre Rules
+# Dictionary describing how each genre shapes its chords, melodies, ornaments and harmonies.
+# Probabilities are in the range 0-1 and intervals are semitones above the chord root:
+#   chords/harmony: "truncate" keeps the first n chord notes, "power" turns chords into root + fifth,
+#                   "extensions" adds [probability, interval] notes, "suspensions" replaces the third
+#                   with the first [probability, interval] that fires
+#   harmony only:   "inversion" is the probability of inverting each chord as it is played
+#   melody:         "degrees" restricts notes to these scale degrees, "offsets" (with optional
+#                   "offset_weights") shifts notes chromatically, "octave_jump" moves notes an octave
+#   ornaments:      "trill" and "grace" probabilities per note
+GENRE_RULES = {
+    "Pop": {
+        "chords": {"extensions": [[0.2, 10]], "suspensions": [[0.1, 2], [0.1, 5]]},
+        "melody": {"degrees": [0, 2, 4]},
+        "ornaments": {"grace": 0.2},
+        "harmony": {"suspensions": [[0.2, 2], [0.2, 5]]},
+    },
+    "Rock": {
+        "chords": {"power": True, "extensions": [[0.3, 12]]},
+        "melody": {"degrees": [0, 3, 4]},
+        "ornaments": {"grace": 0.4},
+        "harmony": {"power": True, "extensions": [[0.3, 12]]},
+    },
+    "Jazz": {
+        "chords": {"extensions": [[0.5, 10], [0.3, 14], [0.1, 21]]},
+        "melody": {"offsets": [-2, -1, 0, 1, 2]},
+        "ornaments": {"grace": 0.2},
+        "harmony": {"extensions": [[0.5, 14], [0.3, 17], [0.1, 21]]},
+    },
+    "Classical": {
+        "chords": {"truncate": 3, "suspensions": [[0.2, 5]]},
+        "melody": {"offsets": [-1, 0, 1]},
+        "ornaments": {"trill": 0.5},
+        "harmony": {"inversion": 0.5},
+    },
+    "Electronic": {
+        "chords": {"extensions": [[0.5, 11], [0.3, 13]]},
+        "melody": {"offsets": [-3, -2, -1, 0, 1, 2, 3]},
+    },
+    "Hip-Hop": {
+        "chords": {"truncate": 3, "extensions": [[0.5, 10], [0.3, 14]]},
+    },
+    "Folk": {
+        "chords": {"extensions": [[0.2, 9]]},
+        "melody": {"octave_jump": 0.3},
+    },
+    "Blues": {
+        "chords": {"truncate": 3, "extensions": [[1.0, 10], [0.4, 14]]},
+    },
+}
+
+# Groove Templates
+# Dictionary of per-step velocity accents and timing offsets (as a fraction of a grid step).
+# Both lists are cycled across the steps of a bar.
+GROOVE_TEMPLATES = {
+    "straight": {"accents": [1.0], "offsets": [0.0]},
+    "backbeat": {"accents": [0.9, 0.75, 1.0, 0.75], "offsets": [0.0]},
+    "laid_back": {"accents": [1.0, 0.8, 0.9, 0.8], "offsets": [0.0, 0.06, 0.03, 0.06]},
+    "four_on_the_floor": {"accents": [1.0, 0.7, 0.85, 0.7], "offsets": [0.0]},
+}
+
 # MIDI Instrument Mappings
 # Dictionary mapping instrument names to MIDI program numbers
 INSTRUMENT_MAP = {
@@ -224,6 +353,7 @@ INSTRUMENT_MAP = {
     "Electric Guitar (Clean)": 26,
     "Electric Guitar (Distorted)": 30,
     "Nylon Guitar": 25,
+    "Guitar": 25,
 
     # Strings
     "Violin": 40,
@@ -232,6 +362,7 @@ INSTRUMENT_MAP = {
     "Double Bass": 43,
     "Harp": 46,
     "String Ensemble": 48,
+    "Strings": 48,
 
     # Woodwinds
     "Flute": 73,
@@ -251,9 +382,11 @@ INSTRUMENT_MAP = {
     "Synth Pad": 88,
     "Synth Bass": 38,
     "Synth Pluck": 81,
+    "Synth": 81,
 
     # Percussion
     "Drums": 0,  # Drums use channel 9
+    "Percussion": 0,  # Percussion uses channel 9
     "Timpani": 47,
     "Marimba": 12,
     "Xylophone": 13,
@@ -276,6 +409,7 @@ INSTRUMENT_MAP = {
     "Slap Bass": 36,
     "Fretless Bass": 35,
     "808 Bass": 33,
+    "Bass": 33,
 
     # Additional Instruments
     "Accordion": 21,
@@ -285,6 +419,63 @@ INSTRUMENT_MAP = {
     "Vocal Pad": 88,
 }
 
+# Drum Kit Instruments
+# Instruments that are played on the General MIDI percussion channel (channel 9) rather than by program
+DRUM_INSTRUMENTS = {"Drums", "Percussion", "Cymbals", "Bass Drum", "Triangle"}
+
+# Section Dynamics
+# Dynamic shape applied to each section when dynamics are enabled, by lower-case section name;
+# sections not listed are played "flat" (velocity variations only)
+SECTION_DYNAMICS = {
+    "intro": "crescendo",
+    "prechorus": "crescendo",
+    "build-up": "crescendo",
+    "bridge": "crescendo",
+    "development": "crescendo",
+    "outro": "decrescendo",
+    "coda": "decrescendo",
+}
+
+# Section Tempo
+# Tempo curve applied to each section when dynamic tempo is enabled, by lower-case section name.
+# "start" and "end" are BPM offsets from the song tempo and "curve" is a shape in
+# modules.tempo_map.TEMPO_CURVES; sections not listed keep the song tempo
+SECTION_TEMPO = {
+    "intro": {"start": -10, "end": 0, "curve": "ease_out"},  # Accelerando into the song
+    "build-up": {"start": -4, "end": 4, "curve": "linear"},
+    "outro": {"start": 0, "end": -20, "curve": "ease_in"},  # Ritardando
+    "coda": {"start": 0, "end": -15, "curve": "ease_in"},
+}
+
+# Section Arrangements
+# Roles (melody, harmony, rhythm, bass, percussion, countermelody) that play in each section when
+# arrangement is enabled, by lower-case section name; sections not listed use every track
+SECTION_ARRANGEMENTS = {
+    "intro": ["melody", "harmony"],
+    "verse": ["melody", "harmony", "bass", "percussion"],
+    "prechorus": ["melody", "harmony", "rhythm", "bass", "percussion"],
+    "build-up": ["harmony", "rhythm", "bass", "percussion"],
+    "bridge": ["melody", "harmony", "bass", "countermelody"],
+    "break": ["percussion"],  # Drum-only break
+    "breakdown": ["harmony", "percussion"],
+    "solo": ["melody", "rhythm", "bass", "percussion"],
+    "development": ["melody", "harmony", "bass", "countermelody"],
+    "outro": ["melody", "harmony", "bass"],
+    "coda": ["harmony", "bass"],
+}
+
+# Genre Arrangements
+# Per-genre overrides of SECTION_ARRANGEMENTS, by lower-case section name
+GENRE_ARRANGEMENTS = {
+    "Rock": {"intro": ["rhythm", "percussion"]},
+    "Jazz": {"intro": ["harmony", "bass"], "solo": ["melody", "bass", "percussion"]},
+    "Electronic": {"intro": ["bass", "percussion"], "build-up": ["harmony", "rhythm", "percussion"],
+                   "breakdown": ["melody", "harmony"]},
+    "Hip-Hop": {"intro": ["harmony", "percussion"], "verse": ["melody", "bass", "percussion"]},
+    "Folk": {"intro": ["rhythm"], "verse": ["melody", "rhythm", "bass"]},
+    "Classical": {"verse": ["melody", "harmony", "bass"]},
+}
+
 # MIDI Note Numbers for Keys
 # Dictionary mapping musical keys to their MIDI note numbers
 KEY_MAP = {
@@ -364,7 +555,7 @@ def is_valid_instrument(instrument):
 
 def get_genre_defaults(genre):
     """
-    Retrieve default settings for a given genre, with fallback to 'Default'.
+    Retrieve default settings for a given genre, with fallback to 'Pop'.
 
     Args:
         genre (str): The genre name for which to retrieve defaults.
@@ -372,4 +563,6 @@ def get_genre_defaults(genre):
     Returns:
         dict: A dictionary containing default settings for the genre.
     """
-    return GENRE_DEFAULTS.get(genre, GENRE_DEFAULTS["Default"])
\ No newline at end of file
+    if genre not in GENRE_DEFAULTS:
+        logging.warning(f"Genre '{genre}' not found. Falling back to 'Pop' defaults.")
+    return GENRE_DEFAULTS.get(genre, GENRE_DEFAULTS["Pop"])
\ No newline at end of file
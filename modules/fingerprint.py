@@ -0,0 +1,259 @@
+'''
+Fingerprint Module for MIDI Song Generator Application
+
+This module detects near-identical songs before they are encoded. It includes functions for:-
+                - extracting chord, melody contour and rhythm n-grams from a composed song
+                - hashing the n-grams into a 64-bit SimHash fingerprint
+                - keeping an index of fingerprints in memory or in an append-only file
+                - finding fingerprints within a small Hamming distance in near-constant time
+
+Features are relative (intervals between notes, chord shapes and root motion, time between
+onsets), so the same song in another key or at another tempo gets the same fingerprint.
+Token counts are damped logarithmically and each feature family (melody, rhythm, harmony)
+carries the same total weight, so a steady rhythm repeated all song long cannot outweigh
+everything else. The index splits each fingerprint into max_distance + 1 bands; two fingerprints within
+max_distance bits share at least one band exactly, so only songs in the same band bucket
+are compared.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.arrangement import apply_arrangement
+from collections import Counter
+import hashlib
+import math
+import struct
+import logging
+
+FINGERPRINT_BITS = 64
+NGRAM_LENGTH = 4  # Notes per melody and rhythm n-gram
+CHORD_NGRAM_LENGTH = 3  # Chords per harmony n-gram
+MAX_INTERVAL = 12  # Melodic intervals are clipped to an octave
+RHYTHM_STEPS_PER_QUARTER = 12  # Onset resolution; covers sixteenths and triplets
+DEFAULT_MAX_DISTANCE = 3  # Fingerprints this many bits apart (or fewer) count as duplicates
+FINGERPRINT_RECORD = struct.Struct("<Q")
+
+# 1. Collect Role Notes
+def get_role_notes(song, roles):
+    """
+    Collect the notes of the first part playing each of the given roles, in time order.
+
+    Parts that the song's arrangement leaves out of a section are skipped.
+
+    Args:
+        song (SongRender): The composed song.
+        roles (tuple): Role names, e.g. ("melody",).
+
+    Returns:
+        list: (time, pitch) pairs.
+    """
+    notes = []
+    masks = song.arrangement or [None] * len(song.sections)
+    for section_streams, mask in zip(song.sections, masks):
+        for parts, stream in apply_arrangement(section_streams, mask):
+            if parts[0].role in roles:
+                notes.extend(zip(stream.times, stream.pitches))
+    notes.sort()
+    return notes
+
+# 2. Extract Features
+def get_song_features(song):
+    """
+    Extract the n-gram features of a song.
+
+    Args:
+        song (SongRender): The composed song.
+
+    Returns:
+        Counter: Feature token -> number of occurrences.
+    """
+    features = Counter()
+
+    # Melody contour: clipped intervals between successive melody notes
+    melody = [pitch for _, pitch in get_role_notes(song, ("melody",))]
+    intervals = [max(-MAX_INTERVAL, min(MAX_INTERVAL, b - a)) for a, b in zip(melody, melody[1:])]
+    for index in range(len(intervals) - NGRAM_LENGTH + 1):
+        features["m" + ",".join(map(str, intervals[index:index + NGRAM_LENGTH]))] += 1
+
+    # Rhythm: time between successive onsets of the melody and rhythm parts
+    onsets = sorted({round(time * RHYTHM_STEPS_PER_QUARTER) for time, _ in get_role_notes(song, ("melody", "rhythm"))})
+    gaps = [b - a for a, b in zip(onsets, onsets[1:])]
+    for index in range(len(gaps) - NGRAM_LENGTH + 1):
+        features["r" + ",".join(map(str, gaps[index:index + NGRAM_LENGTH]))] += 1
+
+    # Harmony: chord shapes (pitch classes above the lowest note) and root motion
+    chords = {}
+    for time, pitch in get_role_notes(song, ("harmony",)):
+        chords.setdefault(time, []).append(pitch)
+    chord_tokens = []
+    previous_root = None
+    for time in sorted(chords):
+        root = min(chords[time])
+        shape = "".join(sorted({format((pitch - root) % 12, "x") for pitch in chords[time]}))
+        motion = (root - previous_root) % 12 if previous_root is not None else "-"
+        chord_tokens.append(f"{motion}:{shape}")
+        previous_root = root
+    for index in range(len(chord_tokens) - CHORD_NGRAM_LENGTH + 1):
+        features["c" + "|".join(chord_tokens[index:index + CHORD_NGRAM_LENGTH])] += 1
+
+    return features
+
+# 3. Feature Weights
+def get_feature_weights(features):
+    """
+    Damp the feature counts and give every feature family the same total weight.
+
+    Args:
+        features (Counter): Feature token -> number of occurrences.
+
+    Returns:
+        dict: Feature token -> weight.
+    """
+    damped = {token: math.log1p(count) for token, count in features.items()}
+    family_totals = Counter()
+    for token, weight in damped.items():
+        family_totals[token[0]] += weight
+    return {token: weight / family_totals[token[0]] for token, weight in damped.items()}
+
+# 4. SimHash
+def simhash(features):
+    """
+    Hash weighted feature tokens into a SimHash fingerprint.
+
+    Args:
+        features (Mapping): Feature token -> weight.
+
+    Returns:
+        int: A FINGERPRINT_BITS-bit fingerprint.
+    """
+    totals = [0] * FINGERPRINT_BITS
+    for token, weight in features.items():
+        token_hash = int.from_bytes(hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest(), "little")
+        for bit in range(FINGERPRINT_BITS):
+            if token_hash >> bit & 1:
+                totals[bit] += weight
+            else:
+                totals[bit] -= weight
+
+    fingerprint = 0
+    for bit, total in enumerate(totals):
+        if total > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+# 5. Song Fingerprint
+def get_song_fingerprint(song):
+    """
+    Return the SimHash fingerprint of a composed song.
+
+    Args:
+        song (SongRender): The composed song.
+
+    Returns:
+        int: The fingerprint.
+    """
+    return simhash(get_feature_weights(get_song_features(song)))
+
+# 6. Hamming Distance
+def hamming_distance(first, second):
+    """Return the number of bits in which two fingerprints differ."""
+    return bin(first ^ second).count("1")
+
+# Index of fingerprints with banded lookup, optionally persisted to an append-only file
+class FingerprintIndex:
+    def __init__(self, file_name=None, max_distance=DEFAULT_MAX_DISTANCE):
+        """
+        Args:
+            file_name (str): Optional file of stored fingerprints; it is loaded and then appended to.
+            max_distance (int): Largest Hamming distance that counts as a duplicate.
+        """
+        if not 0 <= max_distance < FINGERPRINT_BITS // 2:
+            raise ValueError(f"max_distance must be between 0 and {FINGERPRINT_BITS // 2 - 1}, got {max_distance}")
+        self.max_distance = max_distance
+        self.band_count = max_distance + 1
+        self.band_bits = FINGERPRINT_BITS // self.band_count
+        self._band_mask = (1 << self.band_bits) - 1
+        self._buckets = [dict() for _ in range(self.band_count)]
+        self._count = 0
+        self._file = None
+
+        if file_name:
+            if os.path.exists(file_name):
+                with open(file_name, "rb") as index_file:
+                    data = index_file.read()
+                usable = len(data) - len(data) % FINGERPRINT_RECORD.size  # Ignore a torn final record
+                for (fingerprint,) in FINGERPRINT_RECORD.iter_unpack(data[:usable]):
+                    self._insert(fingerprint)
+                logging.info(f"Loaded {self._count} fingerprints from {file_name}")
+            self._file = open(file_name, "ab")
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        """Iterate over the stored fingerprints (each is in exactly one bucket of the first band)."""
+        for bucket in self._buckets[0].values():
+            yield from bucket
+
+    def _bands(self, fingerprint):
+        return [(fingerprint >> (band * self.band_bits)) & self._band_mask for band in range(self.band_count)]
+
+    def _insert(self, fingerprint):
+        for buckets, key in zip(self._buckets, self._bands(fingerprint)):
+            buckets.setdefault(key, []).append(fingerprint)
+        self._count += 1
+
+    def find(self, fingerprint):
+        """Return a stored fingerprint within max_distance bits, or None."""
+        for buckets, key in zip(self._buckets, self._bands(fingerprint)):
+            for candidate in buckets.get(key, ()):
+                if hamming_distance(candidate, fingerprint) <= self.max_distance:
+                    return candidate
+        return None
+
+    def add(self, fingerprint, persist=True):
+        """
+        Store a fingerprint.
+
+        Args:
+            fingerprint (int): The fingerprint.
+            persist (bool): Also append it to the index file, if any; otherwise call save()
+                            once the song it belongs to has been written.
+        """
+        self._insert(fingerprint)
+        if persist:
+            self.save(fingerprint)
+
+    def save(self, fingerprint):
+        """Append a fingerprint already in the index to the index file, if any."""
+        if self._file is not None:
+            self._file.write(FINGERPRINT_RECORD.pack(fingerprint))
+            self._file.flush()
+
+    def add_if_new(self, fingerprint, persist=True):
+        """
+        Store a fingerprint unless a near-duplicate is already indexed.
+
+        Args:
+            fingerprint (int): The fingerprint.
+            persist (bool): Also append it to the index file, if any (see add).
+
+        Returns:
+            bool: True if the fingerprint was new and has been stored.
+        """
+        if self.find(fingerprint) is not None:
+            return False
+        self.add(fingerprint, persist)
+        return True
+
+    def close(self):
+        """Close the index file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,318 @@
+'''
+Genre Plug-in Module for MIDI Song Generator Application
+
+This module turns declarative genre descriptions into compiled rule tables. It includes functions for:-
+                - checking a genre plug-in file
+                - compiling a genre's rules into a CompiledGenre dispatch table
+                - looking up the compiled rules of a genre, cached per configuration version
+
+Built-in genres are described by GENRE_RULES in modules.configuration. New genres are added by
+dropping a plug-in file into config/genres/ - no code changes are needed. A plug-in looks like:
+
+    {
+        "name": "Bossa Nova",
+        "defaults": {"time_signature": "4/4", "scale": "Major", "key": "F",
+                     "instruments": ["Nylon Guitar", "Flute", "Acoustic Bass", "Percussion"]},
+        "sections": [["Intro", 4], ["Verse", 16], ["Chorus", 8], ["Outro", 4]],
+        "chord_map": {"Imaj7": [0, 2, 4, 6], "ii7": [1, 3, 5, 0], "V7": [4, 6, 1, 3]},
+        "progressions": {"start": {"Imaj7": 1}, "transitions": {"Imaj7": {"ii7": 1}, "ii7": {"V7": 1},
+                                                                  "V7": {"Imaj7": 1}},
+                         "cadences": [["ii7", "V7", "Imaj7"]]},
+        "rhythm": {"melody": 8, "rhythm": 8, "swing": 0.5, "groove": "laid_back"},
+        "percussion": {"subdivision": 8, "instruments": {...}},
+        "arrangement": {"intro": ["harmony", "bass"], "verse": ["melody", "harmony", "bass", "percussion"]},
+        "rules": {
+            "chords": {"extensions": [[0.4, 14]]},
+            "melody": {"offsets": [-1, 0, 1], "offset_weights": [1, 6, 1]},
+            "ornaments": {"grace": 0.1},
+            "harmony": {"inversion": 0.3}
+        }
+    }
+
+Every section except "name" is optional; see GENRE_RULES for the meaning of the rule fields.
+The generators fetch the compiled rules once per call, so their inner loops contain no
+genre string comparisons.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from collections import namedtuple
+from functools import lru_cache
+from itertools import accumulate
+import logging
+
+# Plug-in sections and the configuration table each one is merged into
+PLUGIN_TABLES = {
+    "defaults": "genre_defaults",
+    "sections": "genre_sections",
+    "chord_map": "genre_chord_maps",
+    "progressions": "genre_progressions",
+    "rhythm": "genre_rhythms",
+    "percussion": "percussion_patterns",
+    "rules": "genre_rules",
+    "arrangement": "genre_arrangements",
+}
+RULE_GROUPS = ("chords", "melody", "ornaments", "harmony")
+DEFAULT_FIELDS = ("time_signature", "scale", "key", "instruments")
+PROGRESSION_FIELDS = ("start", "transitions", "cadences")
+RHYTHM_FIELDS = ("melody", "rhythm", "swing", "groove")
+
+# Compiled, ready-to-dispatch rules of one genre
+CompiledGenre = namedtuple("CompiledGenre", [
+    "chord_truncate", "chord_power", "chord_extensions", "chord_suspensions",
+    "melody_degrees", "melody_offsets", "melody_offset_cum_weights", "melody_octave_jump",
+    "ornament_trill", "ornament_grace",
+    "harmony_truncate", "harmony_power", "harmony_extensions", "harmony_suspensions", "harmony_inversion",
+])
+
+# 1. Check Plug-in
+def _is_integer(value, low=None, high=None):
+    return (isinstance(value, int) and not isinstance(value, bool)
+            and (low is None or value >= low) and (high is None or value <= high))
+
+def _is_weight(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value >= 0
+
+def _check_mapping(value, fields, section):
+    if not isinstance(value, dict):
+        raise ValueError(f"'{section}' must be a JSON object")
+    unknown = sorted(set(value) - set(fields))
+    if unknown:
+        raise ValueError(f"'{section}' has unknown fields {unknown}; valid fields are {list(fields)}")
+
+def _check_defaults(defaults, plugin):
+    from modules.rhythm_grid import parse_time_signature  # Deferred: rhythm_grid reads the registry
+    _check_mapping(defaults, DEFAULT_FIELDS, "defaults")
+    if "time_signature" in defaults:
+        parse_time_signature(defaults["time_signature"])
+    for field in ("scale", "key"):
+        if field in defaults and not isinstance(defaults[field], str):
+            raise ValueError(f"'defaults.{field}' must be a string")
+    instruments = defaults.get("instruments", [])
+    if not isinstance(instruments, list) or not all(isinstance(item, str) for item in instruments):
+        raise ValueError("'defaults.instruments' must be a list of instrument names")
+
+def _check_sections(sections, plugin):
+    from modules.rhythm_grid import parse_time_signature
+    if not isinstance(sections, list) or not sections:
+        raise ValueError("'sections' must be a non-empty list")
+    for section in sections:
+        if (not isinstance(section, list) or len(section) not in (2, 3) or not isinstance(section[0], str)
+                or not _is_integer(section[1], 1)):
+            raise ValueError(f"'sections' entries must be [name, bars] or [name, bars, time_signature], got {section!r}")
+        if len(section) == 3:
+            parse_time_signature(section[2])
+
+def _check_chord_map(chord_map, plugin):
+    if not isinstance(chord_map, dict) or not chord_map:
+        raise ValueError("'chord_map' must be a non-empty JSON object")
+    for chord, intervals in chord_map.items():
+        if not isinstance(intervals, list) or not intervals or not all(_is_integer(step) for step in intervals):
+            raise ValueError(f"'chord_map.{chord}' must be a non-empty list of scale degrees, got {intervals!r}")
+
+def _check_progressions(progressions, plugin):
+    from modules.progression_engine import compile_progression_table  # Deferred: it reads the registry
+    _check_mapping(progressions, PROGRESSION_FIELDS, "progressions")
+    start, transitions = progressions.get("start", {}), progressions.get("transitions", {})
+    if not isinstance(start, dict) or not all(_is_weight(weight) for weight in start.values()):
+        raise ValueError("'progressions.start' must map chord names to non-negative weights")
+    if not isinstance(transitions, dict) or not all(
+            isinstance(row, dict) and all(_is_weight(weight) for weight in row.values()) for row in transitions.values()):
+        raise ValueError("'progressions.transitions' must map chord names to {chord: non-negative weight} objects")
+    cadences = progressions.get("cadences", [])
+    if not isinstance(cadences, list) or not all(
+            isinstance(cadence, list) and cadence and all(isinstance(chord, str) for chord in cadence)
+            for cadence in cadences):
+        raise ValueError("'progressions.cadences' must be a list of non-empty lists of chord names")
+    if isinstance(plugin.get("chord_map"), dict):
+        compile_progression_table(plugin["chord_map"], progressions)  # Checks the chord names
+
+def _check_rhythm(rhythm, plugin):
+    _check_mapping(rhythm, RHYTHM_FIELDS, "rhythm")
+    for field in ("melody", "rhythm"):
+        if field in rhythm and not _is_integer(rhythm[field], 1):
+            raise ValueError(f"'rhythm.{field}' must be a positive number of steps per whole note")
+    swing = rhythm.get("swing", 0.5)
+    if isinstance(swing, bool) or not isinstance(swing, (int, float)) or not 0.0 < swing < 1.0:
+        raise ValueError(f"'rhythm.swing' must be between 0 and 1, got {swing!r}")
+    if not isinstance(rhythm.get("groove", ""), str):
+        raise ValueError("'rhythm.groove' must be a groove template name")
+
+def _check_percussion(percussion, plugin):
+    from modules.rhythm_grid import parse_time_signature
+    _check_mapping(percussion, ("subdivision", "instruments", "time_signatures"), "percussion")
+    if not _is_integer(percussion.get("subdivision"), 1):
+        raise ValueError("'percussion.subdivision' must be a positive number of steps per whole note")
+    bars = {"instruments": percussion.get("instruments")}
+    time_signatures = percussion.get("time_signatures", {})
+    if not isinstance(time_signatures, dict):
+        raise ValueError("'percussion.time_signatures' must be a JSON object")
+    for time_signature, bar in time_signatures.items():
+        parse_time_signature(time_signature)
+        bars[f"time_signatures.{time_signature}"] = bar
+    for field, bar in bars.items():
+        if not isinstance(bar, dict) or not bar:
+            raise ValueError(f"'percussion.{field}' must map instrument names to their parts")
+        for name, part in bar.items():
+            if (not isinstance(part, dict) or not _is_integer(part.get("note"), 0, 127)
+                    or not _is_integer(part.get("velocity"), 1, 127)
+                    or not isinstance(part.get("steps"), str) or not part["steps"]):
+                raise ValueError(f"'percussion.{field}.{name}' needs a 'note' (0-127), a 'velocity' (1-127) "
+                                 f"and a 'steps' string")
+
+def _check_arrangement(arrangement, plugin):
+    from modules.arrangement import ARRANGEMENT_ROLES  # Deferred: arrangement reads the registry
+    if not isinstance(arrangement, dict):
+        raise ValueError("'arrangement' must map section names to lists of roles")
+    for section, roles in arrangement.items():
+        if not isinstance(roles, list) or not all(isinstance(role, str) for role in roles):
+            raise ValueError(f"'arrangement.{section}' must be a list of roles")
+        unknown = sorted(set(roles) - set(ARRANGEMENT_ROLES))
+        if unknown:
+            raise ValueError(f"'arrangement.{section}' has unknown roles {unknown}; valid roles are "
+                             f"{list(ARRANGEMENT_ROLES)}")
+
+def _check_rules(rules, plugin):
+    if not isinstance(rules, dict) or set(rules) - set(RULE_GROUPS):
+        raise ValueError(f"'rules' may only contain {list(RULE_GROUPS)}")
+    compile_genre_rules(rules)
+
+# Section -> checker raising ValueError (or TypeError) on a malformed section
+SECTION_CHECKS = {
+    "defaults": _check_defaults,
+    "sections": _check_sections,
+    "chord_map": _check_chord_map,
+    "progressions": _check_progressions,
+    "rhythm": _check_rhythm,
+    "percussion": _check_percussion,
+    "rules": _check_rules,
+    "arrangement": _check_arrangement,
+}
+
+def check_genre_plugin(plugin, source="plug-in"):
+    """
+    Check the structure of a genre plug-in, so a malformed one fails when it is loaded
+    rather than when a song is generated.
+
+    Args:
+        plugin (dict): The decoded plug-in file.
+        source (str): Where the plug-in came from, used in error messages.
+
+    Returns:
+        str: The genre name.
+
+    Raises:
+        ValueError: Listing every problem found.
+    """
+    if not isinstance(plugin, dict):
+        raise ValueError(f"Genre {source} must be a JSON object.")
+    name = plugin.get("name")
+    if not isinstance(name, str) or not name:
+        raise ValueError(f"Genre {source} needs a 'name'.")
+    problems = []
+    unknown = sorted(set(plugin) - set(PLUGIN_TABLES) - {"name"})
+    if unknown:
+        problems.append(f"unknown sections {unknown}")
+    for section, check in SECTION_CHECKS.items():
+        if section in plugin:
+            try:
+                check(plugin[section], plugin)
+            except (TypeError, ValueError, AttributeError) as e:
+                problems.append(str(e))
+    if problems:
+        raise ValueError(f"Genre {source} ('{name}') is invalid: " + "; ".join(problems))
+    return name
+
+# 2. Compile Helpers
+def _integer(value, field):
+    if isinstance(value, bool) or not isinstance(value, int):
+        raise ValueError(f"Genre rule '{field}' values must be integers, got {value!r}")
+    return value
+
+def _probability(group, field):
+    value = group.get(field, 0.0)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not 0.0 <= value <= 1.0:
+        raise ValueError(f"Genre rule '{field}' must be a probability between 0 and 1, got {value!r}")
+    return float(value)
+
+def _interval_list(group, field):
+    entries = group.get(field, [])
+    compiled = []
+    for entry in entries:
+        if not isinstance(entry, (list, tuple)) or len(entry) != 2:
+            raise ValueError(f"Genre rule '{field}' entries must be [probability, interval] pairs, got {entry!r}")
+        compiled.append((_probability({field: entry[0]}, field), _integer(entry[1], field)))
+    return tuple(compiled)
+
+def _compile_chord_group(group):
+    truncate = group.get("truncate")
+    if truncate is not None and (not isinstance(truncate, int) or truncate < 2):
+        raise ValueError(f"Genre rule 'truncate' must be an integer of at least 2, got {truncate!r}")
+    return (truncate, bool(group.get("power", False)), _interval_list(group, "extensions"),
+            _interval_list(group, "suspensions"))
+
+# 3. Compile Genre Rules
+def compile_genre_rules(rules):
+    """
+    Compile a genre's declarative rules into a CompiledGenre table.
+
+    Args:
+        rules (Mapping): The genre's entry in GENRE_RULES (or a plug-in's "rules").
+
+    Returns:
+        CompiledGenre: The compiled rules.
+    """
+    melody = rules.get("melody", {})
+    degrees = melody.get("degrees")
+    offsets = tuple(_integer(offset, "offsets") for offset in melody.get("offsets", ()))
+    weights = melody.get("offset_weights")
+    if weights is not None and (len(weights) != len(offsets) or not all(_is_weight(weight) for weight in weights)):
+        raise ValueError("Genre rule 'offset_weights' must have one non-negative weight per offset.")
+    if weights is not None and offsets and not sum(weights) > 0:
+        raise ValueError("Genre rule 'offset_weights' must not all be zero.")
+    cum_weights = tuple(accumulate(weights)) if weights is not None else None
+    ornaments = rules.get("ornaments", {})
+    harmony = rules.get("harmony", {})
+
+    return CompiledGenre(
+        *_compile_chord_group(rules.get("chords", {})),
+        tuple(_integer(degree, "degrees") for degree in degrees) if degrees else None,
+        offsets,
+        cum_weights,
+        _probability(melody, "octave_jump"),
+        _probability(ornaments, "trill"),
+        _probability(ornaments, "grace"),
+        *_compile_chord_group(harmony),
+        _probability(harmony, "inversion"),
+    )
+
+# 4. Look Up Genre Rules
+def get_genre_rules(genre, config=None):
+    """
+    Return the compiled rules of a genre; unknown genres get neutral rules.
+
+    Args:
+        genre (str): The musical genre.
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
+
+    Returns:
+        CompiledGenre: The compiled rules.
+    """
+    if config is None:
+        from modules.config_registry import get_config  # Deferred: the registry loads plug-ins through this module
+        config = get_config()
+    return _compiled_rules(genre, config)
+
+@lru_cache(maxsize=128)
+def _compiled_rules(genre, config):
+    rules = config.genre_rules.get(genre)
+    if rules is None:
+        logging.debug(f"No genre rules for '{genre}'. Using neutral rules.")
+        rules = {}
+    return compile_genre_rules(rules)
@@ -0,0 +1,133 @@
+'''
+Harmonic Context Module for MIDI Song Generator Application
+
+This module lets every part of a section follow the same chords. It includes functions for:-
+                - expanding a section's chord progression into per-beat chord-tone lookup tables
+                - mapping the steps of any rhythm grid onto the beats they fall in
+                - fitting a generated line to the chords and the scale in one pass
+                - deriving a bass line from the chord roots
+
+The context holds, for every beat of the section, a 128-entry table snapping any pitch to the
+nearest tone of that beat's chord, plus one such table for the scale. The tables are cached
+per pitch-class set (see modules.markov_melody.get_scale_snap_table), so a section only stores
+references to a handful of shared tuples, and fitting a note is two index lookups.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.markov_melody import get_scale_snap_table
+from array import array
+from collections import namedtuple
+from functools import lru_cache
+
+# The harmony of one section: per-beat chord roots and chord-tone snap tables, and the scale's snap table
+HarmonicContext = namedtuple("HarmonicContext", ["beats_per_bar", "bars", "roots", "chord_snaps", "scale_snap"])
+
+# 1. Pitch Classes
+def get_pitch_classes(notes):
+    """Return the sorted pitch classes (0-11) of some MIDI notes as a tuple."""
+    return tuple(sorted({note % 12 for note in notes}))
+
+# 2. Build Harmonic Context
+def build_harmonic_context(chords, scale_notes, beat_grid, bars, roots=None):
+    """
+    Expand a section's chord progression into per-beat lookup tables.
+
+    The chords are spread evenly over the section, so one chord per bar gives every beat of a
+    bar the same chord.
+
+    Args:
+        chords (list): The section's chords, each a list of MIDI note numbers.
+        scale_notes (list): Notes in the scale.
+        beat_grid (RhythmGrid): The section's beat grid (one step per beat).
+        bars (int): The number of bars in the section.
+        roots (list): The root of every chord (see modules.music_program.get_chord_roots); defaults
+                      to each chord's lowest note, which is only its root in root position.
+
+    Returns:
+        HarmonicContext: The section's harmonic context.
+    """
+    if not chords:
+        raise ValueError("Cannot build a harmonic context without chords.")
+    if roots is None:
+        roots = [min(chord) for chord in chords]
+    elif len(roots) != len(chords):
+        raise ValueError(f"Got {len(roots)} chord roots for {len(chords)} chords.")
+    beats_per_bar = beat_grid.steps_per_bar
+    beats = beats_per_bar * bars
+    chord_indices = [beat * len(chords) // beats for beat in range(beats)]
+    chord_snaps = [get_scale_snap_table(get_pitch_classes(chord)) for chord in chords]
+    return HarmonicContext(beats_per_bar, bars,
+                           array("h", (roots[index] for index in chord_indices)),
+                           tuple(chord_snaps[index] for index in chord_indices),
+                           get_scale_snap_table(get_pitch_classes(scale_notes)))
+
+# 3. Step Beats
+@lru_cache(maxsize=256)
+def get_step_beats(steps_per_bar, beats_per_bar, bars):
+    """
+    Map every step of a section's grid to the beat it falls in.
+
+    Args:
+        steps_per_bar (int): Steps per bar of the grid (e.g. 12 for a bar of eighth-note triplets in 4/4).
+        beats_per_bar (int): Beats per bar of the section.
+        bars (int): The number of bars in the section.
+
+    Returns:
+        tuple: (beats, strong) tuples with one entry per step; strong marks steps that start a beat.
+    """
+    steps = range(steps_per_bar * bars)
+    return (tuple(step * beats_per_bar // steps_per_bar for step in steps),
+            tuple(step * beats_per_bar % steps_per_bar == 0 for step in steps))
+
+# 4. Fit Line to Harmony
+def fit_to_harmony(context, notes, grid, weak_steps="scale"):
+    """
+    Fit a line to the section's chords: notes starting a beat become chord tones.
+
+    Args:
+        context (HarmonicContext): The section's harmonic context.
+        notes (list): One MIDI note number (or None for a rest) per grid step.
+        grid (RhythmGrid): The grid the notes are placed on.
+        weak_steps (str): What to do with notes between beats: "scale" snaps them to the scale,
+                          "chord" to the chord and "free" leaves them (e.g. chromatic passing notes).
+
+    Returns:
+        list: The fitted notes, with None representing a rest.
+    """
+    beats, strong = get_step_beats(grid.steps_per_bar, context.beats_per_bar, context.bars)
+    chord_snaps, scale_snap = context.chord_snaps, context.scale_snap
+    if weak_steps == "chord":
+        strong = (True,) * len(strong)
+    elif weak_steps not in ("scale", "free"):
+        raise ValueError(f"Invalid weak_steps: {weak_steps}. Expected 'scale', 'chord' or 'free'.")
+    free = weak_steps == "free"
+    return [None if note is None
+            else chord_snaps[beat][min(127, max(0, note))] if on_beat
+            else note if free
+            else scale_snap[min(127, max(0, note))]
+            for note, beat, on_beat in zip(notes, beats, strong)]
+
+# 5. Bass Line
+def get_bass_line(context, steps_per_bar=None):
+    """
+    Return the chord root of every step, for a bass part.
+
+    Args:
+        context (HarmonicContext): The section's harmonic context.
+        steps_per_bar (int): Steps per bar of the bass grid; defaults to one step per beat.
+
+    Returns:
+        list: One MIDI note number per step.
+    """
+    if steps_per_bar is None or steps_per_bar == context.beats_per_bar:
+        return context.roots.tolist()
+    beats, _ = get_step_beats(steps_per_bar, context.beats_per_bar, context.bars)
+    roots = context.roots
+    return [roots[beat] for beat in beats]
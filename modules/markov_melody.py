@@ -0,0 +1,290 @@
+'''
+Markov Melody Module for MIDI Song Generator Application
+
+This module contains a genre-conditioned Markov melody engine. It includes functions for:-
+                - training transition tables offline from a local MIDI corpus
+                - saving the tables as compact memory-mapped binary files
+                - lazily loading the table of a genre on first use
+                - sampling a whole section of melody in one pass
+
+A melody is modelled as a chain of melodic intervals (in semitones, clamped to one octave
+either way) plus a rest state. Intervals are key-independent, so one table per genre can
+be reused for every key and scale; sampled pitches are snapped back onto the chosen scale.
+
+The corpus is expected to contain one sub-directory per genre, e.g. corpus/Jazz/*.mid.
+Tables can be trained from the command line:
+
+    python -m modules.markov_melody CORPUS_DIR OUTPUT_DIR
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.smf_reader import read_midi_notes
+from modules.music_program import generate_genre_specific_melody
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from itertools import accumulate
+import argparse
+import mmap
+import random
+import struct
+import logging
+
+MELODY_MODEL_DIR = os.path.join(project_root, "models", "melody")  # Default location of trained tables
+
+MAX_INTERVAL = 12  # Largest melodic leap modelled, in semitones
+REST_STATE = 2 * MAX_INTERVAL + 1  # State index used for rests
+NUM_STATES = REST_STATE + 1  # Interval states (-12..12) plus the rest state
+
+TABLE_MAGIC = b"MKV1"
+TABLE_HEADER = struct.Struct("<4sHH")  # magic, number of states, reserved
+TABLE_EXTENSION = ".bin"
+
+_TABLE_CACHE = {}  # (table_dir, genre) -> cumulative transition rows, or None if untrained
+
+# 1. Table File Names
+def get_table_path(table_dir, genre):
+    """
+    Return the path of the transition table file for a genre.
+
+    Args:
+        table_dir (str): Directory holding the trained tables.
+        genre (str): The musical genre (e.g., "Pop", "Jazz").
+
+    Returns:
+        str: The path of the table file.
+    """
+    file_stem = "".join(ch if ch.isalnum() else "_" for ch in genre.lower())
+    return os.path.join(table_dir, file_stem + TABLE_EXTENSION)
+
+# 2. Extract Melodic States
+def extract_melody_states(notes, ticks_per_quarter):
+    """
+    Convert the notes of one track into a sequence of Markov states.
+
+    Polyphony is reduced to the highest note at each onset and any gap of more than
+    one beat between notes is recorded as a rest.
+
+    Args:
+        notes (list): (tick, channel, pitch, velocity, duration) tuples sorted by tick.
+        ticks_per_quarter (int): The time division of the source file.
+
+    Returns:
+        list: A list of state indices.
+    """
+    line = {}
+    for tick, channel, pitch, _, duration in notes:
+        if channel == 9:
+            continue  # Drum channel carries no melody
+        if pitch > line.get(tick, (-1, 0))[0]:
+            line[tick] = (pitch, duration)
+
+    states = []
+    previous_pitch = None
+    previous_end = None
+    for tick in sorted(line):
+        pitch, duration = line[tick]
+        if previous_end is not None and tick - previous_end > ticks_per_quarter:
+            states.append(REST_STATE)
+        if previous_pitch is not None:
+            interval = max(-MAX_INTERVAL, min(MAX_INTERVAL, pitch - previous_pitch))
+            states.append(interval + MAX_INTERVAL)
+        previous_pitch = pitch
+        previous_end = tick + duration
+    return states
+
+# 3. Train Transition Counts
+def train_transition_counts(midi_files):
+    """
+    Count state transitions over a collection of MIDI files.
+
+    Args:
+        midi_files (list): Paths of the MIDI files to learn from.
+
+    Returns:
+        array: A flat NUM_STATES x NUM_STATES array of unsigned 32-bit counts.
+    """
+    counts = array("I", bytes(4 * NUM_STATES * NUM_STATES))
+    for file_name in midi_files:
+        try:
+            ticks_per_quarter, tracks = read_midi_notes(file_name)
+        except (OSError, ValueError, IndexError, struct.error) as e:
+            logging.warning(f"Skipping unreadable MIDI file '{file_name}': {e}")
+            continue
+        for notes in tracks:
+            states = extract_melody_states(notes, ticks_per_quarter)
+            for previous_state, state in zip(states, states[1:]):
+                counts[previous_state * NUM_STATES + state] += 1
+    return counts
+
+# 4. Save Transition Table
+def save_transition_table(counts, table_path):
+    """
+    Write a transition count table to disk.
+
+    Args:
+        counts (array): Flat array of transition counts.
+        table_path (str): Destination file.
+    """
+    os.makedirs(os.path.dirname(table_path) or ".", exist_ok=True)
+    if sys.byteorder != "little":
+        counts = array("I", counts)
+        counts.byteswap()
+    with open(table_path, "wb") as table_file:
+        table_file.write(TABLE_HEADER.pack(TABLE_MAGIC, NUM_STATES, 0))
+        counts.tofile(table_file)
+
+# 5. Train All Genres
+def train_markov_tables(corpus_dir, table_dir=MELODY_MODEL_DIR):
+    """
+    Train one transition table per genre sub-directory of a MIDI corpus.
+
+    Args:
+        corpus_dir (str): Directory with one sub-directory of MIDI files per genre.
+        table_dir (str): Directory the tables are written to.
+
+    Returns:
+        dict: Mapping of genre name to the number of files it was trained on.
+    """
+    trained = {}
+    for genre in sorted(os.listdir(corpus_dir)):
+        genre_dir = os.path.join(corpus_dir, genre)
+        if not os.path.isdir(genre_dir):
+            continue
+        midi_files = [
+            os.path.join(root, name)
+            for root, _, names in os.walk(genre_dir)
+            for name in names
+            if name.lower().endswith((".mid", ".midi"))
+        ]
+        if not midi_files:
+            continue
+        counts = train_transition_counts(midi_files)
+        save_transition_table(counts, get_table_path(table_dir, genre))
+        _TABLE_CACHE.pop((table_dir, genre), None)
+        trained[genre] = len(midi_files)
+        logging.info(f"Trained melody table for genre '{genre}' from {len(midi_files)} files.")
+    return trained
+
+# 6. Load Transition Table
+def load_transition_table(genre, table_dir=MELODY_MODEL_DIR):
+    """
+    Lazily load the cumulative transition rows of a genre.
+
+    The table file is memory-mapped and converted once into cumulative weights with
+    add-one smoothing, so that every later call is a dictionary lookup.
+
+    Args:
+        genre (str): The musical genre.
+        table_dir (str): Directory holding the trained tables.
+
+    Returns:
+        list: NUM_STATES lists of cumulative weights, or None if the genre is untrained.
+    """
+    cache_key = (table_dir, genre)
+    if cache_key in _TABLE_CACHE:
+        return _TABLE_CACHE[cache_key]
+
+    table_path = get_table_path(table_dir, genre)
+    rows = None
+    if os.path.exists(table_path):
+        with open(table_path, "rb") as table_file, \
+                mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            magic, num_states, _ = TABLE_HEADER.unpack_from(mapped, 0)
+            if magic != TABLE_MAGIC or num_states != NUM_STATES:
+                raise ValueError(f"Invalid melody table file: {table_path}")
+            counts = array("I", mapped[TABLE_HEADER.size:TABLE_HEADER.size + 4 * NUM_STATES * NUM_STATES])
+        if sys.byteorder != "little":
+            counts.byteswap()
+        rows = [
+            list(accumulate(count + 1 for count in counts[state * NUM_STATES:(state + 1) * NUM_STATES]))
+            for state in range(NUM_STATES)
+        ]
+        logging.info(f"Loaded melody table for genre '{genre}' from {table_path}")
+    else:
+        logging.info(f"No melody table for genre '{genre}' in {table_dir}.")
+
+    _TABLE_CACHE[cache_key] = rows
+    return rows
+
+# 7. Scale Snapping Table
+@lru_cache(maxsize=None)
+def get_scale_snap_table(pitch_classes):
+    """
+    Build a lookup table snapping every MIDI pitch to the nearest pitch of a scale.
+
+    Args:
+        pitch_classes (tuple): Sorted pitch classes (0-11) of the scale.
+
+    Returns:
+        tuple: 128 snapped MIDI pitches indexed by the unsnapped pitch.
+    """
+    scale_pitches = [octave * 12 + pc for octave in range(-1, 12) for pc in pitch_classes]
+    return tuple(min(scale_pitches, key=lambda candidate: (abs(candidate - pitch), candidate))
+                 for pitch in range(128))
+
+# 8. Generate Markov Melody
+def generate_markov_melody(genre, scale_notes, length, table_dir=MELODY_MODEL_DIR, config=None):
+    """
+    Generate a melody for a whole section by walking the genre's transition table.
+
+    All random numbers for the section are drawn up front and each step is a binary
+    search in a precomputed cumulative row. Falls back to generate_genre_specific_melody
+    when no table has been trained for the genre.
+
+    Args:
+        genre (str): The musical genre.
+        scale_notes (list): Notes in the scale.
+        length (int): Number of melody steps to generate.
+        table_dir (str): Directory holding the trained tables.
+        config (ConfigSnapshot): Configuration used by the fallback; defaults to the current snapshot.
+
+    Returns:
+        list: MIDI note numbers, with None representing a rest.
+    """
+    rows = load_transition_table(genre, table_dir)
+    if rows is None:
+        return generate_genre_specific_melody(genre, scale_notes, length, config=config)
+
+    snap = get_scale_snap_table(tuple(sorted({note % 12 for note in scale_notes})))
+    low = scale_notes[0] - 12
+    high = scale_notes[0] + 19
+    totals = [row[-1] for row in rows]
+    draws = [random.random() for _ in range(length)]
+
+    melody = []
+    state = MAX_INTERVAL  # Start as if the previous step repeated the tonic
+    pitch = scale_notes[0]
+    for draw in draws:
+        row = rows[state]
+        state = bisect_right(row, draw * totals[state])  # The first state whose cumulative weight exceeds the draw
+        if state == REST_STATE:
+            melody.append(None)
+            continue
+        pitch += state - MAX_INTERVAL
+        if pitch < low:
+            pitch += 12
+        elif pitch > high:
+            pitch -= 12
+        pitch = snap[pitch]
+        melody.append(pitch)
+    return melody
+
+# Train tables when this module is executed directly
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train genre melody tables from a MIDI corpus.")
+    parser.add_argument("corpus_dir", help="Directory with one sub-directory of MIDI files per genre.")
+    parser.add_argument("output_dir", nargs="?", default=MELODY_MODEL_DIR, help="Where to write the tables.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    results = train_markov_tables(args.corpus_dir, args.output_dir)
+    for trained_genre, file_count in results.items():
+        print(f"{trained_genre}: {file_count} files")
@@ -0,0 +1,399 @@
+'''
+Metrics Module for MIDI Song Generator Application
+
+This module measures long-running generation processes. It includes functions for:-
+                - counting songs, notes and encoded bytes
+                - timing generation stages into latency histograms
+                - reading the resident memory (RSS) of the process and the hit rates of the lookup caches
+                - serving the metrics as Prometheus text on a local HTTP port
+                - dumping the metrics as JSON to a file at a fixed interval (MetricsDump)
+                - carrying the metrics of worker processes back to the parent
+
+Metrics are off until enable_metrics() is called. While they are off, increment and
+observe return after one flag check, time_stage returns a shared no-op context manager
+and functions wrapped by timed() only add the flag check to each call.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from functools import wraps
+import json
+import threading
+import time
+import logging
+
+try:
+    import resource  # Not available on Windows
+except ImportError:
+    resource = None
+
+METRIC_PREFIX = "midi_generator_"
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Seconds
+QUANTILES = (0.5, 0.95, 0.99)  # Latency percentiles in the JSON dump
+DEFAULT_METRICS_PORT = 9464
+DEFAULT_DUMP_INTERVAL = 10.0  # Seconds between JSON dumps
+
+# lru_cache lookup tables whose hit rates are reported, if their module has been imported
+CACHED_FUNCTIONS = {
+    "rhythm_grid": ("modules.rhythm_grid", "_build_grid"),
+    "section_tables": ("modules.rhythm_grid", "get_section_tables"),
+    "genre_rules": ("modules.genre_plugins", "_compiled_rules"),
+    "progression_table": ("modules.progression_engine", "_compiled_table"),
+    "scale_snap": ("modules.markov_melody", "get_scale_snap_table"),
+}
+
+_enabled = False
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [bucket counts (the last one is +Inf), sum, count]
+_started = time.time()
+_NULL_CONTEXT = nullcontext()
+
+# 1. Switch Metrics On and Off
+def enable_metrics(enabled=True):
+    """Turn metric collection on (or off)."""
+    global _enabled
+    _enabled = enabled
+
+def metrics_enabled():
+    """Return True if metrics are being collected."""
+    return _enabled
+
+def reset_metrics():
+    """Forget all collected values."""
+    global _started
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+        _started = time.time()
+
+# 2. Record Values
+def increment(name, amount=1, **labels):
+    """
+    Add to a counter.
+
+    Args:
+        name (str): Counter name, e.g. "songs_total".
+        amount (float): Amount to add.
+        **labels: Label values, e.g. stage="compose".
+    """
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+def observe(name, value, **labels):
+    """
+    Record a value (in seconds) in a latency histogram.
+
+    Args:
+        name (str): Histogram name, e.g. "stage_seconds".
+        value (float): The observed value.
+        **labels: Label values, e.g. stage="compose".
+    """
+    if not _enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = [[0] * (len(LATENCY_BUCKETS) + 1), 0.0, 0]
+        histogram[0][bisect_left(LATENCY_BUCKETS, value)] += 1
+        histogram[1] += value
+        histogram[2] += 1
+
+@contextmanager
+def _timer(stage):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe("stage_seconds", time.perf_counter() - start, stage=stage)
+
+def time_stage(stage):
+    """
+    Return a context manager that records how long its block takes in "stage_seconds".
+
+    Args:
+        stage (str): Stage name, e.g. "encode".
+    """
+    return _timer(stage) if _enabled else _NULL_CONTEXT
+
+def timed(stage):
+    """
+    Decorator recording the duration of every call in "stage_seconds".
+
+    Args:
+        stage (str): Stage name, e.g. "compose".
+    """
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            with _timer(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+# 3. Process Gauges
+def get_rss_bytes():
+    """
+    Return the resident memory of this process in bytes.
+
+    Reads /proc on Linux; elsewhere falls back to the peak RSS from the resource module,
+    or None on platforms that have neither.
+    """
+    try:
+        with open("/proc/self/statm", "r") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    return get_peak_rss_bytes()
+
+def get_peak_rss_bytes():
+    """Return the peak resident memory of this process in bytes, or None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Bytes on macOS, kilobytes elsewhere
+
+def get_cache_stats():
+    """
+    Return the hits and misses of the lookup caches whose modules have been imported.
+
+    Returns:
+        dict: cache name -> (hits, misses)
+    """
+    stats = {}
+    for cache, (module_name, function_name) in CACHED_FUNCTIONS.items():
+        module = sys.modules.get(module_name)
+        function = getattr(module, function_name, None)
+        if function is not None and hasattr(function, "cache_info"):
+            info = function.cache_info()
+            stats[cache] = (info.hits, info.misses)
+    return stats
+
+# 4. Worker Processes
+def drain_metrics():
+    """
+    Return the values collected so far and reset them, for sending to another process.
+
+    Returns:
+        tuple: (counters, histograms), or None if metrics are off or nothing was recorded.
+    """
+    if not _enabled:
+        return None
+    with _lock:
+        if not _counters and not _histograms:
+            return None
+        state = (dict(_counters), {key: [list(buckets), total, count]
+                                   for key, (buckets, total, count) in _histograms.items()})
+        _counters.clear()
+        _histograms.clear()
+    return state
+
+def merge_metrics(state):
+    """
+    Add values returned by drain_metrics in another process.
+
+    Args:
+        state (tuple): The drained (counters, histograms), or None.
+    """
+    if state is None or not _enabled:
+        return
+    counters, histograms = state
+    with _lock:
+        for key, value in counters.items():
+            _counters[key] = _counters.get(key, 0) + value
+        for key, (buckets, total, count) in histograms.items():
+            histogram = _histograms.get(key)
+            if histogram is None:
+                _histograms[key] = [list(buckets), total, count]
+            else:
+                histogram[0] = [a + b for a, b in zip(histogram[0], buckets)]
+                histogram[1] += total
+                histogram[2] += count
+
+# 5. Snapshot
+def _label_name(labels):
+    return ",".join(f"{name}={value}" for name, value in labels)
+
+def _quantile(buckets, count, quantile):
+    # Upper bound of the bucket holding the quantile (the largest finite bound for the +Inf bucket)
+    rank = quantile * count
+    seen = 0
+    for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+        seen += bucket_count
+        if seen >= rank:
+            return bound
+    return LATENCY_BUCKETS[-1]
+
+def get_metrics_snapshot():
+    """
+    Return the current metrics as a JSON-serialisable dictionary.
+
+    Counters are reported with their rate per second since metrics were reset, histograms
+    with their count, mean and approximate percentiles.
+    """
+    elapsed = max(time.time() - _started, 1e-9)
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: (list(buckets), total, count) for key, (buckets, total, count) in _histograms.items()}
+
+    snapshot = {"uptime_seconds": round(elapsed, 3), "rss_bytes": get_rss_bytes(),
+                "peak_rss_bytes": get_peak_rss_bytes(), "counters": {}, "rates_per_second": {},
+                "histograms": {}, "caches": {}}
+    for (name, labels), value in sorted(counters.items()):
+        label = f"{name}{{{_label_name(labels)}}}" if labels else name
+        snapshot["counters"][label] = value
+        snapshot["rates_per_second"][label] = round(value / elapsed, 3)
+    for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+        label = f"{name}{{{_label_name(labels)}}}" if labels else name
+        summary = {"count": count, "mean": total / count if count else 0.0}
+        for quantile in QUANTILES:
+            summary[f"p{int(quantile * 100)}"] = _quantile(buckets, count, quantile)
+        snapshot["histograms"][label] = summary
+    for cache, (hits, misses) in get_cache_stats().items():
+        lookups = hits + misses
+        snapshot["caches"][cache] = {"hits": hits, "misses": misses,
+                                     "hit_rate": round(hits / lookups, 4) if lookups else None}
+    return snapshot
+
+# 6. Prometheus Text
+def _prometheus_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{value}"' for name, value in pairs) + "}"
+
+def render_prometheus():
+    """
+    Return the current metrics in the Prometheus text exposition format.
+
+    Returns:
+        str: The metrics text.
+    """
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: (list(buckets), total, count) for key, (buckets, total, count) in _histograms.items()}
+
+    lines = []
+    typed = set()
+    for (name, labels), value in sorted(counters.items()):
+        metric = METRIC_PREFIX + name
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} counter")
+            typed.add(metric)
+        lines.append(f"{metric}{_prometheus_labels(labels)} {value}")
+    for (name, labels), (buckets, total, count) in sorted(histograms.items()):
+        metric = METRIC_PREFIX + name
+        if metric not in typed:
+            lines.append(f"# TYPE {metric} histogram")
+            typed.add(metric)
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS + ("+Inf",), buckets):
+            cumulative += bucket_count
+            lines.append(f"{metric}_bucket{_prometheus_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{metric}_sum{_prometheus_labels(labels)} {total}")
+        lines.append(f"{metric}_count{_prometheus_labels(labels)} {count}")
+
+    lines.append(f"# TYPE {METRIC_PREFIX}uptime_seconds gauge")
+    lines.append(f"{METRIC_PREFIX}uptime_seconds {time.time() - _started:.3f}")
+    rss = get_rss_bytes()
+    if rss is not None:
+        lines.append(f"# TYPE {METRIC_PREFIX}rss_bytes gauge")
+        lines.append(f"{METRIC_PREFIX}rss_bytes {rss}")
+    cache_stats = get_cache_stats()
+    if cache_stats:
+        for kind, position in (("hits", 0), ("misses", 1)):
+            lines.append(f"# TYPE {METRIC_PREFIX}cache_{kind}_total counter")
+            for cache, stats in sorted(cache_stats.items()):
+                lines.append(f'{METRIC_PREFIX}cache_{kind}_total{{cache="{cache}"}} {stats[position]}')
+    return "\n".join(lines) + "\n"
+
+# 7. Prometheus Endpoint
+def start_metrics_server(port=DEFAULT_METRICS_PORT, host="127.0.0.1"):
+    """
+    Enable metrics and serve them at http://host:port/metrics from a background thread.
+
+    Args:
+        port (int): The port to listen on (0 picks a free port).
+        host (str): The address to bind; local only by default.
+
+    Returns:
+        ThreadingHTTPServer: The server; call shutdown() to stop it.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # Only loaded when serving
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logging.debug("Metrics request: " + format % args)
+
+    enable_metrics()
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logging.info(f"Serving metrics at http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+# 8. JSON Dump
+def write_metrics_json(file_name):
+    """Write a metrics snapshot to a JSON file, replacing it atomically."""
+    temporary_name = file_name + ".tmp"
+    with open(temporary_name, "w", encoding="utf-8") as dump_file:
+        json.dump(get_metrics_snapshot(), dump_file, indent=2)
+    os.replace(temporary_name, file_name)
+
+# Writes metrics snapshots to a JSON file from a background thread
+class MetricsDump:
+    def __init__(self, file_name, interval=DEFAULT_DUMP_INTERVAL):
+        """
+        Enable metrics and write a snapshot to a JSON file every interval seconds.
+
+        Args:
+            file_name (str): The JSON file.
+            interval (float): Seconds between dumps.
+        """
+        enable_metrics()
+        self.file_name = file_name
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-dump", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+        self._write()
+
+    def _write(self):
+        try:
+            write_metrics_json(self.file_name)
+        except OSError as e:
+            logging.error(f"Failed to write metrics to {self.file_name}: {e}")
+
+    def stop(self):
+        """Stop dumping after writing a final snapshot."""
+        self._stop.set()
+        self._thread.join()
@@ -0,0 +1,236 @@
+'''
+MIDI Diff Module for MIDI Song Generator Application
+
+This module compares MIDI files by what they play rather than byte by byte. It includes functions for:-
+                - reducing a file to a multiset of semantic events (paired notes, controller and
+                  program changes, meta and SysEx events) at times measured in quarter notes
+                - comparing two files and listing the events only one of them has
+                - comparing or validating whole directories of files in parallel
+
+Two files are equal when they hold the same events on the same tracks at the same times.
+The order of events at the same time, running status, note off encoding (note off or note on
+with velocity 0), note off velocities, the End of Track position and the file's resolution
+are ignored, so the output of an optimised encoder or pipeline can be checked against the
+current one.
+
+Example:
+    python -m modules.midi_diff baseline/ candidate/ --processes 8
+    python -m modules.midi_diff song.mid
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.smf_reader import iter_track_chunks, iter_track_events, validate_midi
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from fractions import Fraction
+import argparse
+import struct
+import logging
+
+MIDI_EXTENSIONS = (".mid", ".midi")
+IGNORED_META_TYPES = frozenset((0x2F,))  # End of Track
+MAX_REPORTED_EVENTS = 20  # Differing events kept per file by the batch functions
+DIFF_CHUNK_SIZE = 8  # File pairs handed to a worker at a time
+
+# The events only one of two files has, in time order; each list holds event tuples
+MidiDiff = namedtuple("MidiDiff", ["only_a", "only_b"])
+# The comparison of one file of a batch; the event lists are cut to MAX_REPORTED_EVENTS
+FileDiff = namedtuple("FileDiff", ["name", "problems_a", "problems_b", "count_a", "count_b", "only_a", "only_b"])
+
+# 1. Semantic Events
+def get_semantic_events(data, merge_tracks=False):
+    """
+    Reduce a MIDI file to a multiset of events.
+
+    Events are tuples (kind, track, time, ...), with the time in quarter notes as a Fraction:
+    ("note", track, time, channel, pitch, velocity, duration), ("channel", track, time, status,
+    data), ("meta", track, time, type, data) and ("sysex", track, time, status, data). A note
+    never switched off has a duration of None.
+
+    Args:
+        data (bytes): The raw MIDI data.
+        merge_tracks (bool): Ignore which track an event is on.
+
+    Returns:
+        Counter: Event tuple -> number of occurrences.
+    """
+    if data[:4] != b"MThd":
+        raise ValueError("Not a Standard MIDI File: missing MThd chunk.")
+    if len(data) < 14:
+        raise ValueError("Not a Standard MIDI File: the MThd chunk is cut short.")
+    length, _, _, division = struct.unpack(">LHHH", data[4:14])
+    if division == 0:
+        raise ValueError("Not a Standard MIDI File: the time division is 0.")
+    ticks_per_quarter = 1 if division & 0x8000 else division  # SMPTE files are compared in ticks
+
+    events = Counter()
+    for index, chunk in enumerate(iter_track_chunks(data, 8 + length)):
+        track = 0 if merge_tracks else index
+        sounding = {}  # (channel, pitch) -> [(start tick, velocity), ...]
+        for tick, status, event_data in iter_track_events(chunk):
+            kind = status & 0xF0
+            if status == 0xFF:
+                if event_data[0] not in IGNORED_META_TYPES:
+                    events["meta", track, Fraction(tick, ticks_per_quarter), event_data[0], bytes(event_data[1:])] += 1
+            elif status in (0xF0, 0xF7):
+                events["sysex", track, Fraction(tick, ticks_per_quarter), status, bytes(event_data)] += 1
+            elif kind == 0x90 and event_data[1] > 0:
+                sounding.setdefault((status & 0x0F, event_data[0]), []).append((tick, event_data[1]))
+            elif kind == 0x80 or kind == 0x90:
+                started = sounding.get((status & 0x0F, event_data[0]))
+                if started:
+                    start, velocity = started.pop(0)
+                    events["note", track, Fraction(start, ticks_per_quarter), status & 0x0F, event_data[0],
+                           velocity, Fraction(tick - start, ticks_per_quarter)] += 1
+            else:
+                events["channel", track, Fraction(tick, ticks_per_quarter), status, bytes(event_data)] += 1
+        for (channel, pitch), started in sounding.items():
+            for start, velocity in started:
+                events["note", track, Fraction(start, ticks_per_quarter), channel, pitch, velocity, None] += 1
+    return events
+
+def format_event(event):
+    """Return a readable description of a semantic event."""
+    kind, track, time = event[:3]
+    if kind == "note":
+        channel, pitch, velocity, duration = event[3:]
+        length = "never off" if duration is None else f"for {float(duration):g}"
+        return f"track {track} at {float(time):g}: note {pitch} channel {channel} velocity {velocity} {length}"
+    if kind == "meta":
+        return f"track {track} at {float(time):g}: meta 0x{event[3]:02X} {event[4].hex()}"
+    return f"track {track} at {float(time):g}: {kind} 0x{event[3]:02X} {event[4].hex()}"
+
+# 2. Diff Files
+def diff_midi(data_a, data_b, merge_tracks=False):
+    """
+    Compare two MIDI files event by event.
+
+    Args:
+        data_a (bytes): The first file.
+        data_b (bytes): The second file.
+        merge_tracks (bool): Ignore which track an event is on.
+
+    Returns:
+        MidiDiff: The events only the first and only the second file has; both empty if the
+                  files are equivalent.
+    """
+    return _diff_events(get_semantic_events(data_a, merge_tracks), get_semantic_events(data_b, merge_tracks))
+
+def _diff_events(events_a, events_b):
+    order = lambda event: (event[2], event[1], repr(event))
+    return MidiDiff(sorted((events_a - events_b).elements(), key=order),
+                    sorted((events_b - events_a).elements(), key=order))
+
+def _read(file_name):
+    with open(file_name, "rb") as midi_file:
+        return midi_file.read()
+
+def _diff_pair(job):
+    """Validate and compare one pair of files (a missing side's path is None); runs in a worker."""
+    name, file_a, file_b, merge_tracks, compare = job
+    data_a = _read(file_a) if file_a else None
+    data_b = _read(file_b) if file_b else None
+    problems = [validate_midi(data).problems if data is not None else ["missing"] for data in (data_a, data_b)]
+    if not compare:
+        return FileDiff(name, problems[0], [], 0, 0, [], [])
+    if data_a is None or data_b is None:
+        return FileDiff(name, problems[0], problems[1], 0, 0, [], [])
+    events = []
+    for data, side_problems in zip((data_a, data_b), problems):
+        try:
+            events.append(get_semantic_events(data, merge_tracks))
+        except (ValueError, struct.error, IndexError) as e:
+            side_problems.append(f"unreadable: {e}")
+    if len(events) < 2:
+        return FileDiff(name, problems[0], problems[1], 0, 0, [], [])
+    only_a, only_b = _diff_events(*events)
+    return FileDiff(name, problems[0], problems[1], len(only_a), len(only_b),
+                    only_a[:MAX_REPORTED_EVENTS], only_b[:MAX_REPORTED_EVENTS])
+
+# 3. Diff Directories
+def find_midi_files(directory):
+    """Return the relative paths of the MIDI files below a directory, sorted."""
+    names = []
+    for root, _, file_names in os.walk(directory):
+        for file_name in file_names:
+            if file_name.lower().endswith(MIDI_EXTENSIONS):
+                names.append(os.path.relpath(os.path.join(root, file_name), directory))
+    return sorted(names)
+
+def iter_directory_diffs(directory_a, directory_b=None, processes=None, merge_tracks=False):
+    """
+    Validate every MIDI file of a directory and compare it with its namesake in another.
+
+    Args:
+        directory_a (str): The first directory (e.g. the baseline).
+        directory_b (str): The second directory; without it the files are only validated.
+        processes (int): Number of worker processes (defaults to the CPU count; 1 runs in-process).
+        merge_tracks (bool): Ignore which track an event is on.
+
+    Yields:
+        FileDiff: One per file name found in either directory, in name order; a file missing
+                  from one side has the problem "missing" on that side.
+    """
+    names_a = find_midi_files(directory_a)
+    if directory_b is None:
+        jobs = [(name, os.path.join(directory_a, name), None, merge_tracks, False) for name in names_a]
+    else:
+        names_a, names_b = set(names_a), set(find_midi_files(directory_b))
+        jobs = [(name, os.path.join(directory_a, name) if name in names_a else None,
+                 os.path.join(directory_b, name) if name in names_b else None, merge_tracks, True)
+                for name in sorted(names_a | names_b)]
+    logging.info(f"Checking {len(jobs)} MIDI files.")
+
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(jobs) < 2:
+        yield from map(_diff_pair, jobs)
+        return
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        yield from executor.map(_diff_pair, jobs, chunksize=DIFF_CHUNK_SIZE)
+
+# Compare or validate MIDI files from the command line
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate MIDI files and compare them event by event.")
+    parser.add_argument("first", help="A MIDI file or a directory of them.")
+    parser.add_argument("second", nargs="?", help="The file or directory to compare with (omit to only validate).")
+    parser.add_argument("--processes", type=int, help="Worker processes for directories (default: CPU count).")
+    parser.add_argument("--merge-tracks", action="store_true", help="Ignore which track an event is on.")
+    args = parser.parse_args()
+
+    for path in (args.first, args.second):
+        if path is not None and not os.path.exists(path):
+            sys.exit(f"error: {path} does not exist")
+    if args.second is not None and os.path.isdir(args.first) != os.path.isdir(args.second):
+        sys.exit("error: compare a file with a file or a directory with a directory")
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if os.path.isdir(args.first):
+        results = iter_directory_diffs(args.first, args.second, args.processes, args.merge_tracks)
+    else:
+        name = os.path.basename(args.first)
+        results = [_diff_pair((name, args.first, args.second, args.merge_tracks, args.second is not None))]
+
+    checked = failed = 0
+    for result in results:
+        checked += 1
+        if not (result.problems_a or result.problems_b or result.count_a or result.count_b):
+            continue
+        failed += 1
+        print(f"{result.name}:")
+        for side, problems in (("first", result.problems_a), ("second", result.problems_b)):
+            for problem in problems:
+                print(f"  invalid {side}: {problem}")
+        for sign, count, events in (("-", result.count_a, result.only_a), ("+", result.count_b, result.only_b)):
+            for event in events:
+                print(f"  {sign} {format_event(event)}")
+            if count > len(events):
+                print(f"  {sign} ... {count - len(events)} more")
+    print(f"{checked} files checked, {failed} with problems or differences.")
+    sys.exit(1 if failed else 0)
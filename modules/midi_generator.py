@@ -13,13 +13,27 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 from modules.music_program import (
-    generate_scale_notes, generate_chord_progression, generate_genre_specific_melody,
+    generate_scale_notes, generate_chord_progression, get_chord_roots, generate_genre_specific_melody,
     add_dynamics, add_melody, modulate_key, add_ornamentation,
-    generate_musical_percussion_pattern, generate_countermelody, add_harmony, add_percussion
+    generate_musical_percussion_pattern, generate_countermelody, generate_harmony, add_harmony, add_percussion
 )
 
+from modules.markov_melody import generate_markov_melody
+from modules.progression_engine import generate_progression
+from modules.harmonic_context import build_harmonic_context, fit_to_harmony, get_bass_line
+from modules.rhythm_grid import get_grid, get_genre_grid
+from modules.tempo_map import DEFAULT_TEMPO_RESOLUTION, get_section_spans, build_tempo_map, write_tempo_map
+from modules.note_stream import DEFAULT_PPQ, NoteStream, check_ppq, grid_stream, event_stream, write_stream
+from modules.note_pipeline import get_write_stages, humanize_stream, run_pipeline
+from modules.arrangement import plan_arrangement, apply_arrangement
+from modules.track_allocator import allocate_tracks, add_track_setup
+from modules.config_registry import get_config
+from modules.metrics import increment, metrics_enabled, time_stage, timed
+
 from midiutil import MIDIFile
 from modules.music_program import generate_scale_notes, generate_chord_progression, generate_genre_specific_melody, add_dynamics, add_melody, modulate_key, add_ornamentation, generate_musical_percussion_pattern, generate_countermelody, add_harmony, add_percussion
+from collections import namedtuple
+import io
 import random
 import time
 import logging
@@ -28,12 +42,174 @@ random.seed(time.time())  # Seed the random number generator with the current ti
 
 BEATS_PER_BAR = 4  # Number of beats in one bar (default for 4/4 time signature)
 
-# Create MIDI 
-def create_midi(file_name, bpm, time_signature, scale, key, genre, instruments, sections,
-                enable_dynamic_tempo=False, enable_dynamics=False, enable_modulation=False,
-                enable_ornamentation=False, enable_countermelody=False, enable_percussion=True):
+# A composed song before encoding: its tracks, tempo map, section layout (SectionSpan tuples),
+# for every section the (parts, NoteStream) pairs of its notes, and the roles that play in
+# each section (None when every track plays throughout; see modules.arrangement)
+SongRender = namedtuple("SongRender", ["tracks", "tempo_map", "spans", "sections", "arrangement"])
+
+# The harmony of one section: its scale, chord names (one per bar), voiced chords, chord roots and HarmonicContext
+SectionHarmony = namedtuple("SectionHarmony", ["scale_notes", "progression", "chords", "roots", "context"])
+
+PART_ROLES = ("melody", "harmony", "rhythm", "bass", "percussion", "countermelody")  # Composition order
+
+# Section Scales
+def get_section_scales(spans, scale_notes, enable_modulation=False):
     """
-    Create a MIDI file based on the given parameters.
+    Return the scale notes of every section, applying key modulation if enabled.
+
+    Each bridge modulates up by 2 semitones, and later sections stay in the new key.
+
+    Args:
+        spans (list): The song's SectionSpan tuples.
+        scale_notes (list): Notes of the song's scale.
+        enable_modulation (bool): Modulate at bridges.
+
+    Returns:
+        list: One list of scale notes per section.
+    """
+    section_scales = []
+    for span in spans:
+        if enable_modulation and span.name.lower() == "bridge":
+            scale_notes = modulate_key(scale_notes, 2)  # Modulate up by 2 semitones
+        section_scales.append(scale_notes)
+    return section_scales
+
+# Plan Section Harmony
+def plan_section_harmony(span, genre, scale_notes, config, progression=None):
+    """
+    Voice a section's chord progression and expand it into a harmonic context.
+
+    Args:
+        span (SectionSpan): The section.
+        genre (str): The musical genre.
+        scale_notes (list): Notes of the section's scale.
+        config (ConfigSnapshot): Configuration to use.
+        progression (list): Chord names, one per bar; generated by the progression engine if omitted.
+
+    Returns:
+        SectionHarmony: The section's harmony.
+    """
+    if progression is None:
+        progression = generate_progression(genre, span.bars, config=config)
+    chords = generate_chord_progression(scale_notes, genre, progression, config)
+    # Taken from the chord names, since most voiced chords are inverted
+    roots = get_chord_roots(scale_notes, genre, progression, config)
+    context = build_harmonic_context(chords, scale_notes, get_grid(span.time_signature, config=config), span.bars,
+                                     roots)
+    return SectionHarmony(scale_notes, list(progression), chords, roots, context)
+
+# Compose Part
+def compose_part(role, span, genre, harmony, config, enable_ornamentation=True, melody_model_dir=None):
+    """
+    Compose the notes one role plays in a section.
+
+    Args:
+        role (str): One of PART_ROLES.
+        span (SectionSpan): The section.
+        genre (str): The musical genre.
+        harmony (SectionHarmony): The section's harmony.
+        config (ConfigSnapshot): Configuration to use.
+        enable_ornamentation (bool): Ornament the melody.
+        melody_model_dir (str): Directory of trained Markov melody tables, if any.
+
+    Returns:
+        NoteStream: The part's notes, or None if the generator produced nothing.
+    """
+    length, start_time = span.bars, span.start
+    scale_notes, chords, harmonic_context = harmony.scale_notes, harmony.chords, harmony.context
+
+    # Look up the section's precomputed rhythm grids (cached per time signature)
+    beat_grid = get_grid(span.time_signature, config=config)
+    melody_grid = get_genre_grid(genre, span.time_signature, "melody", config)
+    melody_steps = length * melody_grid.steps_per_bar
+
+    if role == "melody":
+        if melody_model_dir:
+            melody = generate_markov_melody(genre, scale_notes, melody_steps, melody_model_dir, config=config)
+        else:
+            melody = generate_genre_specific_melody(genre, scale_notes, melody_steps, config)
+        # Land on chord tones on the beat; keep the genre's passing notes in between
+        melody = fit_to_harmony(harmonic_context, melody, melody_grid, weak_steps="free")
+        melody_stream = grid_stream(melody, melody_grid, start_time, 100)
+        if enable_ornamentation:
+            melody_stream = add_ornamentation(melody_stream, genre, config)
+        return melody_stream
+
+    if role == "harmony":
+        return generate_harmony(chords, start_time, span.length / length, 80, genre, config)
+
+    if role == "rhythm":
+        rhythm_grid = get_genre_grid(genre, span.time_signature, "rhythm", config)
+        rhythm_pattern = generate_genre_specific_melody(genre, scale_notes, length * rhythm_grid.steps_per_bar, config)
+        rhythm_pattern = fit_to_harmony(harmonic_context, rhythm_pattern, rhythm_grid, weak_steps="chord")
+        return grid_stream(rhythm_pattern, rhythm_grid, start_time, 90, legato=0.8)
+
+    if role == "bass":
+        # Play the root note of the current chord on every beat
+        return grid_stream(get_bass_line(harmonic_context), beat_grid, start_time, 70)
+
+    if role == "percussion":
+        percussion_pattern = generate_musical_percussion_pattern(genre, length, span.time_signature, config)
+        if not percussion_pattern:
+            logging.warning("The percussion pattern is empty. Skipping percussion.")
+            return None
+        return event_stream(percussion_pattern, start_time, beat_grid.durations[0] / 2)
+
+    if role == "countermelody":
+        countermelody = generate_countermelody(scale_notes, melody_steps)
+        if not countermelody:
+            logging.warning("The countermelody is empty. Skipping countermelody.")
+            return None
+        countermelody = fit_to_harmony(harmonic_context, countermelody, melody_grid)
+        return grid_stream(countermelody, melody_grid, start_time, 90)
+
+    raise ValueError(f"Invalid role: {role}. Valid roles are: {list(PART_ROLES)}")
+
+# Shape Part
+def shape_part(stream, span, config, enable_dynamics=True, enable_humanize=False):
+    """
+    Shape the dynamics of a part over its section and humanize it, in place.
+
+    Args:
+        stream (NoteStream): The part's notes.
+        span (SectionSpan): The section.
+        config (ConfigSnapshot): Configuration to use.
+        enable_dynamics (bool): Apply the section's dynamic shape (see SECTION_DYNAMICS).
+        enable_humanize (bool): Humanize timing and velocity.
+    """
+    if enable_dynamics:
+        add_dynamics(stream, span.start, span.length, config.section_dynamics.get(span.name.lower(), "flat"))
+    if enable_humanize:
+        humanize_stream(stream)
+
+# Compose Song
+@timed("compose")
+def compose_song(bpm, time_signature, scale, key, genre, instruments, sections,
+                 enable_dynamic_tempo=False, enable_dynamics=True, enable_modulation=False,
+                 enable_ornamentation=True, enable_countermelody=False, enable_percussion=True,
+                 enable_humanize=False, enable_arrangement=True, melody_model_dir=None,
+                 tempo_resolution=DEFAULT_TEMPO_RESOLUTION, seed=None):
+    """
+    Compose a song based on the given parameters, without encoding it.
+
+    With a seed, the same parameters always compose the same song.
+
+    Sections are (name, bars) pairs, or (name, bars, time_signature) triples to change the
+    metre. Tempo and time signature changes are planned up front as a tempo map (see
+    modules.tempo_map), sampling dynamic tempo ramps every tempo_resolution quarter notes.
+
+    Each section's parts are built as note streams; ornamentation, dynamics and humanized
+    timing and velocity (see modules.note_pipeline) are applied to whole streams before any
+    note is written.
+
+    With arrangement enabled, every part is still composed for every section, and the genre's
+    arrangement rules (see modules.arrangement) choose which parts are written in each one.
+
+    If melody_model_dir is given, the melody is sampled from the genre's trained Markov
+    transition table in that directory (see modules.markov_melody).
+
+    Returns:
+        SongRender: The composed song; encode it with write_song.
     """
     # Validate inputs
     if not sections:
@@ -41,89 +217,150 @@ def create_midi(file_name, bpm, time_signature, scale, key, genre, instruments,
     if not instruments:
         raise ValueError("The 'instruments' list is empty. Please provide at least one instrument.")
 
-    # Calculate the number of tracks
-    num_tracks = len(instruments)
-    if enable_countermelody:
-        num_tracks += 1  # Add one track for countermelody
-    if enable_percussion:
-        num_tracks += 1  # Add one track for percussion
+    # Pin one configuration snapshot for the whole song, so a hot reload cannot change it mid-way
+    config = get_config()
+    if seed is not None:
+        random.seed(seed)
 
-    midi = MIDIFile(num_tracks)
-    start_time = 0  # Start time for the first note
+    # Allocate a track, channel and program for every part
+    tracks = allocate_tracks(instruments, enable_countermelody, enable_percussion, config)
+    roles = {}
+    for assignment in tracks:
+        roles.setdefault(assignment.role, []).append(assignment)
 
-    # Parse the time signature
-    beats_per_bar, beat_unit = map(int, time_signature.split("/"))
+    # Plan the tempo and time signature changes of the whole song
+    tempo_map = build_tempo_map(sections, bpm, time_signature, enable_dynamic_tempo, tempo_resolution, config)
+    spans = get_section_spans(sections, time_signature)
+    song_sections = []
 
-    # Generate scale notes and chord progression
-    scale_notes = generate_scale_notes(key, scale)
+    # Generate scale notes
+    scale_notes = generate_scale_notes(key, scale, config)
     if not scale_notes:
         raise ValueError(f"Failed to generate scale notes for key '{key}' and scale '{scale}'.")
 
-    chords = generate_chord_progression(scale_notes, genre)
+    for span, section_scale in zip(spans, get_section_scales(spans, scale_notes, enable_modulation)):
+        # One chord per bar, following the genre's progression rules and closing on a cadence
+        harmony = plan_section_harmony(span, genre, section_scale, config)
 
-    for section_name, length in sections:
-        section_length_in_beats = length * beats_per_bar
+        section_streams = []  # (parts, stream) pairs, written once the whole section is built
+        for role in PART_ROLES:
+            if role in roles:
+                stream = compose_part(role, span, genre, harmony, config, enable_ornamentation, melody_model_dir)
+                if stream is not None:
+                    shape_part(stream, span, config, enable_dynamics, enable_humanize)
+                    section_streams.append((roles[role], stream))
+        song_sections.append(section_streams)
 
-        # Apply dynamic tempo changes if enabled
-        if enable_dynamic_tempo:
-            if section_name.lower() == "intro":
-                current_bpm = bpm - 10
-            elif section_name.lower() == "outro":
-                current_bpm = bpm - 20
-            else:
-                current_bpm = bpm
-        else:
-            current_bpm = bpm
-        midi.addTempo(0, start_time, current_bpm)
+    if metrics_enabled():
+        increment("songs_total")
+        increment("notes_total", sum(len(stream) for section_streams in song_sections
+                                     for parts, stream in section_streams))
+    arrangement = plan_arrangement(genre, [span.name for span in spans], roles, config) if enable_arrangement else None
+    return SongRender(tracks, tempo_map, spans, song_sections, arrangement)
 
-        # Apply key modulation if enabled
-        if enable_modulation and section_name.lower() == "bridge":
-            scale_notes = modulate_key(scale_notes, 2)  # Modulate up by 2 semitones
+# Write Song
+@timed("write")
+def write_song(song, first_section=0, last_section=None, ppq=DEFAULT_PPQ):
+    """
+    Encode a composed song, or a run of its sections, as a MIDIFile.
 
-        # Add melody to the MIDI file
-        melody = generate_genre_specific_melody(genre, scale_notes, section_length_in_beats)
-        if enable_ornamentation:
-            melody = add_ornamentation(melody, genre)
-        add_melody(midi, 0, 0, melody, start_time, 1, 100)  # Track 0 for melody
+    Only the cached note streams of the chosen sections are written, shifted so that the
+    first chosen section starts at time 0; nothing is generated again. Each part's notes are
+    gathered over the region and go through the note pipeline's write stages (clamping,
+    conversion to integer ticks and overlap removal) once, so midiutil does not have to
+    deinterleave them or convert any times.
 
-        # Add harmony to the MIDI file
-        if enable_dynamics:
-            harmony = add_dynamics(chords, section_length_in_beats)
-        else:
-            harmony = chords
-        add_harmony(midi, 1, 1, harmony, start_time, 1, 80)  # Track 1 for harmony
-
-        # Add rhythm to the MIDI file
-        if len(instruments) > 2:
-            rhythm_pattern = generate_genre_specific_melody(genre, scale_notes, section_length_in_beats)
-            add_melody(midi, 2, 2, rhythm_pattern, start_time, 1, 90)  # Track 2 for rhythm
-
-        # Add bass to the MIDI file
-        if len(instruments) > 3:
-            bass_line = [chord[0] for chord in chords]  # Use the root note of each chord
-            add_melody(midi, 3, 3, bass_line, start_time, 1, 70)  # Track 3 for bass
-
-        # Generate percussion pattern
-        percussion_pattern = generate_musical_percussion_pattern(genre, section_length_in_beats)
-        if percussion_pattern:
-            add_percussion(midi, num_tracks - 1, 9, percussion_pattern, start_time, 1, 70)
-        else:
-            logging.warning("The percussion pattern is empty. Skipping percussion.")
+    Args:
+        song (SongRender): The composed song.
+        first_section (int): Index of the first section to write.
+        last_section (int): Index of the last section to write (defaults to the last one).
+        ppq (int): Resolution of the file in ticks per quarter note.
+
+    Returns:
+        MIDIFile: The encoded song or region, ready to be written.
+    """
+    if last_section is None:
+        last_section = len(song.spans) - 1
+    if not 0 <= first_section <= last_section < len(song.spans):
+        raise ValueError(f"Invalid section range {first_section}-{last_section} for a song of "
+                         f"{len(song.spans)} sections.")
+    start = song.spans[first_section].start
+    end = song.spans[last_section].start + song.spans[last_section].length
+
+    # Write the setup, tempo and time signature events up front, then the notes
+    check_ppq(ppq)
+    midi = MIDIFile(len(song.tracks), deinterleave=False, ticks_per_quarternote=ppq, eventtime_is_ticks=True)
+    add_track_setup(midi, song.tracks)
+    write_tempo_map(midi, song.tempo_map.region(start, end))
+    part_streams = {}
+    for index in range(first_section, last_section + 1):
+        mask = song.arrangement[index] if song.arrangement else None
+        for parts, stream in apply_arrangement(song.sections[index], mask):
+            part_streams.setdefault(tuple(parts), NoteStream()).extend(stream.shifted(-start) if start else stream)
+    for parts, stream in part_streams.items():
+        stream = run_pipeline(stream, get_write_stages(ppq))
+        for part in parts:
+            write_stream(midi, part.track, part.channel, stream)
+    return midi
+
+# Build MIDI
+def build_midi(bpm, time_signature, scale, key, genre, instruments, sections, ppq=DEFAULT_PPQ, **options):
+    """
+    Build an in-memory MIDIFile based on the given parameters.
 
-        # Generate and add countermelody
-        if enable_countermelody:
-            countermelody = generate_countermelody(scale_notes, section_length_in_beats)
-            if countermelody:
-                add_melody(midi, num_tracks - 1, 0, countermelody, start_time, 1, 90)
-            else:
-                logging.warning("The countermelody is empty. Skipping countermelody.")
+    Keyword options are passed on to compose_song; ppq sets the file's resolution.
 
-        start_time += section_length_in_beats
+    Returns:
+        MIDIFile: The composed song, ready to be written.
+    """
+    song = compose_song(bpm, time_signature, scale, key, genre, instruments, sections, **options)
+    return write_song(song, ppq=ppq)
+
+# Create MIDI 
+def create_midi(file_name, bpm, time_signature, scale, key, genre, instruments, sections, **options):
+    """
+    Create a MIDI file based on the given parameters.
+
+    Keyword options are passed on to build_midi.
+    """
+    midi = build_midi(bpm, time_signature, scale, key, genre, instruments, sections, **options)
 
     # Write the MIDI file
-    with open(file_name, "wb") as output_file:
+    with time_stage("encode"), open(file_name, "wb") as output_file:
         midi.writeFile(output_file)
 
+# Render MIDI Bytes
+def render_midi_bytes(bpm, time_signature, scale, key, genre, instruments, sections, ppq=DEFAULT_PPQ, **options):
+    """
+    Encode a song as Standard MIDI File bytes without touching the disk.
+
+    Keyword options are passed on to compose_song; ppq sets the file's resolution.
+
+    Returns:
+        bytes: The encoded MIDI file.
+    """
+    song = compose_song(bpm, time_signature, scale, key, genre, instruments, sections, **options)
+    return encode_song(song, ppq)
+
+# Encode Song
+def encode_song(song, ppq=DEFAULT_PPQ):
+    """
+    Encode a composed song as Standard MIDI File bytes.
+
+    Args:
+        song (SongRender): The composed song.
+        ppq (int): Resolution of the file in ticks per quarter note.
+
+    Returns:
+        bytes: The encoded MIDI file.
+    """
+    midi = write_song(song, ppq=ppq)
+    buffer = io.BytesIO()
+    with time_stage("encode"):
+        midi.writeFile(buffer)
+    increment("midi_bytes_total", buffer.tell())
+    return buffer.getvalue()
+
 ''' TEST FUNCTION '''
 
 # Test the imports from music_program.py (troulbeshooting due to execution problems)
@@ -25,7 +25,14 @@ if project_root not in sys.path:
 from modules.configuration import (
     INSTRUMENT_MAP, KEY_MAP, SCALE_INTERVALS, GENRE_CHORD_MAPS, GENRE_DEFAULTS, GENRE_SECTIONS
 )
+from modules.config_registry import get_config
+from modules.percussion_library import get_bar_template, expand_percussion
+from modules.genre_plugins import get_genre_rules
+from modules.progression_engine import generate_progression
+from modules.rhythm_grid import get_bar_length
+from modules.note_stream import NoteStream, event_stream, write_stream
 from midiutil import MIDIFile
+from array import array
 import random
 import time
 import logging
@@ -33,23 +40,62 @@ import logging
 random.seed(time.time())  # Seed the random number generator with the current time
 
 BEATS_PER_BAR = 4  # Number of beats in one bar (default for 4/4 time signature)
+REST_PROBABILITY = 0.15  # Chance of a rest on each melody step
+TRILL_STEP = 0.125  # Length of one trill note in quarter notes (a 32nd note)
+GRACE_LENGTH = 0.125  # Length of a grace note in quarter notes
+GRACE_SOFTER = 15  # Grace notes are played this much softer than their main note
+DYNAMIC_SHAPES = {"crescendo": 1, "decrescendo": -1, "flat": 0}
+DYNAMICS_RANGE = 30  # Velocity change over a whole crescendo or decrescendo
+DYNAMICS_VARIATION = 5  # Random velocity variation either side of the curve
 
 # 1. Generate Scale Notes
-def generate_scale_notes(key, scale):
+def generate_scale_notes(key, scale, config=None):
     """
     Generate MIDI note numbers for the given key and scale.
-    """
-    if key not in KEY_MAP:
-        raise ValueError(f"Invalid key: {key}. Valid keys are: {list(KEY_MAP.keys())}")
-    if scale not in SCALE_INTERVALS:
-        raise ValueError(f"Invalid scale: {scale}. Valid scales are: {list(SCALE_INTERVALS.keys())}")
 
-    root_note = KEY_MAP.get(key, 60)
-    intervals = SCALE_INTERVALS.get(scale, SCALE_INTERVALS["Major"])
+    The key and scale tables are read from config (defaults to the current configuration snapshot).
+    """
+    config = config or get_config()
+    key_map = config.key_map
+    scale_intervals = config.scale_intervals
+    if key not in key_map:
+        raise ValueError(f"Invalid key: {key}. Valid keys are: {list(key_map.keys())}")
+    if scale not in scale_intervals:
+        raise ValueError(f"Invalid scale: {scale}. Valid scales are: {list(scale_intervals.keys())}")
+
+    root_note = key_map.get(key, 60)
+    intervals = scale_intervals.get(scale, scale_intervals["Major"])
     return [root_note + interval for interval in intervals]
 
+# Apply Chord Rules
+def apply_chord_rules(chord, truncate, power, extensions, suspensions):
+    """
+    Shape a chord with one genre's compiled chord (or harmony) rules.
+
+    Args:
+        chord (list): MIDI note numbers, root first.
+        truncate (int): Keep only this many notes (None keeps all).
+        power (bool): Reduce the chord to root and fifth.
+        extensions (tuple): (probability, interval) notes to add above the root.
+        suspensions (tuple): (probability, interval) replacements for the third; the first that fires wins.
+
+    Returns:
+        list: The shaped chord.
+    """
+    chord = chord[:truncate] if truncate else list(chord)  # Never modify the caller's chord
+    if power:
+        chord = [chord[0], chord[0] + 7]  # Power chord (root and fifth)
+    for probability, interval in extensions:
+        if random.random() < probability:
+            chord.append(chord[0] + interval)
+    for probability, interval in suspensions:
+        if random.random() < probability:
+            chord[1] = chord[0] + interval  # Replace the third (e.g. sus2, sus4)
+            break
+    return chord
+
 # 2. Generate Chord Progression
-def generate_chord_progression(scale_notes, genre, progression=None):
+def generate_chord_progression(scale_notes, genre, progression=None, config=None):
     """
     Generate MIDI note numbers for a given chord progression with genre-specific rules.
 
@@ -57,73 +103,29 @@ def generate_chord_progression(scale_notes, genre, progression=None):
         scale_notes (list): Notes in the scale.
         genre (str): The musical genre (e.g., "Pop", "Jazz").
         progression (list): Optional predefined chord progression.
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
 
     Returns:
         list: A list of chords, where each chord is a list of MIDI note numbers.
     """
-    if genre not in GENRE_CHORD_MAPS:
+    genre_chord_maps = (config or get_config()).genre_chord_maps
+    if genre not in genre_chord_maps:
         logging.warning(f"Genre '{genre}' not found. Falling back to 'Pop'.")
         genre = "Pop"  # Fallback to a default genre
 
-    chord_map = GENRE_CHORD_MAPS.get(genre, GENRE_CHORD_MAPS["Pop"])
+    chord_map = genre_chord_maps.get(genre, genre_chord_maps["Pop"])
     if progression is None or not progression:
-        progression = random.choices(list(chord_map.keys()), k=4)  # Generate a random 4-chord progression
+        progression = generate_progression(genre, 4, config=config)  # A 4-chord progression following the genre's rules
 
+    rules = get_genre_rules(genre, config)
     chords = []
     for chord_name in progression:
         chord_intervals = chord_map[chord_name]
         chord = [scale_notes[i % len(scale_notes)] for i in chord_intervals]
 
-        # Apply genre-specific rules
-        if genre == "Jazz":
-            # Add 7ths, 9ths, or 13ths to chords
-            if random.random() > 0.5:
-                chord.append(chord[0] + 10)  # Add a minor 7th
-            if random.random() > 0.7:
-                chord.append(chord[0] + 14)  # Add a major 9th
-            if random.random() > 0.9:
-                chord.append(chord[0] + 21)  # Add a 13th
-        elif genre == "Classical":
-            # Keep chords simple (triads) and occasionally add a suspension
-            chord = chord[:3]
-            if random.random() > 0.8:
-                chord[1] = chord[0] + 5  # Replace the third with a fourth (suspension)
-        elif genre == "Pop":
-            # Occasionally add a 7th or a sus2/sus4
-            if random.random() > 0.8:
-                chord.append(chord[0] + 10)  # Add a minor 7th
-            if random.random() > 0.9:
-                chord[1] = chord[0] + 2  # Replace the third with a second (sus2)
-            elif random.random() > 0.9:
-                chord[1] = chord[0] + 5  # Replace the third with a fourth (sus4)
-        elif genre == "Rock":
-            # Use power chords (root and fifth) and occasionally add an octave
-            chord = [chord[0], chord[0] + 7]
-            if random.random() > 0.7:
-                chord.append(chord[0] + 12)  # Add an octave
-        elif genre == "Electronic":
-            # Add wide intervals and dissonance
-            if random.random() > 0.5:
-                chord.append(chord[0] + 11)  # Add a major 7th
-            if random.random() > 0.7:
-                chord.append(chord[0] + 13)  # Add a minor 9th
-        elif genre == "Folk":
-            # Keep chords simple and diatonic, occasionally add a sixth
-            if random.random() > 0.8:
-                chord.append(chord[0] + 9)  # Add a sixth
-        elif genre == "Hip-Hop":
-            # Use minor chords with added 7ths and 9ths for a jazzy feel
-            chord = chord[:3]
-            if random.random() > 0.5:
-                chord.append(chord[0] + 10)  # Add a minor 7th
-            if random.random() > 0.7:
-                chord.append(chord[0] + 14)  # Add a major 9th
-        elif genre == "Blues":
-            # Use dominant 7th chords
-            chord = chord[:3]
-            chord.append(chord[0] + 10)  # Add a minor 7th
-            if random.random() > 0.6:
-                chord.append(chord[0] + 14)  # Add a major 9th
+        # Apply genre-specific rules (see GENRE_RULES and modules.genre_plugins)
+        chord = apply_chord_rules(chord, rules.chord_truncate, rules.chord_power,
+                                  rules.chord_extensions, rules.chord_suspensions)
 
         # Randomly apply inversions
         if random.random() > 0.5:
@@ -134,46 +136,76 @@ def generate_chord_progression(scale_notes, genre, progression=None):
         chords.append(chord)
     return chords
 
+# Chord Roots
+def get_chord_roots(scale_notes, genre, progression, config=None):
+    """
+    Return the root of every chord of a progression, whatever inversion it is voiced in.
+
+    Args:
+        scale_notes (list): Notes in the scale.
+        genre (str): The musical genre; unknown genres use the 'Pop' chord map, as in generate_chord_progression.
+        progression (list): Chord names.
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
+
+    Returns:
+        list: One MIDI note number per chord.
+    """
+    genre_chord_maps = (config or get_config()).genre_chord_maps
+    chord_map = genre_chord_maps.get(genre, genre_chord_maps["Pop"])
+    return [scale_notes[chord_map[chord_name][0] % len(scale_notes)] for chord_name in progression]
+
 # 3. Generate Genre-Specific Melody
-def generate_genre_specific_melody(genre, scale_notes, length):
+def generate_genre_specific_melody(genre, scale_notes, length, config=None):
     """
     Generate genre-specific melodic patterns with randomness and variation.
+
+    The genre's compiled rules choose the note pool (scale or selected degrees), the
+    chromatic offset distribution and the octave-jump probability; every random choice
+    for the section is drawn in one batch.
     """
-    melody = []
-    for _ in range(length):
-        if random.random() < 0.15:  # 15% chance to add a rest
-            melody.append(None)  # Represent a rest with None
-            continue
-
-        note = random.choice(scale_notes)
-        if genre == "Jazz":
-            note += random.randint(-2, 2)  # Add chromatic tones
-        elif genre == "Classical":
-            note += random.randint(-1, 1)  # Add subtle variations
-        elif genre == "Rock":
-            note = random.choice([scale_notes[0], scale_notes[3], scale_notes[4]])  # Power chord notes
-        elif genre == "Electronic":
-            note += random.randint(-3, 3)  # Add wide variations
-        elif genre == "Pop":
-            note = random.choice([scale_notes[0], scale_notes[2], scale_notes[4]])  # Triad notes
-        elif genre == "Folk":
-            note = random.choice(scale_notes)  # Folk melodies are simple and scale-based
-            if random.random() < 0.3:  # 30% chance to add an octave variation
-                note += random.choice([-12, 12])
-
-        melody.append(note)
-    return melody
+    rules = get_genre_rules(genre, config)
+    if rules.melody_degrees:
+        pool = [scale_notes[degree % len(scale_notes)] for degree in rules.melody_degrees]
+    else:
+        pool = scale_notes
+
+    melody = random.choices(pool, k=length)
+    if rules.melody_offsets:
+        offsets = random.choices(rules.melody_offsets, cum_weights=rules.melody_offset_cum_weights, k=length)
+        melody = [note + offset for note, offset in zip(melody, offsets)]
+    if rules.melody_octave_jump:
+        octave_jump = rules.melody_octave_jump
+        melody = [note + random.choice((-12, 12)) if random.random() < octave_jump else note for note in melody]
+
+    # 15% chance of a rest on each step, represented by None
+    return [None if random.random() < REST_PROBABILITY else note for note in melody]
 
 # 4. Add Dynamics
-def add_dynamics(base_velocity, section_progress, crescendo=True):
+def add_dynamics(stream, start_time, section_length, shape="crescendo"):
     """
-    Apply crescendos, decrescendos, and random velocity variations.
+    Apply a crescendo or decrescendo curve and random velocity variations to a whole stream.
+
+    The curve is linear over the section and centred on the section's middle, so the
+    average level of the part is kept. The stream is updated in place and returned.
+
+    Args:
+        stream (NoteStream): The notes of one part of the section.
+        start_time (float): Start time of the section in quarter notes.
+        section_length (float): Length of the section in quarter notes.
+        shape (str): "crescendo", "decrescendo" or "flat" (see SECTION_DYNAMICS).
+
+    Returns:
+        NoteStream: The stream with its new velocities.
     """
-    variation = random.randint(-10, 20)  # Reduce variation for more subtle changes
-    if crescendo:
-        return max(0, min(127, base_velocity + int(30 * section_progress) + variation))
-    else:
-        return max(0, min(127, base_velocity - int(30 * section_progress) + variation))
+    if shape not in DYNAMIC_SHAPES:
+        raise ValueError(f"Unknown dynamic shape: {shape}")
+    slope = DYNAMIC_SHAPES[shape] * DYNAMICS_RANGE / section_length
+    middle = start_time + section_length / 2
+    variations = random.choices(range(-DYNAMICS_VARIATION, DYNAMICS_VARIATION + 1), k=len(stream))
+    stream.velocities = array("B", (max(1, min(127, int(velocity + slope * (time - middle)) + variation))
+                                    for time, velocity, variation
+                                    in zip(stream.times, stream.velocities, variations)))
+    return stream
 
 # 5. Note duration variations 
 def add_melody(midi, track, channel, melody, start_time, base_duration, velocity):
@@ -200,88 +232,65 @@ def modulate_key(scale_notes, steps):
     return [note + steps for note in scale_notes]
 
 # 7. Randomly add ornamentation to notes
-def add_ornamentation(note, genre):
+def add_ornamentation(stream, genre, config=None):
     """
-    Add ornamentation to a note based on the genre.
+    Add trills and grace notes to a whole stream based on the genre's ornament probabilities.
+
+    A trill alternates the note with its upper neighbour in TRILL_STEP steps and ends on the
+    note; a grace note from below takes GRACE_LENGTH (at most a quarter of the note) from
+    the start of the note.
+
+    Args:
+        stream (NoteStream): The notes of one part of the section.
+        genre (str): The musical genre.
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
+
+    Returns:
+        NoteStream: A new, ornamented stream (or the original one if the genre has no ornaments).
     """
-    if genre == "Classical" and random.random() < 0.5:  # 30% chance for trills
-        return [note, note + 1, note]
-    elif genre == "Jazz" and random.random() < 0.2:  # 20% chance for grace notes
-        return [note - 1, note]
-    elif genre == "Pop" and random.random() < 0.2:  # 20% chance for grace notes
-        return [note - 1, note]
-    elif genre == "Rock" and random.random() < 0.4:  # 20% chance for grace notes
-        return [note - 1, note]
-    return [note]
+    rules = get_genre_rules(genre, config)
+    trill = rules.ornament_trill
+    grace = trill + rules.ornament_grace
+    if not grace or not len(stream):
+        return stream
+
+    ornamented = NoteStream()
+    append = ornamented.append
+    draws = [random.random() for _ in range(len(stream))]
+    for (time, duration, pitch, velocity), draw in zip(stream, draws):
+        if draw < trill:
+            steps = max(3, int(duration / TRILL_STEP) | 1)  # An odd number of steps ends on the main note
+            step = duration / steps
+            for index in range(steps):
+                append(time + index * step, step, pitch + (index & 1), velocity)
+        elif draw < grace:
+            length = min(GRACE_LENGTH, duration / 4)
+            append(time, length, pitch - 1, max(1, velocity - GRACE_SOFTER))
+            append(time + length, duration - length, pitch, velocity)
+        else:
+            append(time, duration, pitch, velocity)
+    return ornamented
 
 # 8. Generate Percussion Pattern
-def generate_musical_percussion_pattern(genre, length_in_beats):
+def generate_musical_percussion_pattern(genre, length_in_bars, time_signature="4/4", config=None):
     """
     Generate musical percussion patterns for the given genre with structured rhythms and dynamic variations.
-    """
-    genre_patterns = {
-        "Rock": {
-            "kick": [1, 0, 1, 0],  # Kick on beats 1 and 3
-            "snare": [0, 1, 0, 1],  # Snare on beats 2 and 4
-            "hihat": [1, 1, 1, 1]  # Hi-hat on all beats
-        },
-        "Jazz": {
-            "ride": [1, 0.5, 1, 0.5],  # Swing ride pattern
-            "snare": [0, 0.5, 0, 0.5],  # Light snare accents
-            "kick": [1, 0, 0, 0]  # Sparse kick hits
-        },
-        "Electronic": {
-            "kick": [1, 0, 1, 0],  # Kick on beats 1 and 3
-            "clap": [0, 1, 0, 1],  # Clap on beats 2 and 4
-            "hihat": [1, 1, 1, 1]  # Hi-hat on all beats
-        },
-        "Pop": {
-            "kick": [1, 0, 1, 0],  # Kick on beats 1 and 3
-            "snare": [0, 1, 0, 1],  # Snare on beats 2 and 4
-            "hihat": [1, 1, 1, 1]  # Hi-hat on all beats
-        },
-        "Folk": {
-            "kick": [1, 0, 0, 0],  # Kick on beat 1
-            "shaker": [1, 1, 1, 1],  # Shaker on all beats
-            "tambourine": [0, 1, 0, 1]  # Tambourine on beats 2 and 4
-        },
-        "Classical": {
-            "timpani": [1, 0, 0, 1],  # Timpani on beats 1 and 4
-            "cymbals": [0, 0, 1, 0],  # Cymbals on beat 3
-            "bass_drum": [1, 0, 0, 0],  # Bass drum on beat 1
-            "triangle": [0, 1, 0, 1]  # Triangle on beats 2 and 4
-        }
-    }
-
-    pattern = genre_patterns.get(genre, genre_patterns["Pop"])
-    percussion = []
-
-    for beat in range(length_in_beats):
-        # Add timpani
-        if pattern.get("timpani", [])[beat % 4]:
-            percussion.append(47)  # Timpani
-        else:
-            percussion.append(None)
-
-        # Add cymbals
-        if pattern.get("cymbals", [])[beat % 4]:
-            percussion.append(49)  # Cymbals
-        else:
-            percussion.append(None)
 
-        # Add bass drum
-        if pattern.get("bass_drum", [])[beat % 4]:
-            percussion.append(35)  # Bass drum
-        else:
-            percussion.append(None)
+    The genre's bar template is compiled once from config/percussion_patterns.json
+    (see modules.percussion_library) and tiled across the section.
 
-        # Add triangle
-        if pattern.get("triangle", [])[beat % 4]:
-            percussion.append(81)  # Triangle
-        else:
-            percussion.append(None)
+    Args:
+        genre (str): The musical genre.
+        length_in_bars (int): The number of bars in the section.
+        time_signature (str): The time signature of the section.
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
 
-    logging.debug(f"Generated percussion pattern for genre '{genre}': {percussion}")
+    Returns:
+        list: (offset, drum_note, velocity) events, with offsets in quarter notes from the section start.
+    """
+    template = get_bar_template(genre, time_signature, config)
+    percussion = expand_percussion(template, get_bar_length(time_signature), length_in_bars)
+    logging.debug(f"Generated {len(percussion)} percussion events for genre '{genre}' in {time_signature}")
     return percussion
 
 # 9. Generate Countermelody
@@ -304,75 +313,84 @@ def add_melody(midi, track, channel, melody, start_time, duration, velocity):
         if note is not None:  # Skip rests
             midi.addNote(track, channel, note, start_time + i, duration, velocity)
 
-# 11. Add Harmony
-def add_harmony(midi, track, channel, chords, start_time, duration, base_velocity, genre=None):
+# 11. Generate Harmony
+def generate_harmony(chords, start_time, duration, base_velocity, genre=None, config=None):
     """
-    Add harmonies (chords) to the MIDI file with dynamic velocity and genre-specific variations.
+    Voice chords with dynamic velocity and genre-specific variations.
 
     Args:
-        midi (MIDIFile): The MIDI file object.
-        track (int): The track number for harmony.
-        channel (int): The MIDI channel for harmony.
         chords (list): A list of chords, where each chord is a list of MIDI note numbers.
         start_time (float): The start time for the harmony.
         duration (float): The duration of each chord.
         base_velocity (int): The base velocity (volume) of the notes.
         genre (str): The musical genre (optional, for genre-specific harmonic rules).
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
+
+    Returns:
+        NoteStream: The voiced chords.
     """
+    harmony = NoteStream()
+    rules = get_genre_rules(genre, config) if genre else None
     previous_chord = None
     for i, chord in enumerate(chords):
         # Apply voice leading: minimize movement between notes
         if previous_chord:
             chord = sorted(chord, key=lambda note: min(abs(note - prev) for prev in previous_chord))
 
-        # Apply genre-specific harmonic variations
-        if genre == "Jazz":
-            # Add extensions like 9ths, 11ths, or 13ths
-            if random.random() > 0.5:
-                chord.append(chord[0] + 14)  # Add a major 9th
-            if random.random() > 0.7:
-                chord.append(chord[0] + 17)  # Add an 11th
-            if random.random() > 0.9:
-                chord.append(chord[0] + 21)  # Add a 13th
-        elif genre == "Classical":
-            # Use inversions to create smoother transitions
-            if random.random() > 0.5:
-                chord = chord[1:] + [chord[0] + 12]  # First inversion
-            elif random.random() > 0.5:
-                chord = chord[2:] + [chord[0] + 12, chord[1] + 12]  # Second inversion
-        elif genre == "Pop":
-            # Add occasional sus2 or sus4 chords
-            if random.random() > 0.8:
-                chord[1] = chord[0] + 2  # Replace the third with a second (sus2)
-            elif random.random() > 0.8:
-                chord[1] = chord[0] + 5  # Replace the third with a fourth (sus4)
-        elif genre == "Rock":
-            # Use power chords (root and fifth) with occasional octaves
-            chord = [chord[0], chord[0] + 7]
-            if random.random() > 0.7:
-                chord.append(chord[0] + 12)  # Add an octave
-
-        # Add each note in the chord to the MIDI file
+        # Apply genre-specific harmonic variations (see GENRE_RULES and modules.genre_plugins)
+        if rules:
+            chord = apply_chord_rules(chord, rules.harmony_truncate, rules.harmony_power,
+                                      rules.harmony_extensions, rules.harmony_suspensions)
+            if rules.harmony_inversion:
+                # Use inversions to create smoother transitions
+                if random.random() < rules.harmony_inversion:
+                    chord = chord[1:] + [chord[0] + 12]  # First inversion
+                elif random.random() < rules.harmony_inversion:
+                    chord = chord[2:] + [chord[0] + 12, chord[1] + 12]  # Second inversion
+
+        # Add each note in the chord to the stream
         for note in chord:
-            velocity = base_velocity + random.randint(-10, 10)  # Add slight velocity variation
-            midi.addNote(track, channel, note, start_time + i * duration, duration, velocity)
+            velocity = max(1, min(127, base_velocity + random.randint(-10, 10)))  # Add slight velocity variation
+            harmony.append(start_time + i * duration, duration, note, velocity)
 
         # Update the previous chord for voice leading
         previous_chord = chord
+    return harmony
 
-# 12. Add Percussion
-def add_percussion(midi, track, channel, percussion_pattern, start_time, duration, velocity):
-    logging.debug(f"Adding percussion: track={track}, channel={channel}, pattern={percussion_pattern}, "
-                  f"start_time={start_time}, duration={duration}, velocity={velocity}")   
+# 12. Add Harmony
+def add_harmony(midi, track, channel, chords, start_time, duration, base_velocity, genre=None, config=None):
     """
-    Add percussion patterns to the MIDI file.
+    Add harmonies (chords) to the MIDI file with dynamic velocity and genre-specific variations.
+
+    Args:
+        midi (MIDIFile): The MIDI file object.
+        track (int): The track number for harmony.
+        channel (int): The MIDI channel for harmony.
+        chords (list): A list of chords, where each chord is a list of MIDI note numbers.
+        start_time (float): The start time for the harmony.
+        duration (float): The duration of each chord.
+        base_velocity (int): The base velocity (volume) of the notes.
+        genre (str): The musical genre (optional, for genre-specific harmonic rules).
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
     """
-    for i, hit in enumerate(percussion_pattern):
-        if hit is not None:  # Only add notes where the pattern specifies a hit
-            midi.addNote(track, channel, hit, start_time + i, duration, velocity)
+    write_stream(midi, track, channel, generate_harmony(chords, start_time, duration, base_velocity, genre, config))
 
+# 13. Add Percussion
+def add_percussion(midi, track, channel, percussion_events, start_time, duration):
+    """
+    Add percussion events to the MIDI file.
 
-            logging.debug(f"Added percussion note: {hit} at time {start_time + i} with velocity {velocity}")
+    Args:
+        midi (MIDIFile): The MIDI file object.
+        track (int): The track number for percussion.
+        channel (int): The MIDI channel for percussion (9 for General MIDI drums).
+        percussion_events (list): (offset, drum_note, velocity) events.
+        start_time (float): The start time of the section.
+        duration (float): The duration of each hit.
+    """
+    logging.debug(f"Adding percussion: track={track}, channel={channel}, events={len(percussion_events)}, "
+                  f"start_time={start_time}, duration={duration}")
+    write_stream(midi, track, channel, event_stream(percussion_events, start_time, duration))
 
 ''' TEST FUINCTION '''
 
@@ -0,0 +1,192 @@
+'''
+Note Pipeline Module for MIDI Song Generator Application
+
+This module cleans up note streams before they are written. It includes functions for:-
+                - quantizing note starts and ends to a grid
+                - humanizing timing and velocity
+                - clamping pitches, velocities and durations to valid ranges
+                - merging or trimming overlapping notes of the same pitch
+                - running a stream through a sequence of these stages
+
+Stages take a NoteStream and return one; quantize, humanize and clamp work column by column
+in place on quarter-note streams, and merge_overlaps sorts the notes once by time and sweeps
+them with the last note of every pitch at hand. The write stages convert the stream to
+integer ticks (see modules.note_stream.to_ticks) before merging, so overlaps are found
+exactly. Streams that have been through merge_overlaps never hold two sounding notes of the
+same pitch, so midiutil's own deinterleaving pass is not needed.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.note_stream import NoteStream, TickStream, to_ticks
+from array import array
+from functools import lru_cache, partial
+import random
+
+TIME_EPSILON = 1e-6  # Times closer than this (in quarter notes) count as equal
+MIN_DURATION = 1 / 64  # Shortest note kept by clamp_stream, in quarter notes
+HUMANIZE_TIMING = 0.01  # Standard deviation of humanized note starts, in quarter notes
+HUMANIZE_VELOCITY = 4  # Largest humanized velocity change either way
+OVERLAP_MODES = ("trim", "merge")
+
+# 1. Quantize
+def quantize_stream(stream, step, strength=1.0):
+    """
+    Move note starts and ends towards the nearest multiple of a grid step.
+
+    Args:
+        stream (NoteStream): The notes; changed in place.
+        step (float): Grid step in quarter notes.
+        strength (float): 1.0 snaps fully, 0.0 leaves the notes alone.
+
+    Returns:
+        NoteStream: The same stream.
+    """
+    if step <= 0:
+        raise ValueError(f"Invalid quantize step: {step}. It must be positive.")
+    starts = [time + (round(time / step) * step - time) * strength for time in stream.times]
+    ends = [end + (round(end / step) * step - end) * strength
+            for end in (time + duration for time, duration in zip(stream.times, stream.durations))]
+    minimum = step * strength if strength else MIN_DURATION  # A note never collapses to nothing
+    stream.times = array("d", starts)
+    stream.durations = array("d", (max(minimum, end - start) for start, end in zip(starts, ends)))
+    return stream
+
+# 2. Humanize
+def humanize_stream(stream, timing=HUMANIZE_TIMING, velocity=HUMANIZE_VELOCITY):
+    """
+    Add small random variations to note starts and velocities.
+
+    Args:
+        stream (NoteStream): The notes; changed in place.
+        timing (float): Standard deviation of the start offsets, in quarter notes.
+        velocity (int): Largest velocity change either way.
+
+    Returns:
+        NoteStream: The same stream.
+    """
+    count = len(stream)
+    if timing:
+        gauss = random.gauss
+        stream.times = array("d", (max(0.0, time + gauss(0.0, timing)) for time in stream.times))
+    if velocity:
+        changes = random.choices(range(-velocity, velocity + 1), k=count)
+        stream.velocities = array("B", (max(1, min(127, value + change))
+                                        for value, change in zip(stream.velocities, changes)))
+    return stream
+
+# 3. Clamp
+def clamp_stream(stream, low_pitch=0, high_pitch=127, min_duration=MIN_DURATION):
+    """
+    Bring every note into a valid range.
+
+    Pitches outside the range are moved by octaves until they fit (or clipped, if the range
+    is narrower than an octave), negative times become 0 and durations are at least
+    min_duration. Velocities are stored as unsigned bytes and are clipped to 1-127.
+
+    Args:
+        stream (NoteStream): The notes; changed in place.
+        low_pitch (int): Lowest allowed pitch.
+        high_pitch (int): Highest allowed pitch.
+        min_duration (float): Shortest allowed duration, in quarter notes.
+
+    Returns:
+        NoteStream: The same stream.
+    """
+    def fit(pitch):
+        while pitch < low_pitch and pitch + 12 <= high_pitch:
+            pitch += 12
+        while pitch > high_pitch and pitch - 12 >= low_pitch:
+            pitch -= 12
+        return max(low_pitch, min(high_pitch, pitch))
+
+    if any(pitch < low_pitch or pitch > high_pitch for pitch in stream.pitches):
+        stream.pitches = array("h", (fit(pitch) for pitch in stream.pitches))
+    if any(time < 0 for time in stream.times):
+        stream.times = array("d", (max(0.0, time) for time in stream.times))
+    if any(duration < min_duration for duration in stream.durations):
+        stream.durations = array("d", (max(min_duration, duration) for duration in stream.durations))
+    if any(velocity < 1 or velocity > 127 for velocity in stream.velocities):
+        stream.velocities = array("B", (max(1, min(127, velocity)) for velocity in stream.velocities))
+    return stream
+
+# 4. Merge Overlaps
+def merge_overlaps(stream, mode="trim"):
+    """
+    Remove overlaps between notes of the same pitch.
+
+    Notes starting together become one note (the longer duration, the louder velocity).
+    When a note starts while an earlier one of the same pitch still sounds, "trim" ends
+    the earlier note there and "merge" joins the two into one longer note.
+
+    Args:
+        stream (NoteStream): The notes, in quarter notes or ticks (TickStream).
+        mode (str): "trim" or "merge".
+
+    Returns:
+        NoteStream: A new stream of the same kind, in time order.
+    """
+    if mode not in OVERLAP_MODES:
+        raise ValueError(f"Invalid overlap mode: {mode}. Valid modes are: {list(OVERLAP_MODES)}")
+    times, durations, pitches, velocities = stream.times, stream.durations, stream.pitches, stream.velocities
+    order = sorted(range(len(times)), key=times.__getitem__)
+
+    out_times, out_ends, out_pitches, out_velocities = [], [], [], []
+    last = {}  # pitch -> position of its latest note in the output
+    for index in order:
+        time, pitch = times[index], pitches[index]
+        end = time + durations[index]
+        previous = last.get(pitch)
+        if previous is not None and time < out_ends[previous] - TIME_EPSILON:
+            if mode == "merge" or time - out_times[previous] <= TIME_EPSILON:
+                out_ends[previous] = max(out_ends[previous], end)
+                out_velocities[previous] = max(out_velocities[previous], velocities[index])
+                continue
+            out_ends[previous] = time  # Trim: re-strike the note
+        last[pitch] = len(out_times)
+        out_times.append(time)
+        out_ends.append(end)
+        out_pitches.append(pitch)
+        out_velocities.append(velocities[index])
+
+    out_durations = (end - time for time, end in zip(out_times, out_ends))
+    if isinstance(stream, TickStream):
+        return TickStream(out_times, out_durations, out_pitches, out_velocities, stream.ppq)
+    return NoteStream(out_times, out_durations, out_pitches, out_velocities)
+
+# 5. Run Pipeline
+def run_pipeline(stream, stages):
+    """
+    Pass a stream through a sequence of stages.
+
+    Args:
+        stream (NoteStream): The notes.
+        stages (iterable): Functions taking and returning a NoteStream (use functools.partial
+                           to fix their options).
+
+    Returns:
+        NoteStream: The processed stream.
+    """
+    for stage in stages:
+        stream = stage(stream)
+    return stream
+
+# 6. Write Stages
+@lru_cache(maxsize=None)
+def get_write_stages(ppq):
+    """
+    Return the stages every stream goes through before it is written at a resolution.
+
+    Args:
+        ppq (int): Ticks per quarter note of the MIDI file.
+
+    Returns:
+        tuple: clamp_stream, conversion to ticks and merge_overlaps.
+    """
+    return (clamp_stream, partial(to_ticks, ppq=ppq), merge_overlaps)
@@ -0,0 +1,180 @@
+'''
+Note Stream Module for MIDI Song Generator Application
+
+This module holds the notes of one part of a song section as parallel arrays. It includes functions for:-
+                - placing a sequence of notes on a rhythm grid
+                - turning percussion events into a stream
+                - converting a stream to integer ticks at a chosen resolution (PPQ)
+                - writing a stream to a MIDI track in one batch
+
+Generators build streams, whole-stream stages (ornamentation, dynamics) transform them,
+and only the final stage touches the MIDIFile. Times and durations are in quarter notes
+until the stream is converted to a TickStream for writing; from then on they are integer
+ticks, so sorting, overlap checks and delta encoding are exact.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.rhythm_grid import get_section_tables
+from array import array
+
+DEFAULT_PPQ = 960  # Ticks per quarter note (midiutil's default resolution)
+MAX_PPQ = 0x7FFF  # Largest resolution a Standard MIDI File header can hold
+
+# The notes of one part, stored column by column
+class NoteStream:
+    __slots__ = ("times", "durations", "pitches", "velocities")
+
+    def __init__(self, times=(), durations=(), pitches=(), velocities=()):
+        self.times = array("d", times)
+        self.durations = array("d", durations)
+        self.pitches = array("h", pitches)
+        self.velocities = array("B", velocities)
+
+    def __len__(self):
+        return len(self.times)
+
+    def __iter__(self):
+        """Iterate over (time, duration, pitch, velocity) rows."""
+        return zip(self.times, self.durations, self.pitches, self.velocities)
+
+    def __repr__(self):
+        return f"NoteStream({len(self)} notes)"
+
+    def append(self, time, duration, pitch, velocity):
+        """Add one note to the end of the stream."""
+        self.times.append(time)
+        self.durations.append(duration)
+        self.pitches.append(pitch)
+        self.velocities.append(velocity)
+
+    def shifted(self, offset):
+        """Return a copy of the stream with every note moved by offset quarter notes."""
+        shifted = NoteStream()
+        shifted.times = array("d", (time + offset for time in self.times))
+        shifted.durations = array("d", self.durations)
+        shifted.pitches = array("h", self.pitches)
+        shifted.velocities = array("B", self.velocities)
+        return shifted
+
+    def extend(self, other):
+        """Add all notes of another stream to the end of this one."""
+        self.times.extend(other.times)
+        self.durations.extend(other.durations)
+        self.pitches.extend(other.pitches)
+        self.velocities.extend(other.velocities)
+
+# The notes of one part with integer tick times and durations at a given resolution
+class TickStream(NoteStream):
+    __slots__ = ("ppq",)
+
+    def __init__(self, times=(), durations=(), pitches=(), velocities=(), ppq=DEFAULT_PPQ):
+        self.times = array("q", times)
+        self.durations = array("q", durations)
+        self.pitches = array("h", pitches)
+        self.velocities = array("B", velocities)
+        self.ppq = ppq
+
+    def __repr__(self):
+        return f"TickStream({len(self)} notes at {self.ppq} PPQ)"
+
+    def shifted(self, offset):
+        """Return a copy of the stream with every note moved by offset ticks."""
+        return TickStream((time + offset for time in self.times), self.durations, self.pitches, self.velocities,
+                          self.ppq)
+
+# 1. Grid Stream
+def grid_stream(notes, grid, start_time, velocity, legato=1.0):
+    """
+    Place a sequence of notes (one per grid step) on a rhythm grid.
+
+    Args:
+        notes (list): One MIDI note number (or None for a rest) per grid step.
+        grid (RhythmGrid): The bar grid the notes are placed on.
+        start_time (float): Start time of the section in quarter notes.
+        velocity (int): Base velocity, scaled by the grid accents.
+        legato (float): Fraction of each step the note sounds for.
+
+    Returns:
+        NoteStream: The placed notes, rests removed.
+    """
+    bars = -(-len(notes) // grid.steps_per_bar)
+    onsets, durations, accents = get_section_tables(grid, bars)
+    rows = [(start_time + onset, duration * legato, note, max(1, min(127, int(velocity * accent))))
+            for note, onset, duration, accent in zip(notes, onsets, durations, accents)
+            if note is not None]  # Skip rests
+    if not rows:
+        return NoteStream()
+    return NoteStream(*zip(*rows))
+
+# 2. Event Stream
+def event_stream(events, start_time, duration):
+    """
+    Turn (offset, note, velocity) events, such as a percussion pattern, into a stream.
+
+    Args:
+        events (list): (offset, note, velocity) events, offsets in quarter notes from start_time.
+        start_time (float): Start time of the section.
+        duration (float): The duration of each event.
+
+    Returns:
+        NoteStream: The events as notes.
+    """
+    if not events:
+        return NoteStream()
+    offsets, notes, velocities = zip(*events)
+    return NoteStream((start_time + offset for offset in offsets), [duration] * len(events), notes, velocities)
+
+# 3. Convert to Ticks
+def check_ppq(ppq):
+    """Raise ValueError unless ppq is a resolution a MIDI file can hold."""
+    if isinstance(ppq, bool) or not isinstance(ppq, int) or not 1 <= ppq <= MAX_PPQ:
+        raise ValueError(f"Invalid PPQ: {ppq!r}. It must be an integer between 1 and {MAX_PPQ}.")
+
+def to_ticks(stream, ppq=DEFAULT_PPQ):
+    """
+    Convert a stream from quarter notes to integer ticks.
+
+    Note starts and ends are rounded to the nearest tick (so notes that touch still touch)
+    and every note lasts at least one tick.
+
+    Args:
+        stream (NoteStream): The notes, in quarter notes.
+        ppq (int): Ticks per quarter note.
+
+    Returns:
+        TickStream: The notes, in ticks.
+    """
+    if isinstance(stream, TickStream):
+        if stream.ppq != ppq:
+            raise ValueError(f"Stream is already at {stream.ppq} PPQ, not {ppq}.")
+        return stream
+    check_ppq(ppq)
+    starts = [round(time * ppq) for time in stream.times]
+    ends = [round((time + duration) * ppq) for time, duration in zip(stream.times, stream.durations)]
+    return TickStream(starts, (max(1, end - start) for start, end in zip(starts, ends)), stream.pitches,
+                      stream.velocities, ppq)
+
+# 4. Write Stream
+def write_stream(midi, track, channel, stream):
+    """
+    Add every note of a stream to a MIDI track.
+
+    A TickStream must be written to a MIDIFile created with eventtime_is_ticks=True and the
+    stream's resolution; a NoteStream to one that takes times in quarter notes.
+
+    Args:
+        midi (MIDIFile): The MIDI file object.
+        track (int): The track number.
+        channel (int): The MIDI channel.
+        stream (NoteStream): The notes to write.
+    """
+    add_note = midi.addNote
+    for time, duration, pitch, velocity in stream:
+        add_note(track, channel, pitch, time, duration, velocity)
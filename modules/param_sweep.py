@@ -0,0 +1,290 @@
+'''
+Parameter Sweep Module for MIDI Song Generator Application
+
+This module renders every combination of a set of song parameters. It includes functions for:-
+                - parsing BPM ranges and parameter lists
+                - producing the Cartesian product of BPMs, keys, scales and genres lazily
+                - turning each combination into a song spec from a genre template validated once
+                - rendering the specs in parallel to files or a song archive
+                - recording finished songs in a checkpoint file so an interrupted sweep can resume
+                  (songs already in the target archive are skipped too)
+
+Combinations are produced key by key and scale by scale, so the songs queued at any moment
+share their key and scale, and the workers' cached lookup tables for them (scale snapping,
+chord tones, rhythm grids) stay warm. Every song is seeded from its file name, so a resumed
+sweep renders exactly the songs the interrupted one would have.
+
+Example:
+    python -m modules.param_sweep --bpm 60:240:20 --scales Major,Minor --genres Pop,Jazz \
+        --output-dir sweep --checkpoint sweep.jsonl
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.batch_render import iter_batch_results
+from modules.song_archive import ArchiveWriter, SongArchive
+from modules.song_spec import FIELD_CHECKS, validate_song_spec
+from modules.config_registry import WATCH_INTERVAL, get_config, get_registry
+from collections import namedtuple
+from itertools import product
+import argparse
+import json
+import zlib
+import logging
+
+SWEEP_BPM_RANGE = (60, 240)  # The range of the UI's BPM slider
+DEFAULT_BPM_STEP = 10
+CHECKPOINT_EVERY = 50  # Finished songs recorded per checkpoint write
+
+# One combination of the sweep
+SweepPoint = namedtuple("SweepPoint", ["key", "scale", "genre", "bpm"])
+
+# 1. Parse Parameters
+def parse_bpm_range(text):
+    """
+    Parse a BPM range written as START:STOP[:STEP] (inclusive) or a comma-separated list.
+
+    Args:
+        text (str): e.g. "60:240:10" or "90,120,150".
+
+    Returns:
+        list: The BPM values.
+    """
+    try:
+        if ":" in text:
+            parts = [int(part) for part in text.split(":")]
+            if len(parts) not in (2, 3):
+                raise ValueError
+            start, stop, step = (parts + [DEFAULT_BPM_STEP])[:3]
+            if step < 1:
+                raise ValueError
+            return list(range(start, stop + 1, step))
+        return [int(part) for part in text.split(",")]
+    except ValueError:
+        raise ValueError(f"Invalid BPM range: {text!r}. Expected START:STOP[:STEP] or a list such as 90,120.")
+
+def parse_names(text, available, kind):
+    """
+    Parse a comma-separated list of names, or "all" for every available one.
+
+    Args:
+        text (str): The list.
+        available (iterable): The valid names, in order.
+        kind (str): What the names are, for error messages.
+
+    Returns:
+        list: The names.
+    """
+    available = list(available)
+    if text.strip().lower() == "all":
+        return available
+    names = [name.strip() for name in text.split(",") if name.strip()]
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise ValueError(f"Unknown {kind}: {unknown}. Valid {kind} are: {available}")
+    return names
+
+# 2. Iterate Combinations
+def iter_sweep_points(bpms, keys, scales, genres):
+    """
+    Yield every combination of the parameters, key and scale outermost.
+
+    Args:
+        bpms (list): BPM values.
+        keys (list): Keys.
+        scales (list): Scales.
+        genres (list): Genres.
+
+    Yields:
+        SweepPoint: One combination at a time.
+    """
+    for key, scale, genre, bpm in product(keys, scales, genres, bpms):
+        yield SweepPoint(key, scale, genre, bpm)
+
+def get_point_file_name(point):
+    """Return the relative output file name of a combination, e.g. "Pop/C-sharp_Harmonic-Minor_120.mid"."""
+    key = point.key.replace("#", "-sharp")
+    scale = point.scale.replace(" ", "-")
+    return f"{point.genre}/{key}_{scale}_{point.bpm}.mid"
+
+# 3. Build Specs
+def iter_sweep_specs(points, base_spec=None, seed=0):
+    """
+    Turn combinations into song specs.
+
+    Each genre's template (instruments, sections, time signature and options) is validated
+    once and copied for every combination; the parameters themselves are checked up front
+    by run_sweep.
+
+    Args:
+        points (iterable): SweepPoint tuples.
+        base_spec (dict): Raw spec fields shared by every song (e.g. instruments or options).
+        seed (int): Mixed into every song's seed.
+
+    Yields:
+        dict: create_midi keyword arguments, including "file_name" and "seed".
+    """
+    templates = {}
+    for point in points:
+        template = templates.get(point.genre)
+        if template is None:
+            template = templates[point.genre] = validate_song_spec(dict(base_spec or {}, genre=point.genre))
+        file_name = get_point_file_name(point)
+        yield dict(template, key=point.key, scale=point.scale, bpm=point.bpm, file_name=file_name,
+                   seed=zlib.crc32(file_name.encode("utf-8")) ^ seed)
+
+# Records the songs a sweep has finished in an append-only JSON-Lines file
+class SweepCheckpoint:
+    def __init__(self, file_name, parameters):
+        """
+        Args:
+            file_name (str): The checkpoint file; created if it does not exist.
+            parameters (dict): The sweep's parameters; resuming with different ones is refused.
+        """
+        self.file_name = file_name
+        self.done = set()
+        if os.path.exists(file_name) and os.path.getsize(file_name) > 0:
+            with open(file_name, "r", encoding="utf-8") as checkpoint_file:
+                lines = checkpoint_file.read().splitlines()
+            header = json.loads(lines[0])
+            if header.get("sweep") != parameters:
+                raise ValueError(f"Checkpoint {file_name} belongs to a different sweep: {header.get('sweep')}")
+            for line in lines[1:]:
+                try:
+                    self.done.update(json.loads(line)["done"])
+                except (ValueError, KeyError, TypeError):
+                    logging.warning(f"Ignoring a damaged line in checkpoint {file_name}.")  # A torn last write
+            self._file = open(file_name, "a", encoding="utf-8")
+            logging.info(f"Resuming sweep: {len(self.done)} songs already done.")
+        else:
+            self._file = open(file_name, "w", encoding="utf-8")
+            self._file.write(json.dumps({"sweep": parameters}) + "\n")
+            self._file.flush()
+
+    def record(self, file_names):
+        """Mark songs as finished; call only once their output has been flushed."""
+        if not file_names:
+            return
+        self.done.update(file_names)
+        self._file.write(json.dumps({"done": list(file_names)}) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self):
+        """Close the checkpoint file."""
+        self._file.close()
+
+# 4. Run Sweep
+def run_sweep(bpms, keys, scales, genres, output_dir=None, archive_file=None, checkpoint_file=None,
+              processes=None, base_spec=None, seed=0):
+    """
+    Render every combination of the parameters in parallel.
+
+    Args:
+        bpms (list): BPM values.
+        keys (list): Keys.
+        scales (list): Scales.
+        genres (list): Genres.
+        output_dir (str): Directory for the MIDI files (ignored when archive_file is given).
+        archive_file (str): Optional song archive to append the songs to instead.
+        checkpoint_file (str): Optional checkpoint; finished songs are skipped when it exists.
+        processes (int): Number of worker processes (defaults to the CPU count).
+        base_spec (dict): Raw spec fields shared by every song.
+        seed (int): Mixed into every song's seed.
+
+    Returns:
+        int: Number of songs rendered by this run.
+    """
+    errors = [FIELD_CHECKS["bpm"](bpm) for bpm in bpms]
+    errors += [FIELD_CHECKS["key"](key) for key in keys]
+    errors += [FIELD_CHECKS["scale"](scale) for scale in scales]
+    errors += [FIELD_CHECKS["genre"](genre) for genre in genres]
+    errors = [error for error in errors if error]
+    if errors:
+        raise ValueError("Invalid sweep: " + "; ".join(errors))
+
+    total = len(bpms) * len(keys) * len(scales) * len(genres)
+    parameters = {"bpm": list(bpms), "keys": list(keys), "scales": list(scales), "genres": list(genres),
+                  "base_spec": base_spec or {}, "seed": seed}
+    checkpoint = SweepCheckpoint(checkpoint_file, parameters) if checkpoint_file else None
+    done = checkpoint.done if checkpoint else set()
+    if archive_file and os.path.exists(archive_file) and os.path.getsize(archive_file) > 0:
+        # Songs archived after the last checkpoint write (e.g. before a crash) are not rendered twice
+        with SongArchive(archive_file) as archive:
+            archived = set(archive.names())
+        done.update(name for name in map(get_point_file_name, iter_sweep_points(bpms, keys, scales, genres))
+                    if name in archived)
+    specs = (spec for spec in iter_sweep_specs(iter_sweep_points(bpms, keys, scales, genres), base_spec, seed)
+             if spec["file_name"] not in done)
+    logging.info(f"Sweep of {total} songs, {total - len(done)} to render.")
+
+    archive = ArchiveWriter(archive_file) if archive_file else None
+    finished = []
+    rendered = 0
+    try:
+        for spec, view in iter_batch_results(specs, processes):
+            file_name = spec["file_name"]
+            if archive is not None:
+                options = dict(spec)
+                del options["file_name"]
+                archive.add(file_name, view, options, {"sweep": True})
+            else:
+                path = os.path.join(output_dir or ".", file_name)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "wb") as output_file:
+                    output_file.write(view)
+            finished.append(file_name)
+            rendered += 1
+            if checkpoint is not None and len(finished) >= CHECKPOINT_EVERY:
+                if archive is not None:
+                    archive.flush()
+                checkpoint.record(finished)
+                finished = []
+    finally:
+        if archive is not None:
+            archive.close()
+        if checkpoint is not None:
+            checkpoint.record(finished)
+            checkpoint.close()
+
+    logging.info(f"Sweep rendered {rendered} songs ({len(done)} of {total} done).")
+    return rendered
+
+# Run a sweep from the command line
+if __name__ == "__main__":
+    config = get_config()
+    parser = argparse.ArgumentParser(description="Render every combination of BPMs, keys, scales and genres.")
+    parser.add_argument("--bpm", default=f"{SWEEP_BPM_RANGE[0]}:{SWEEP_BPM_RANGE[1]}:{DEFAULT_BPM_STEP}",
+                        help="BPM range START:STOP[:STEP] or list (default: the UI's range in steps of 10).")
+    parser.add_argument("--keys", default="all", help="Comma-separated keys, or 'all' (default).")
+    parser.add_argument("--scales", default="Major,Minor", help="Comma-separated scales, or 'all'.")
+    parser.add_argument("--genres", default="all", help="Comma-separated genres, or 'all' (default).")
+    parser.add_argument("--base-spec", help="JSON song spec fields shared by every song, e.g. instruments.")
+    parser.add_argument("--output-dir", default="sweep", help="Directory for the MIDI files.")
+    parser.add_argument("--archive", help="Append the songs to this song archive instead of writing files.")
+    parser.add_argument("--checkpoint", help="Checkpoint file; rerun with the same file to resume.")
+    parser.add_argument("--processes", type=int, help="Worker processes (default: CPU count).")
+    parser.add_argument("--seed", type=int, default=0, help="Mixed into every song's seed.")
+    parser.add_argument("--watch-config", nargs="?", type=float, const=WATCH_INTERVAL, metavar="SECONDS",
+                        help=f"Reload the configuration files when they change (checked every SECONDS, "
+                             f"default {WATCH_INTERVAL:g}).")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if args.watch_config is not None:
+        get_registry().watch(args.watch_config)
+    try:
+        rendered = run_sweep(parse_bpm_range(args.bpm), parse_names(args.keys, config.keys, "keys"),
+                             parse_names(args.scales, config.scales, "scales"),
+                             parse_names(args.genres, config.genre_defaults, "genres"),
+                             args.output_dir, args.archive, args.checkpoint, args.processes,
+                             json.loads(args.base_spec) if args.base_spec else None, args.seed)
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+    print(f"Rendered {rendered} songs.")
@@ -0,0 +1,111 @@
+'''
+Percussion Library Module for MIDI Song Generator Application
+
+This module compiles the genre percussion patterns of config/percussion_patterns.json
+(served by modules.config_registry) into bar templates. It includes functions for:-
+                - checking a pattern definition
+                - compiling a (genre, time signature) pair into a bar template of
+                  (offset, drum note, velocity) events
+                - expanding a template across a section by tiling it bar by bar
+
+Templates are compiled once and cached, so generating percussion for a section only
+repeats a precomputed tuple of events.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.config_registry import get_config
+from modules.rhythm_grid import parse_time_signature, get_grid
+from functools import lru_cache
+import logging
+
+FALLBACK_GENRE = "Pop"  # Genre used when a genre has no percussion pattern
+
+HIT_LEVELS = {"x": 1.0, "o": 0.6}  # Step characters and their velocity scale; anything else is a rest
+
+# 1. Check Pattern
+def check_pattern(genre, pattern):
+    """
+    Check that a genre's pattern definition has the fields the compiler needs.
+
+    Args:
+        genre (str): The genre name.
+        pattern (Mapping): The pattern definition.
+    """
+    if "subdivision" not in pattern or "instruments" not in pattern:
+        raise ValueError(f"Percussion pattern for '{genre}' needs 'subdivision' and 'instruments'.")
+    bars = [pattern["instruments"]] + list(pattern.get("time_signatures", {}).values())
+    for name, instrument in ((name, instrument) for bar in bars for name, instrument in bar.items()):
+        if not instrument.get("steps") or "note" not in instrument or "velocity" not in instrument:
+            raise ValueError(f"Percussion instrument '{name}' in genre '{genre}' needs 'note', 'velocity' "
+                             f"and 'steps'.")
+
+# 2. Compile Bar Template
+def get_bar_template(genre, time_signature, config=None):
+    """
+    Compile one bar of a genre's percussion into a sorted tuple of events.
+
+    Templates are cached per configuration version, so a reload of
+    config/percussion_patterns.json takes effect on the next song.
+
+    Args:
+        genre (str): The musical genre.
+        time_signature (str): The time signature (e.g., "4/4").
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
+
+    Returns:
+        tuple: (offset, drum_note, velocity) events sorted by offset, with offsets in
+               quarter notes from the start of the bar.
+    """
+    return _compile_bar_template(genre, time_signature, config or get_config())
+
+@lru_cache(maxsize=256)
+def _compile_bar_template(genre, time_signature, config):
+    library = config.percussion_patterns
+    if genre not in library:
+        logging.warning(f"No percussion pattern for genre '{genre}'. Falling back to '{FALLBACK_GENRE}'.")
+    if genre not in library and FALLBACK_GENRE not in library:
+        return ()
+    pattern = library.get(genre, library.get(FALLBACK_GENRE))
+    check_pattern(genre, pattern)
+
+    _, beat_unit = parse_time_signature(time_signature)
+    subdivision = max(pattern["subdivision"], beat_unit)
+    rhythm = config.genre_rhythms.get(genre, config.genre_rhythms["User"])
+    grid = get_grid(time_signature, subdivision, rhythm.get("swing", 0.5), config=config)
+    instruments = pattern.get("time_signatures", {}).get(time_signature, pattern["instruments"])
+
+    events = []
+    for name, instrument in instruments.items():
+        steps = instrument["steps"]
+        for step in range(grid.steps_per_bar):
+            level = HIT_LEVELS.get(steps[step % len(steps)])
+            if level:
+                velocity = max(1, min(127, int(instrument["velocity"] * level)))
+                events.append((grid.onsets[step], instrument["note"], velocity))
+
+    events.sort()
+    return tuple(events)
+
+# 3. Expand Section
+def expand_percussion(template, bar_length, bars):
+    """
+    Tile a bar template across a section.
+
+    Args:
+        template (tuple): Bar template as returned by get_bar_template.
+        bar_length (float): The bar length in quarter notes.
+        bars (int): The number of bars in the section.
+
+    Returns:
+        list: (offset, drum_note, velocity) events for the whole section.
+    """
+    return [(bar * bar_length + offset, note, velocity)
+            for bar in range(bars)
+            for offset, note, velocity in template]
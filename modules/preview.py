@@ -0,0 +1,78 @@
+'''
+Preview Module for MIDI Song Generator Application
+
+This module keeps a composed song in memory so it can be previewed section by section. It includes functions for:-
+                - indexing the start of every section in quarter notes and in seconds
+                - finding the section playing at a given time
+                - rendering only a requested run of sections from the cached note streams
+
+The song is composed once; seeking to or looping a section encodes just that region of
+the cached streams, so nothing is generated again. The module does not depend on any
+audio or GUI library; the UI hands the rendered bytes to its player.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.midi_generator import write_song
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+import io
+import logging
+
+# Where one section sits in the song, in quarter notes and in seconds
+SectionOffset = namedtuple("SectionOffset", ["index", "name", "start", "length", "start_seconds", "length_seconds"])
+
+# A composed song held for seeking and looping
+class SongPreview:
+    def __init__(self, song):
+        """
+        Args:
+            song (SongRender): The composed song (see modules.midi_generator.compose_song).
+        """
+        self.song = song
+        self._regions = {}
+        tempo_map = song.tempo_map
+        self.sections = []
+        for index, span in enumerate(song.spans):
+            start_seconds = tempo_map.seconds_at(span.start)
+            length_seconds = tempo_map.seconds_at(span.start + span.length) - start_seconds
+            self.sections.append(SectionOffset(index, span.name, span.start, span.length,
+                                               start_seconds, length_seconds))
+        self.section_starts = array("d", (section.start_seconds for section in self.sections))
+        last = self.sections[-1]
+        self.duration = last.start_seconds + last.length_seconds
+
+    def __len__(self):
+        return len(self.sections)
+
+    def section_at(self, seconds):
+        """Return the index of the section playing at a time in seconds from the start of the song."""
+        return min(len(self.sections) - 1, max(0, bisect_right(self.section_starts, seconds) - 1))
+
+    def render_region(self, first_section=0, last_section=None):
+        """
+        Encode a run of sections as Standard MIDI File bytes; each region is encoded only once.
+
+        Args:
+            first_section (int): Index of the first section.
+            last_section (int): Index of the last section (defaults to the end of the song).
+
+        Returns:
+            bytes: The encoded region, starting at time 0.
+        """
+        if last_section is None:
+            last_section = len(self.sections) - 1
+        key = (first_section, last_section)
+        if key not in self._regions:
+            buffer = io.BytesIO()
+            write_song(self.song, first_section, last_section).writeFile(buffer)
+            self._regions[key] = buffer.getvalue()
+            logging.debug(f"Rendered preview region {first_section}-{last_section} ({len(self._regions[key])} bytes)")
+        return self._regions[key]
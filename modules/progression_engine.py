@@ -0,0 +1,186 @@
+'''
+Progression Engine Module for MIDI Song Generator Application
+
+This module generates chord progressions that follow a genre's harmonic rules. It includes functions for:-
+                - compiling GENRE_PROGRESSIONS into index-based transition tables per genre
+                - counting the weighted ways to complete a progression (memoized dynamic programming)
+                - sampling progressions of any length that start, move and cadence as the rules allow
+
+A progression of n chords that must end on a cadence is sampled chord by chord: each next
+chord is drawn with probability proportional to (transition weight) x (weight of all
+valid completions from that chord). The completion weights only depend on the number of
+chords left and the chord the prefix must reach, so they are computed once per genre and
+reused, and sampling a progression takes time linear in its length.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.config_registry import get_config
+from collections import namedtuple
+from functools import lru_cache
+import random
+import threading
+import logging
+
+FALLBACK_GENRE = "Pop"  # Genre used when a genre has no chord map, as in generate_chord_progression
+
+_levels_lock = threading.Lock()  # Serialises growing the cached completion levels
+
+# Compiled rules of one genre; chords are referred to by their index in "chords"
+ProgressionTable = namedtuple("ProgressionTable", ["chords", "start_weights", "transitions", "cadences"])
+
+# 1. Compile Progression Table
+def compile_progression_table(chord_map, rules):
+    """
+    Compile a genre's progression rules into index-based tables.
+
+    Chords without rules may follow any chord with equal weight, and a genre without
+    "start" rules may start on any chord.
+
+    Args:
+        chord_map (Mapping): The genre's entry in GENRE_CHORD_MAPS.
+        rules (Mapping): The genre's entry in GENRE_PROGRESSIONS (may be empty).
+
+    Returns:
+        ProgressionTable: The compiled tables.
+    """
+    chords = tuple(chord_map)
+    positions = {name: index for index, name in enumerate(chords)}
+
+    def weights(mapping, field):
+        row = [0.0] * len(chords)
+        for name, weight in mapping.items():
+            if name not in positions:
+                raise ValueError(f"Progression rule '{field}' names unknown chord '{name}'.")
+            if weight < 0:
+                raise ValueError(f"Progression rule '{field}' has a negative weight for '{name}'.")
+            row[positions[name]] = float(weight)
+        return tuple(row)
+
+    uniform = tuple([1.0] * len(chords))
+    start_weights = weights(rules["start"], "start") if rules.get("start") else uniform
+    transition_rules = rules.get("transitions", {})
+    for name in transition_rules:
+        if name not in positions:
+            raise ValueError(f"Progression rule 'transitions' names unknown chord '{name}'.")
+    transitions = tuple(weights(transition_rules[name], f"transitions.{name}") if name in transition_rules else uniform
+                        for name in chords)
+
+    cadences = []
+    for cadence in rules.get("cadences", []):
+        unknown = [name for name in cadence if name not in positions]
+        if unknown or not cadence:
+            raise ValueError(f"Cadence {list(cadence)} names unknown chords: {unknown}")
+        cadences.append(tuple(positions[name] for name in cadence))
+    return ProgressionTable(chords, start_weights, transitions, tuple(cadences))
+
+# 2. Look Up Progression Table
+def get_progression_table(genre, config=None):
+    """
+    Return the compiled progression table of a genre, cached per configuration version.
+
+    Args:
+        genre (str): The musical genre.
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
+
+    Returns:
+        ProgressionTable: The compiled tables.
+    """
+    return _compiled_table(genre, config or get_config())
+
+@lru_cache(maxsize=128)
+def _compiled_table(genre, config):
+    if genre not in config.genre_chord_maps:
+        genre = FALLBACK_GENRE
+    return compile_progression_table(config.genre_chord_maps[genre], config.genre_progressions.get(genre, {}))
+
+# 3. Completion Weights (memoized dynamic programming)
+@lru_cache(maxsize=256)
+def _completion_levels(table, target):
+    # levels[n - 1][chord] is the (normalised) weight of all n-chord progressions that start
+    # on chord and end on target (or anywhere, if target is None). The list is only ever
+    # appended to, under _levels_lock, and its levels are immutable tuples
+    first = tuple(1.0 if target is None or chord == target else 0.0 for chord in range(len(table.chords)))
+    return [first]
+
+def get_completion_weights(table, target, length):
+    """
+    Return the weight of completing a progression from each chord.
+
+    Args:
+        table (ProgressionTable): The genre's compiled tables.
+        target (int): Index of the chord the progression must end on, or None.
+        length (int): Number of chords, including the first and the last.
+
+    Returns:
+        tuple: One weight per chord; only ratios within one tuple are meaningful.
+    """
+    levels = _completion_levels(table, target)
+    if len(levels) < length:
+        with _levels_lock:
+            while len(levels) < length:
+                previous = levels[-1]
+                level = [sum(weight * previous[following] for following, weight in enumerate(row) if weight)
+                         for row in table.transitions]
+                total = sum(level)
+                if total:
+                    level = [weight / total for weight in level]  # Normalise so long songs cannot overflow
+                levels.append(tuple(level))
+    return levels[length - 1]
+
+def _draw(weights):
+    if not any(weights):
+        return None
+    return random.choices(range(len(weights)), weights=weights)[0]
+
+# 4. Generate Progression
+def generate_progression(genre, length, cadence=True, config=None):
+    """
+    Generate a chord progression that follows the genre's progression rules.
+
+    Args:
+        genre (str): The musical genre.
+        length (int): Number of chords.
+        cadence (bool): End on one of the genre's cadences, if one fits in the length.
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
+
+    Returns:
+        list: Chord names of the genre's chord map.
+    """
+    if length < 1:
+        return []
+    table = get_progression_table(genre, config)
+
+    # Try the fitting cadences in random order, then no cadence; the free prefix must reach
+    # the first chord of the cadence
+    fitting = [chords for chords in table.cadences if len(chords) <= length] if cadence else []
+    random.shuffle(fitting)
+    for ending in fitting + [()]:
+        free_length = length - len(ending) + 1 if ending else length
+        target = ending[0] if ending else None
+        completions = get_completion_weights(table, target, free_length)
+        current = _draw([start * completion for start, completion in zip(table.start_weights, completions)])
+        if current is None:
+            # No rule-following progression starts on an allowed chord; relax the start rules
+            current = _draw(completions)
+        if current is not None:
+            break
+    else:
+        logging.warning(f"No progression of {length} chords fits the rules of '{genre}'. Choosing chords at random.")
+        return [random.choice(table.chords) for _ in range(length)]
+    if fitting and not ending:
+        logging.warning(f"No progression of {length} chords ends on a cadence of '{genre}'. Ignoring the cadence.")
+
+    progression = [current]
+    for remaining in range(free_length - 1, 0, -1):
+        completions = get_completion_weights(table, target, remaining)
+        current = _draw([weight * completion for weight, completion in zip(table.transitions[current], completions)])
+        progression.append(current)
+    progression.extend(ending[1:])
+    return [table.chords[index] for index in progression]
@@ -0,0 +1,175 @@
+'''
+Rhythm Grid Module for MIDI Song Generator Application
+
+This module places notes in time according to the song's time signature. It includes functions for:-
+                - parsing and validating time signatures
+                - precomputing onset, duration and accent tables per bar
+                - applying swing and groove templates
+
+All times are measured in quarter notes, which is the unit used by midiutil, so a bar of
+6/8 is 3.0 long and an eighth-note step is 0.5 long.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.config_registry import get_config
+from collections import namedtuple
+from functools import lru_cache
+import logging
+
+# A precomputed grid for one bar; onsets, durations and accents hold one entry per step
+RhythmGrid = namedtuple("RhythmGrid", ["time_signature", "subdivision", "steps_per_bar", "bar_length",
+                                       "onsets", "durations", "accents"])
+
+# 1. Parse Time Signature
+def parse_time_signature(time_signature):
+    """
+    Parse a time signature string such as "6/8".
+
+    Args:
+        time_signature (str): The time signature.
+
+    Returns:
+        tuple: (beats_per_bar, beat_unit)
+    """
+    try:
+        beats_per_bar, beat_unit = map(int, time_signature.split("/"))
+    except (AttributeError, ValueError):
+        raise ValueError(f"Invalid time signature: {time_signature!r}. Expected a value such as '4/4'.")
+    if beats_per_bar < 1 or beat_unit < 1 or beat_unit & (beat_unit - 1):
+        raise ValueError(f"Invalid time signature: {time_signature!r}. The beat unit must be a power of two.")
+    return beats_per_bar, beat_unit
+
+# 2. Bar Length
+def get_bar_length(time_signature):
+    """
+    Return the length of one bar in quarter notes.
+
+    Args:
+        time_signature (str): The time signature.
+
+    Returns:
+        float: The bar length in quarter notes.
+    """
+    beats_per_bar, beat_unit = parse_time_signature(time_signature)
+    return beats_per_bar * 4 / beat_unit
+
+# 3. Build Grid Tables
+def get_grid(time_signature, subdivision=None, swing=0.5, groove="straight", config=None):
+    """
+    Precompute the onset, duration and accent tables of one bar.
+
+    Args:
+        time_signature (str): The time signature (e.g., "4/4", "6/8").
+        subdivision (int): Grid note value (4 = quarters, 8 = eighths, 12 = eighth-note triplets,
+                           16 = sixteenths); any value that fills a bar with whole steps.
+                           Defaults to the beat unit of the time signature.
+        swing (float): Share of each pair of steps given to the first step (0.5 = straight).
+        groove (str): Name of a template in the configuration's groove_templates.
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
+
+    Returns:
+        RhythmGrid: The grid tables for one bar.
+    """
+    return _build_grid(time_signature, subdivision, swing, groove, config or get_config())
+
+@lru_cache(maxsize=256)
+def _build_grid(time_signature, subdivision, swing, groove, config):
+    groove_templates = config.groove_templates
+    beats_per_bar, beat_unit = parse_time_signature(time_signature)
+    subdivision = subdivision or beat_unit
+    if subdivision < 1:
+        raise ValueError(f"Invalid subdivision: {subdivision}. It must be a positive number of steps per whole note.")
+    if (beats_per_bar * subdivision) % beat_unit:
+        raise ValueError(f"Subdivision {subdivision} does not divide a bar of {time_signature}.")
+    if not 0.0 < swing < 1.0:
+        raise ValueError(f"Invalid swing ratio: {swing}. It must be between 0 and 1.")
+    if groove not in groove_templates:
+        raise ValueError(f"Invalid groove: {groove}. Valid grooves are: {list(groove_templates.keys())}")
+
+    steps_per_bar = beats_per_bar * subdivision // beat_unit
+    steps_per_beat = max(1, subdivision // beat_unit)
+    compound = beat_unit >= 8 and beats_per_bar % 3 == 0 and beats_per_bar > 3  # e.g. 6/8, 9/8, 12/8
+    steps_per_pulse = steps_per_beat * (3 if compound else 1)
+    step_length = 4 / subdivision
+    template = groove_templates[groove]
+    accents_template = template["accents"]
+    offsets_template = template["offsets"]
+
+    onsets = []
+    durations = []
+    accents = []
+    for step in range(steps_per_bar):
+        # Swing lengthens the first step of each pair within a beat and delays the second
+        if steps_per_beat % 2 == 0 and swing != 0.5:
+            pair_start = (step - step % 2) * step_length
+            if step % 2 == 0:
+                onset = pair_start
+                duration = 2 * step_length * swing
+            else:
+                onset = pair_start + 2 * step_length * swing
+                duration = 2 * step_length * (1 - swing)
+        else:
+            onset = step * step_length
+            duration = step_length
+        onset += offsets_template[step % len(offsets_template)] * step_length
+
+        # Metric accent: downbeat, then pulses (dotted beats in compound time), then subdivisions
+        if step == 0:
+            metric_accent = 1.0
+        elif step % steps_per_pulse == 0:
+            metric_accent = 0.9
+        else:
+            metric_accent = 0.8
+
+        onsets.append(onset)
+        durations.append(duration)
+        accents.append(metric_accent * accents_template[step % len(accents_template)])
+
+    logging.debug(f"Built rhythm grid for {time_signature} at 1/{subdivision}: {steps_per_bar} steps per bar")
+    return RhythmGrid(time_signature, subdivision, steps_per_bar, beats_per_bar * 4 / beat_unit,
+                      tuple(onsets), tuple(durations), tuple(accents))
+
+# 4. Genre Grid
+def get_genre_grid(genre, time_signature, part="melody", config=None):
+    """
+    Return the grid a genre uses for one of its parts.
+
+    Args:
+        genre (str): The musical genre.
+        time_signature (str): The time signature.
+        part (str): "melody" or "rhythm".
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
+
+    Returns:
+        RhythmGrid: The grid tables for one bar.
+    """
+    config = config or get_config()
+    settings = config.genre_rhythms.get(genre, config.genre_rhythms["User"])
+    _, beat_unit = parse_time_signature(time_signature)
+    subdivision = max(settings.get(part, beat_unit), beat_unit)  # Never coarser than the beat
+    return get_grid(time_signature, subdivision, settings.get("swing", 0.5), settings.get("groove", "straight"),
+                    config)
+
+# 5. Section Tables
+@lru_cache(maxsize=256)
+def get_section_tables(grid, bars):
+    """
+    Tile a bar grid across a whole section.
+
+    Args:
+        grid (RhythmGrid): The bar grid.
+        bars (int): The number of bars in the section.
+
+    Returns:
+        tuple: (onsets, durations, accents) tuples with one entry per step of the section.
+    """
+    bar_length = grid.bar_length
+    onsets = tuple(bar * bar_length + onset for bar in range(bars) for onset in grid.onsets)
+    return onsets, grid.durations * bars, grid.accents * bars
@@ -0,0 +1,416 @@
+'''
+Session Module for MIDI Song Generator Application
+
+This module keeps a song open for interactive, incremental editing. It includes functions for:-
+                - composing a song once and keeping its harmony and parts warm between edits
+                - giving every part of every section its own random stream, so edits stay local
+                - changing one section's chords, regenerating a part for a run of bars,
+                  swapping an instrument or changing the tempo without composing anything else
+                - encoding the edited song and handing it to a playback sink
+                - an interactive Python prompt holding a session (python -m modules.session)
+
+Each part of each section is composed from its own seed, derived from the session seed, the
+section, the role and the revision of that part. Regenerating the melody of bar 12 composes
+only that section's melody from a new seed and splices the bars asked for into the old one;
+changing a section's chords composes the section's pitched parts again from their unchanged
+seeds, so the melody keeps its shape and is fitted to the new chords. Lookup tables (scales,
+grids, progression tables, scale snapping) stay cached by the configuration snapshot the
+session pins, so an edit costs a few milliseconds.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.midi_generator import (
+    PART_ROLES, SongRender, compose_part, get_section_scales, plan_section_harmony, shape_part, write_song
+)
+from modules.music_program import generate_scale_notes
+from modules.tempo_map import DEFAULT_TEMPO_RESOLUTION, build_tempo_map, get_section_spans
+from modules.note_stream import DEFAULT_PPQ, NoteStream
+from modules.arrangement import plan_arrangement
+from modules.track_allocator import DRUM_CHANNEL, allocate_tracks, get_program
+from modules.song_spec import validate_song_spec
+from modules.config_registry import get_config
+from modules.metrics import time_stage
+from functools import wraps
+import argparse
+import code
+import io
+import json
+import random
+import time
+import zlib
+import logging
+
+EDIT_BUDGET_MS = 100  # Edits slower than this are logged as warnings
+
+# The compose_song options a session accepts, with their defaults
+SESSION_OPTIONS = {
+    "enable_dynamic_tempo": False,
+    "enable_dynamics": True,
+    "enable_modulation": False,
+    "enable_ornamentation": True,
+    "enable_countermelody": False,
+    "enable_percussion": True,
+    "enable_humanize": False,
+    "enable_arrangement": True,
+    "melody_model_dir": None,
+    "tempo_resolution": DEFAULT_TEMPO_RESOLUTION,
+}
+
+_mixer = None  # pygame.mixer, imported and initialised by the first playback
+
+# 1. Splice Streams
+def splice_stream(stream, patch, start, end):
+    """
+    Replace the notes of a stream that start in a time window with those of another stream.
+
+    Notes of the old stream that start before the window are cut off where it begins.
+
+    Args:
+        stream (NoteStream): The old notes.
+        patch (NoteStream): The new notes; only those starting inside the window are used.
+        start (float): Start of the window, in quarter notes.
+        end (float): End of the window, in quarter notes.
+
+    Returns:
+        NoteStream: A new stream, in time order.
+    """
+    rows = [(time, min(duration, start - time) if time < start else duration, pitch, velocity)
+            for time, duration, pitch, velocity in stream if time < start or time >= end]
+    rows += [row for row in patch if start <= row[0] < end]
+    rows.sort(key=lambda row: row[0])
+    return NoteStream(*zip(*rows)) if rows else NoteStream()
+
+# 2. Playback Sink
+def pygame_sink(data):
+    """
+    Play encoded MIDI bytes with pygame's mixer, replacing whatever is playing.
+
+    pygame is imported on first use, so sessions without playback never load it.
+
+    Args:
+        data (bytes): A Standard MIDI File.
+    """
+    global _mixer
+    if _mixer is None:
+        from pygame import mixer
+        mixer.init()
+        _mixer = mixer
+        logging.info("Pygame mixer initialized successfully.")
+    _mixer.music.load(io.BytesIO(data), "mid")
+    _mixer.music.play()
+
+def _edit(method):
+    """Decorator for Session edits: times the edit, drops the cached render and replays if live."""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        with time_stage("session_edit"):
+            result = method(self, *args, **kwargs)
+            self._song = None
+        self.last_edit_ms = (time.perf_counter() - started) * 1000
+        log = logging.warning if self.last_edit_ms > EDIT_BUDGET_MS else logging.info
+        log(f"{method.__name__} took {self.last_edit_ms:.1f} ms")
+        if self.live:
+            self.play()
+        return result
+    return wrapper
+
+# A composed song held open for incremental edits
+class Session:
+    def __init__(self, bpm, time_signature, scale, key, genre, instruments, sections, seed=None,
+                 sink=None, live=False, ppq=DEFAULT_PPQ, **options):
+        """
+        Args:
+            bpm, time_signature, scale, key, genre, instruments, sections: As for compose_song.
+            seed (int): Session seed; every part's seed is derived from it (random if omitted).
+            sink (callable): Called with the encoded MIDI bytes by play(); defaults to pygame_sink.
+            live (bool): Play the song again after every edit.
+            ppq (int): Resolution of the files written, in ticks per quarter note.
+            **options: compose_song options (see SESSION_OPTIONS).
+        """
+        unknown = sorted(set(options) - set(SESSION_OPTIONS))
+        if unknown:
+            raise ValueError(f"Unknown session options: {unknown}. Valid options are: {sorted(SESSION_OPTIONS)}")
+        if not sections:
+            raise ValueError("The 'sections' list is empty. Please provide at least one section.")
+        if not instruments:
+            raise ValueError("The 'instruments' list is empty. Please provide at least one instrument.")
+        self.options = dict(SESSION_OPTIONS, **options)
+        self.bpm, self.time_signature, self.scale, self.key, self.genre = bpm, time_signature, scale, key, genre
+        self.sections = list(sections)
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.sink = sink or pygame_sink
+        self.live = live
+        self.ppq = ppq
+        self.last_edit_ms = 0.0
+        self._song = None
+        self._revision = 0
+
+        # Pin one configuration snapshot, so the cached tables stay valid for the whole session
+        self.config = get_config()
+        self.tracks = allocate_tracks(instruments, self.options["enable_countermelody"],
+                                      self.options["enable_percussion"], self.config)
+        self.roles = [role for role in PART_ROLES if any(track.role == role for track in self.tracks)]
+        self.tempo_map = build_tempo_map(self.sections, bpm, time_signature, self.options["enable_dynamic_tempo"],
+                                         self.options["tempo_resolution"], self.config)
+        self.spans = get_section_spans(self.sections, time_signature)
+        scale_notes = generate_scale_notes(key, scale, self.config)
+        if not scale_notes:
+            raise ValueError(f"Failed to generate scale notes for key '{key}' and scale '{scale}'.")
+        self._scales = get_section_scales(self.spans, scale_notes, self.options["enable_modulation"])
+        self.arrangement = (plan_arrangement(genre, [span.name for span in self.spans], self.roles, self.config)
+                            if self.options["enable_arrangement"] else None)
+
+        # Song bar numbers (counted from 1) -> (section index, bar start, bar length)
+        self._bars = []
+        for index, span in enumerate(self.spans):
+            bar_length = span.length / span.bars
+            self._bars.extend((index, span.start + bar * bar_length, bar_length) for bar in range(span.bars))
+
+        # Every part is a stack of layers (start, end, revision): the first covers its section
+        # and the later ones replace the notes starting in their window
+        self._chord_revisions = [0] * len(self.spans)
+        self._layers = {(index, role): [(span.start, span.start + span.length, 0)]
+                        for index, span in enumerate(self.spans) for role in self.roles}
+        self.harmonies = [self._plan_harmony(index) for index in range(len(self.spans))]
+        self.parts = [{role: self._compose(index, role) for role in self.roles} for index in range(len(self.spans))]
+
+    @classmethod
+    def from_spec(cls, raw_spec, **kwargs):
+        """
+        Open a session on a song spec (see modules.song_spec), filling in genre defaults.
+
+        Keyword arguments (seed, sink, live, ppq) are passed on to the constructor.
+        """
+        spec = validate_song_spec(raw_spec)
+        del spec["file_name"]
+        spec.setdefault("ppq", DEFAULT_PPQ)
+        spec.update(kwargs)
+        return cls(**spec)
+
+    def __repr__(self):
+        names = ", ".join(f"{index}:{span.name}({span.bars})" for index, span in enumerate(self.spans))
+        return f"Session({self.genre} in {self.key} {self.scale} at {self.bpm} BPM, seed {self.seed}; {names})"
+
+    # Seeds and composition
+    def _reseed(self, index, stream, revision):
+        """Seed the random module for one stream (a role or "chords") of a section at a revision."""
+        random.seed(zlib.crc32(f"{index}/{stream}/{revision}".encode("utf-8")) ^ self.seed)
+
+    def _next_revision(self):
+        self._revision += 1
+        return self._revision
+
+    def _plan_harmony(self, index, progression=None):
+        self._reseed(index, "chords", self._chord_revisions[index])
+        return plan_section_harmony(self.spans[index], self.genre, self._scales[index], self.config, progression)
+
+    def _compose(self, index, role):
+        """Compose one part of a section from its layers."""
+        span, harmony = self.spans[index], self.harmonies[index]
+        stream = None
+        for start, end, revision in self._layers[(index, role)]:
+            self._reseed(index, role, revision)
+            layer = compose_part(role, span, self.genre, harmony, self.config,
+                                 self.options["enable_ornamentation"], self.options["melody_model_dir"])
+            layer = layer if layer is not None else NoteStream()
+            shape_part(layer, span, self.config, self.options["enable_dynamics"], self.options["enable_humanize"])
+            stream = layer if stream is None else splice_stream(stream, layer, start, end)
+        return stream
+
+    def section_index(self, section):
+        """
+        Resolve a section given by index or by name (the first section of that name).
+
+        Args:
+            section (int or str): The section.
+
+        Returns:
+            int: Its index.
+        """
+        if isinstance(section, int):
+            if not -len(self.spans) <= section < len(self.spans):
+                raise ValueError(f"Invalid section index {section} for a song of {len(self.spans)} sections.")
+            return section % len(self.spans)
+        for index, span in enumerate(self.spans):
+            if span.name.lower() == str(section).lower():
+                return index
+        raise ValueError(f"Unknown section '{section}'. Sections are: {[span.name for span in self.spans]}")
+
+    def _check_role(self, role):
+        if role not in self.roles:
+            raise ValueError(f"Invalid role: {role}. Roles in this song are: {self.roles}")
+
+    # Edits
+    @_edit
+    def set_chords(self, section, progression=None):
+        """
+        Change the chords of a section and fit its pitched parts to them.
+
+        The melody, rhythm and countermelody are composed again from their unchanged seeds,
+        so they keep their shape; the harmony and bass follow the new chords. Percussion is
+        left alone.
+
+        Args:
+            section (int or str): The section.
+            progression (list): Chord names, one per bar; a new progression from the genre's
+                                rules if omitted.
+        """
+        index = self.section_index(section)
+        span = self.spans[index]
+        if progression is None:
+            self._chord_revisions[index] = self._next_revision()
+        else:
+            progression = list(progression)
+            chord_map = self.config.genre_chord_maps.get(self.genre, self.config.genre_chord_maps["Pop"])
+            unknown = [name for name in progression if name not in chord_map]
+            if unknown:
+                raise ValueError(f"Unknown chords for '{self.genre}': {unknown}. Valid chords are: {list(chord_map)}")
+            if len(progression) != span.bars:
+                raise ValueError(f"Section '{span.name}' has {span.bars} bars, but {len(progression)} chords were given.")
+        self.harmonies[index] = self._plan_harmony(index, progression)
+        for role in self.roles:
+            if role != "percussion":
+                self.parts[index][role] = self._compose(index, role)
+
+    @_edit
+    def regenerate(self, role, section=None, bars=None):
+        """
+        Compose a part again from a new seed, for a whole section or for a run of bars.
+
+        Args:
+            role (str): The part's role, e.g. "melody".
+            section (int or str): The section to regenerate; not needed when bars are given.
+            bars (int or tuple): A song bar number counted from 1, or an inclusive (first, last)
+                                 range; only the notes starting in these bars are replaced.
+        """
+        self._check_role(role)
+        revision = self._next_revision()
+        if bars is None:
+            if section is None:
+                raise ValueError("Give the section or the bars to regenerate.")
+            index = self.section_index(section)
+            span = self.spans[index]
+            self._layers[(index, role)] = [(span.start, span.start + span.length, revision)]
+            self.parts[index][role] = self._compose(index, role)
+            return
+
+        first, last = (bars, bars) if isinstance(bars, int) else bars
+        if not 1 <= first <= last <= len(self._bars):
+            raise ValueError(f"Invalid bars {bars} for a song of {len(self._bars)} bars.")
+        windows = {}  # section index -> (start, end) of the bars inside it
+        for index, start, length in self._bars[first - 1:last]:
+            window_start, _ = windows.get(index, (start, None))
+            windows[index] = (window_start, start + length)
+        if section is not None and set(windows) != {self.section_index(section)}:
+            raise ValueError(f"Bars {bars} are not all in section '{section}'.")
+        for index, (start, end) in windows.items():
+            self._layers[(index, role)].append((start, end, revision))
+            self.parts[index][role] = self._compose(index, role)
+
+    @_edit
+    def set_instrument(self, target, instrument):
+        """
+        Change the instrument of a track; the notes are kept.
+
+        Args:
+            target (str or int): A role (its first track) or a track number.
+            instrument (str): The new instrument name (see INSTRUMENT_MAP).
+        """
+        if isinstance(target, int):
+            matches = [track for track in self.tracks if track.track == target]
+        else:
+            matches = [track for track in self.tracks if track.role == target][:1]
+        if not matches:
+            raise ValueError(f"No track for '{target}'. Tracks are: {[(t.track, t.role, t.instrument) for t in self.tracks]}")
+        if matches[0].channel == DRUM_CHANNEL:
+            raise ValueError("The percussion track always plays the General MIDI drum kit.")
+        old = matches[0]
+        self.tracks[old.track] = old._replace(program=get_program(instrument, self.config), instrument=instrument)
+
+    @_edit
+    def set_tempo(self, bpm):
+        """
+        Change the song's base tempo; dynamic tempo ramps are planned again around it.
+
+        Args:
+            bpm (int): Beats per minute.
+        """
+        self.tempo_map = build_tempo_map(self.sections, bpm, self.time_signature, self.options["enable_dynamic_tempo"],
+                                         self.options["tempo_resolution"], self.config)
+        self.bpm = bpm
+
+    # Output
+    def render(self):
+        """
+        Return the session's song; it is assembled again only after an edit.
+
+        Returns:
+            SongRender: The song, ready for write_song or modules.preview.SongPreview.
+        """
+        if self._song is None:
+            parts = {role: [track for track in self.tracks if track.role == role] for role in self.roles}
+            sections = [[(parts[role], section_parts[role]) for role in self.roles if len(section_parts[role])]
+                        for section_parts in self.parts]
+            self._song = SongRender(list(self.tracks), self.tempo_map, self.spans, sections, self.arrangement)
+        return self._song
+
+    def to_midi_bytes(self, first_section=0, last_section=None, ppq=None):
+        """
+        Encode the song, or a run of its sections, as Standard MIDI File bytes.
+
+        Args:
+            first_section (int or str): The first section.
+            last_section (int or str): The last section (defaults to the end of the song).
+            ppq (int): Resolution of the file in ticks per quarter note (defaults to the session's).
+
+        Returns:
+            bytes: The encoded MIDI file.
+        """
+        first = self.section_index(first_section)
+        last = None if last_section is None else self.section_index(last_section)
+        buffer = io.BytesIO()
+        write_song(self.render(), first, last, ppq or self.ppq).writeFile(buffer)
+        return buffer.getvalue()
+
+    def save(self, file_name, ppq=None):
+        """Write the whole song to a MIDI file."""
+        data = self.to_midi_bytes(ppq=ppq)
+        with open(file_name, "wb") as output_file:
+            output_file.write(data)
+        logging.info(f"Session saved to {file_name} ({len(data)} bytes).")
+
+    def play(self, first_section=0, last_section=None):
+        """Send the song, or a run of its sections, to the playback sink."""
+        self.sink(self.to_midi_bytes(first_section, last_section))
+
+# Open a session at an interactive prompt
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compose a song interactively from a Python prompt.")
+    parser.add_argument("--spec", default='{"genre": "Pop"}', help="JSON song spec, or a file holding one.")
+    parser.add_argument("--seed", type=int, help="Session seed (random if omitted).")
+    parser.add_argument("--live", action="store_true", help="Play the song through pygame after every edit.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    try:
+        if os.path.exists(args.spec):
+            with open(args.spec, "r", encoding="utf-8") as spec_file:
+                raw_spec = json.load(spec_file)
+        else:
+            raw_spec = json.loads(args.spec)
+        session = Session.from_spec(raw_spec, seed=args.seed, live=args.live)
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+    banner = (f"{session!r}\n"
+              "Edit with session.set_chords(section, chords), session.regenerate(role, bars=12),\n"
+              "session.set_instrument(role, name) and session.set_tempo(bpm); then session.play()\n"
+              "or session.save(file_name).")
+    code.interact(banner=banner, local={"session": session, "Session": Session}, exitmsg="")
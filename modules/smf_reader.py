@@ -0,0 +1,286 @@
+'''
+Standard MIDI File Reader Module for MIDI Song Generator Application
+
+This module contains a small, dependency-free reader for Standard MIDI Files (SMF).
+It is used to read local MIDI files back into plain Python data, for example:-
+                - training melody models from a MIDI corpus
+                - inspecting files written by the generator
+                - validating files (chunk structure, running status, variable length
+                  quantities and note on/off pairing), e.g. after changing the encoder
+
+Every event of a track is decoded by iter_track_events; read_track_notes pairs note on
+and off events into notes, and validate_midi reports everything wrong with a file
+instead of stopping at the first problem.
+
+'''
+
+from collections import namedtuple
+import struct
+import logging
+
+# Number of data bytes of each channel message (by the high nibble of its status byte)
+CHANNEL_DATA_LENGTHS = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+# Payload length of the meta events whose length is fixed by the standard
+META_LENGTHS = {0x20: 1, 0x21: 1, 0x2F: 0, 0x51: 3, 0x54: 5, 0x58: 4, 0x59: 2}
+
+# One decoded event: absolute tick, status byte and data (meta data starts with the meta type)
+MidiEvent = namedtuple("MidiEvent", ["tick", "status", "data"])
+# The outcome of validate_midi
+ValidationResult = namedtuple("ValidationResult", ["problems", "tracks", "events", "notes"])
+
+# 1. Read Variable Length Quantity
+def read_vlq(data, offset):
+    """
+    Read a MIDI variable length quantity.
+
+    Args:
+        data (bytes): The raw MIDI data.
+        offset (int): The position of the first byte of the quantity.
+
+    Returns:
+        tuple: (value, new_offset)
+    """
+    value = 0
+    for _ in range(4):
+        byte = data[offset]
+        offset += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, offset
+    raise ValueError(f"Variable length quantity longer than 4 bytes at offset {offset - 4}.")
+
+# 2. Read Header Chunk
+def read_header(data):
+    """
+    Read the MThd chunk of a MIDI file.
+
+    Args:
+        data (bytes): The raw MIDI data.
+
+    Returns:
+        tuple: (file_format, num_tracks, ticks_per_quarter, offset_after_header)
+    """
+    if data[:4] != b"MThd":
+        raise ValueError("Not a Standard MIDI File: missing MThd chunk.")
+    length, file_format, num_tracks, division = struct.unpack(">LHHH", data[4:14])
+    if division & 0x8000:
+        raise ValueError("SMPTE time division is not supported.")
+    return file_format, num_tracks, division, 8 + length
+
+# 3. Iterate Track Chunks
+def iter_track_chunks(data, offset):
+    """
+    Yield the raw data of every MTrk chunk, skipping unknown chunks.
+
+    Args:
+        data (bytes): The raw MIDI data.
+        offset (int): The position of the first chunk after the header.
+    """
+    while offset + 8 <= len(data):
+        chunk_type = data[offset:offset + 4]
+        (length,) = struct.unpack(">L", data[offset + 4:offset + 8])
+        start = offset + 8
+        offset = start + length
+        if chunk_type == b"MTrk":
+            yield data[start:offset]
+
+# 4. Read Track Events
+def iter_track_events(track_data, problems=None):
+    """
+    Decode every event of a single track, resolving running status.
+
+    Args:
+        track_data (bytes): The raw MTrk chunk data.
+        problems (list): Optional list receiving a message for every encoding that is readable
+                         but not canonical (delta times padded with leading 0x80 bytes).
+
+    Yields:
+        MidiEvent: One event at a time; meta event data starts with the meta type.
+
+    Raises:
+        ValueError: If the track is malformed (the message gives the byte offset).
+    """
+    tick = 0
+    offset = 0
+    status = 0
+    end = len(track_data)
+    try:
+        while offset < end:
+            if problems is not None and track_data[offset] == 0x80:
+                problems.append(f"delta time at offset {offset} is padded with a leading 0x80 byte")
+            delta, offset = read_vlq(track_data, offset)
+            tick += delta
+            byte = track_data[offset]
+            if byte & 0x80:
+                status = byte
+                offset += 1
+            elif not status:
+                raise ValueError(f"Running status used before any status byte at offset {offset}.")
+
+            if status == 0xFF or status in (0xF0, 0xF7):
+                start = offset + 1 if status == 0xFF else offset
+                length, data_start = read_vlq(track_data, start)
+                offset = data_start + length
+                if offset > end:
+                    raise ValueError(f"Event at offset {start} runs past the end of the track.")
+                data = track_data[data_start:offset]
+                yield MidiEvent(tick, status, bytes((track_data[start - 1],)) + data if status == 0xFF else data)
+                status = 0  # Meta and SysEx events cancel running status
+                continue
+            if status > 0xF0:
+                raise ValueError(f"System message 0x{status:02X} is not allowed in a MIDI file (offset {offset - 1}).")
+
+            length = CHANNEL_DATA_LENGTHS[status & 0xF0]
+            data = track_data[offset:offset + length]
+            if len(data) < length:
+                raise ValueError(f"Event at offset {offset} runs past the end of the track.")
+            if any(value & 0x80 for value in data):
+                raise ValueError(f"Data byte with its top bit set at offset {offset}.")
+            offset += length
+            yield MidiEvent(tick, status, data)
+    except IndexError:
+        raise ValueError(f"Track ends in the middle of an event at offset {offset}.")
+
+# 5. Read Note Events
+def read_track_notes(track_data):
+    """
+    Decode the note events of a single track.
+
+    Args:
+        track_data (bytes): The raw MTrk chunk data.
+
+    Returns:
+        list: A list of (tick, channel, pitch, velocity, duration) tuples sorted by tick.
+    """
+    notes = []
+    open_notes = {}
+    for tick, status, data in iter_track_events(track_data):
+        kind = status & 0xF0
+        channel = status & 0x0F
+        if kind == 0x90 and data[1] > 0:
+            open_notes.setdefault((channel, data[0]), []).append((tick, data[1]))
+        elif kind == 0x80 or kind == 0x90:
+            started = open_notes.get((channel, data[0]))
+            if started:
+                start_tick, velocity = started.pop(0)
+                notes.append((start_tick, channel, data[0], velocity, tick - start_tick))
+
+    notes.sort()
+    return notes
+
+# 6. Read MIDI File
+def read_midi_notes(file_name):
+    """
+    Read all note events of a MIDI file.
+
+    Args:
+        file_name (str): Path to the MIDI file.
+
+    Returns:
+        tuple: (ticks_per_quarter, tracks) where tracks is a list of note lists
+               as returned by read_track_notes.
+    """
+    with open(file_name, "rb") as midi_file:
+        data = midi_file.read()
+
+    _, _, ticks_per_quarter, offset = read_header(data)
+    tracks = [read_track_notes(chunk) for chunk in iter_track_chunks(data, offset)]
+    logging.debug(f"Read {sum(len(track) for track in tracks)} notes from {file_name}")
+    return ticks_per_quarter, tracks
+
+# 7. Validate MIDI File
+def validate_midi(data, song_ticks=None):
+    """
+    Check the structure and note pairing of a Standard MIDI File.
+
+    Problems found: a malformed header or chunk, a track count that does not match the
+    header, malformed events (bad running status, overlong or padded variable length
+    quantities, data bytes with the top bit set, truncated events), meta events of the
+    wrong length, a missing or early End of Track, note offs without a note on, notes
+    struck again while they sound and notes left sounding at the end of a track.
+
+    Args:
+        data (bytes): The raw MIDI data.
+        song_ticks (int): Optional length of the song; notes starting at or after it are reported.
+
+    Returns:
+        ValidationResult: The problems found (messages) and the numbers of tracks, events and notes.
+    """
+    problems = []
+    if len(data) < 14 or data[:4] != b"MThd":
+        return ValidationResult(["not a Standard MIDI File: missing MThd chunk"], 0, 0, 0)
+    length, file_format, num_tracks, division = struct.unpack(">LHHH", data[4:14])
+    if length < 6:
+        problems.append(f"header chunk is {length} bytes long, expected at least 6")
+    if file_format > 2:
+        problems.append(f"unknown file format {file_format}")
+    elif file_format == 0 and num_tracks != 1:
+        problems.append(f"format 0 file declares {num_tracks} tracks")
+    if division == 0:
+        problems.append("time division is 0")
+
+    # Chunks
+    chunks = []
+    offset = 8 + length
+    while offset < len(data):
+        if offset + 8 > len(data):
+            problems.append(f"{len(data) - offset} stray bytes after the last chunk")
+            break
+        chunk_type = data[offset:offset + 4]
+        (chunk_length,) = struct.unpack(">L", data[offset + 4:offset + 8])
+        if offset + 8 + chunk_length > len(data):
+            problems.append(f"chunk at offset {offset} runs {offset + 8 + chunk_length - len(data)} bytes past the end")
+            break
+        if chunk_type == b"MTrk":
+            chunks.append(data[offset + 8:offset + 8 + chunk_length])
+        elif not all(0x20 <= value < 0x7F for value in chunk_type):
+            problems.append(f"invalid chunk type {bytes(chunk_type)!r} at offset {offset}")
+        offset += 8 + chunk_length
+    if len(chunks) != num_tracks:
+        problems.append(f"header declares {num_tracks} tracks, found {len(chunks)}")
+
+    # Events and note pairing
+    events = notes = 0
+    for index, chunk in enumerate(chunks):
+        track_problems = []  # (tick or None, message)
+        encoding_problems = []
+        sounding = {}  # (channel, pitch) -> notes on
+        ended = after_end = False
+        try:
+            for tick, status, event_data in iter_track_events(chunk, encoding_problems):
+                events += 1
+                if ended and not after_end:
+                    track_problems.append((tick, "event after End of Track"))
+                    after_end = True
+                if status == 0xFF:
+                    meta_type, expected = event_data[0], META_LENGTHS.get(event_data[0])
+                    if expected is not None and len(event_data) - 1 != expected:
+                        track_problems.append((tick, f"meta event 0x{meta_type:02X} has {len(event_data) - 1} "
+                                                     f"data bytes, expected {expected}"))
+                    ended = ended or meta_type == 0x2F
+                    continue
+                kind, key = status & 0xF0, (status & 0x0F, event_data[0])
+                if kind == 0x90 and event_data[1] > 0:
+                    if sounding.get(key):
+                        track_problems.append((tick, f"note {key[1]} on channel {key[0]} struck again while sounding"))
+                    if song_ticks is not None and tick >= song_ticks:
+                        track_problems.append((tick, f"note {key[1]} starts after the song ends ({song_ticks})"))
+                    sounding[key] = sounding.get(key, 0) + 1
+                    notes += 1
+                elif kind == 0x80 or kind == 0x90:
+                    if not sounding.get(key):
+                        track_problems.append((tick, f"note off without a note on: {key[1]} on channel {key[0]}"))
+                    else:
+                        sounding[key] -= 1
+        except ValueError as e:
+            track_problems.append((None, str(e)))
+        else:
+            if not ended:
+                track_problems.append((None, "no End of Track event"))
+        track_problems += [(None, message) for message in encoding_problems]
+        stuck = sorted(key for key, count in sounding.items() if count)
+        if stuck:
+            track_problems.append((None, f"notes still sounding at the end of the track: {stuck}"))
+        problems += [f"track {index}: {message}" if where is None else f"track {index} at tick {where}: {message}"
+                     for where, message in track_problems]
+    return ValidationResult(problems, len(chunks), events, notes)
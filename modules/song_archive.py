@@ -0,0 +1,242 @@
+'''
+Song Archive Module for MIDI Song Generator Application
+
+This module stores many encoded songs in a single container file. It includes functions for:-
+                - appending songs, with their spec and metadata, to an archive
+                - writing an offset index when the archive is closed
+                - recovering the index of an archive whose writer was interrupted
+                - reading any song (or streaming all of them) through a memory map, without unpacking
+
+Layout (all integers little-endian):
+    header      b"MSA1", version (uint16), reserved (uint16)
+    record      b"SONG", name length, metadata length, data length (uint32 each),
+                then the UTF-8 name, the JSON metadata ({"spec": ..., "metadata": ...}) and the MIDI bytes
+    index       one uint64 record offset per song
+    trailer     index offset (uint64), song count (uint64), b"MSAI"
+
+Records are only ever appended; the index and trailer are written by close() and rewritten
+when more songs are appended later. The reader maps the file once and hands out memoryview
+slices of the map, so looking up a song costs no system calls and no copies.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from array import array
+from collections import namedtuple
+import json
+import mmap
+import struct
+import logging
+
+ARCHIVE_MAGIC = b"MSA1"
+ARCHIVE_VERSION = 1
+ARCHIVE_HEADER = struct.Struct("<4sHH")  # magic, version, reserved
+RECORD_MAGIC = b"SONG"
+RECORD_HEADER = struct.Struct("<4sIII")  # magic, name length, metadata length, data length
+INDEX_MAGIC = b"MSAI"
+ARCHIVE_TRAILER = struct.Struct("<QQ4s")  # index offset, song count, magic
+WRITE_BUFFER_SIZE = 1 << 20  # Records are gathered into 1 MiB writes
+
+# One song of an archive; data is a memoryview of the archive's map, which stays mapped while it is referenced
+ArchiveEntry = namedtuple("ArchiveEntry", ["name", "spec", "metadata", "data"])
+
+# 1. Read Index
+def _offsets_from_bytes(data):
+    offsets = array("Q")
+    offsets.frombytes(data)
+    if sys.byteorder == "big":
+        offsets.byteswap()
+    return offsets
+
+def read_archive_index(buffer):
+    """
+    Return the record offsets of an archive held in a buffer (a file map or bytes).
+
+    The offset index written by close() is used when it is intact; otherwise the records
+    are scanned from the start, and a torn final record is ignored.
+
+    Args:
+        buffer (buffer): The whole archive file.
+
+    Returns:
+        tuple: (offsets array, end of the last complete record)
+    """
+    size = len(buffer)
+    if size < ARCHIVE_HEADER.size:
+        raise ValueError("Not a song archive: the file is too short.")
+    magic, version, _ = ARCHIVE_HEADER.unpack_from(buffer, 0)
+    if magic != ARCHIVE_MAGIC:
+        raise ValueError("Not a song archive: bad magic number.")
+    if version != ARCHIVE_VERSION:
+        raise ValueError(f"Unsupported song archive version: {version}")
+
+    # Indexed archive: the trailer points at an index that ends right before it
+    if size >= ARCHIVE_HEADER.size + ARCHIVE_TRAILER.size:
+        index_offset, count, index_magic = ARCHIVE_TRAILER.unpack_from(buffer, size - ARCHIVE_TRAILER.size)
+        if index_magic == INDEX_MAGIC and index_offset + count * 8 == size - ARCHIVE_TRAILER.size:
+            return _offsets_from_bytes(buffer[index_offset:index_offset + count * 8]), index_offset
+
+    # Interrupted archive: walk the records
+    logging.warning("Song archive has no index; scanning its records.")
+    offsets = array("Q")
+    offset = ARCHIVE_HEADER.size
+    while offset + RECORD_HEADER.size <= size:
+        magic, name_length, metadata_length, data_length = RECORD_HEADER.unpack_from(buffer, offset)
+        end = offset + RECORD_HEADER.size + name_length + metadata_length + data_length
+        if magic != RECORD_MAGIC or end > size:
+            break
+        offsets.append(offset)
+        offset = end
+    return offsets, offset
+
+# Appends songs to an archive file
+class ArchiveWriter:
+    def __init__(self, file_name, append=True):
+        """
+        Args:
+            file_name (str): The archive file; created if it does not exist.
+            append (bool): Keep the songs of an existing archive (otherwise it is overwritten).
+        """
+        self.file_name = file_name
+        self._offsets = array("Q")
+        if append and os.path.exists(file_name) and os.path.getsize(file_name) > 0:
+            with open(file_name, "rb") as archive_file:
+                with mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    self._offsets, end = read_archive_index(buffer)
+            self._file = open(file_name, "r+b", buffering=WRITE_BUFFER_SIZE)
+            self._file.seek(end)
+            self._file.truncate()  # Drop the old index; close() writes a new one
+        else:
+            self._file = open(file_name, "wb", buffering=WRITE_BUFFER_SIZE)
+            self._file.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, 0))
+        self._position = self._file.tell()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def add(self, name, data, spec=None, metadata=None):
+        """
+        Append one song.
+
+        Args:
+            name (str): The song's name (usually its file name).
+            data (bytes-like): The encoded MIDI file.
+            spec (dict): The song spec it was rendered from.
+            metadata (dict): Any other JSON-serialisable details.
+        """
+        if self._file is None:
+            raise ValueError("The song archive is closed.")
+        name_bytes = name.encode("utf-8")
+        metadata_bytes = json.dumps({"spec": spec, "metadata": metadata}, separators=(",", ":")).encode("utf-8")
+        size = len(data)
+        self._file.write(RECORD_HEADER.pack(RECORD_MAGIC, len(name_bytes), len(metadata_bytes), size))
+        self._file.write(name_bytes)
+        self._file.write(metadata_bytes)
+        self._file.write(data)
+        self._offsets.append(self._position)
+        self._position += RECORD_HEADER.size + len(name_bytes) + len(metadata_bytes) + size
+
+    def flush(self):
+        """Push buffered records to the operating system, e.g. before recording them as done elsewhere."""
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self):
+        """Write the offset index and close the archive."""
+        if self._file is None:
+            return
+        offsets = self._offsets
+        if sys.byteorder == "big":
+            offsets = array("Q", offsets)
+            offsets.byteswap()
+        self._file.write(offsets.tobytes())
+        self._file.write(ARCHIVE_TRAILER.pack(self._position, len(self._offsets), INDEX_MAGIC))
+        self._file.close()
+        self._file = None
+        logging.info(f"Song archive {self.file_name} holds {len(self._offsets)} songs.")
+
+# Random access to the songs of an archive through a read-only memory map
+class SongArchive:
+    def __init__(self, file_name):
+        """
+        Args:
+            file_name (str): The archive file.
+        """
+        self.file_name = file_name
+        with open(file_name, "rb") as archive_file:
+            self._map = mmap.mmap(archive_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self._offsets, _ = read_archive_index(self._map)
+        self._names = None
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getitem__(self, index):
+        """Return the ArchiveEntry at a position (negative positions count from the end)."""
+        offset = self._offsets[index]
+        _, name_length, metadata_length, data_length = RECORD_HEADER.unpack_from(self._map, offset)
+        start = offset + RECORD_HEADER.size
+        name = bytes(self._view[start:start + name_length]).decode("utf-8")
+        start += name_length
+        record = json.loads(bytes(self._view[start:start + metadata_length]))
+        start += metadata_length
+        return ArchiveEntry(name, record["spec"], record["metadata"], self._view[start:start + data_length])
+
+    def __iter__(self):
+        """Stream the songs in the order they were added."""
+        for index in range(len(self._offsets)):
+            yield self[index]
+
+    def names(self):
+        """Return the song names in archive order, without touching the song data."""
+        names = []
+        for offset in self._offsets:
+            name_length = RECORD_HEADER.unpack_from(self._map, offset)[1]
+            start = offset + RECORD_HEADER.size
+            names.append(bytes(self._view[start:start + name_length]).decode("utf-8"))
+        return names
+
+    def get(self, name):
+        """
+        Return the song with a given name (the last one, if a name was added twice), or None.
+        """
+        if self._names is None:
+            self._names = {song_name: index for index, song_name in enumerate(self.names())}
+        index = self._names.get(name)
+        return None if index is None else self[index]
+
+    def close(self):
+        """
+        Release the memory map.
+
+        Entry data still referenced elsewhere keeps the map alive until the last of it is
+        dropped; copy it with bytes() to keep it past that point.
+        """
+        if self._map is None:
+            return
+        self._view.release()
+        try:
+            self._map.close()
+        except BufferError:
+            # Live entry slices still export the map; it is unmapped when they are collected
+            logging.debug(f"Song archive {self.file_name} is still referenced; leaving it mapped.")
+        self._view = self._map = None
@@ -0,0 +1,312 @@
+'''
+Song Specification Module for MIDI Song Generator Application
+
+This module describes songs as data files instead of Qt widget state. It includes functions for:-
+                - loading a song spec from JSON, TOML or YAML
+                - validating and normalising a spec against the configuration
+                - streaming specs from a JSON-Lines manifest
+                - rendering a manifest through the batch renderer
+
+A song spec is a mapping such as:
+
+    {
+        "file_name": "jazz_01.mid",
+        "genre": "Jazz",
+        "bpm": 140,
+        "key": "G", "scale": "Dorian", "time_signature": "4/4",
+        "instruments": ["Saxophone", "Piano", "Double Bass"],
+        "sections": [{"name": "Head", "bars": 8}, ["Solo", 16], ["Vamp", 4, "7/8"]],
+        "options": {"enable_countermelody": true}
+    }
+
+Only "genre" is required; missing fields are filled from the genre defaults (including genres
+added by plug-ins). A validated
+spec is a dictionary of create_midi keyword arguments.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.configuration import is_valid_key, is_valid_scale, is_valid_genre, is_valid_instrument
+from modules.config_registry import get_config
+from modules.rhythm_grid import parse_time_signature
+from modules.note_stream import MAX_PPQ
+import json
+import logging
+
+MIN_BPM = 20
+MAX_BPM = 300
+MAX_SECTION_BARS = 1024
+DEFAULT_FILE_NAME = "output.mid"
+
+# Boolean create_midi options accepted under "options"
+BOOLEAN_OPTIONS = (
+    "enable_dynamic_tempo", "enable_dynamics", "enable_modulation",
+    "enable_ornamentation", "enable_countermelody", "enable_percussion", "enable_humanize",
+    "enable_arrangement",
+)
+# Other create_midi options accepted under "options", with their expected types
+VALUE_OPTIONS = {
+    "melody_model_dir": str,
+    "tempo_resolution": (int, float),
+    "seed": int,
+    "ppq": int,
+}
+
+# 1. Field Checks
+def _check_time_signature(value):
+    try:
+        parse_time_signature(value)
+    except ValueError as e:
+        return str(e)
+    return None
+
+def _check_genre(value):
+    if isinstance(value, str) and (is_valid_genre(value) or value in get_config().genre_defaults):
+        return None
+    return f"invalid genre: {value!r}"
+
+def _check_bpm(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return f"bpm must be a number, got {value!r}"
+    if not MIN_BPM <= value <= MAX_BPM:
+        return f"bpm must be between {MIN_BPM} and {MAX_BPM}, got {value}"
+    return None
+
+def _check_instruments(value):
+    if not isinstance(value, list) or not value:
+        return "instruments must be a non-empty list"
+    unknown = [name for name in value if not isinstance(name, str) or not is_valid_instrument(name)]
+    if unknown:
+        return f"unknown instruments: {unknown}"
+    return None
+
+# Compiled rule table: field -> check returning an error message or None
+FIELD_CHECKS = {
+    "file_name": lambda value: None if isinstance(value, str) and value else "file_name must be a non-empty string",
+    "genre": _check_genre,
+    "key": lambda value: None if isinstance(value, str) and is_valid_key(value) else f"invalid key: {value!r}",
+    "scale": lambda value: None if isinstance(value, str) and is_valid_scale(value) else f"invalid scale: {value!r}",
+    "time_signature": _check_time_signature,
+    "bpm": _check_bpm,
+    "instruments": _check_instruments,
+}
+KNOWN_FIELDS = frozenset(FIELD_CHECKS) | {"sections", "options"}
+
+# 2. Normalise Sections
+def normalise_sections(sections, errors):
+    """
+    Convert section entries into (name, bars) tuples.
+
+    A section may change the metre with an optional time signature, given as a
+    "time_signature" field or a third list element; it is then a (name, bars, time_signature) tuple.
+
+    Args:
+        sections (list): Entries given as {"name": ..., "bars": ...} mappings or [name, bars] pairs.
+        errors (list): Error messages are appended here.
+
+    Returns:
+        list: A list of (name, bars) or (name, bars, time_signature) tuples.
+    """
+    if not isinstance(sections, (list, tuple)) or not sections:
+        errors.append("sections must be a non-empty list")
+        return []
+
+    normalised = []
+    for index, section in enumerate(sections):
+        if isinstance(section, dict):
+            name, bars, time_signature = section.get("name"), section.get("bars"), section.get("time_signature")
+        elif isinstance(section, (list, tuple)) and len(section) in (2, 3):
+            name, bars, time_signature = (tuple(section) + (None,))[:3]
+        else:
+            errors.append(f"sections[{index}] must be a mapping with 'name' and 'bars' or a [name, bars] pair")
+            continue
+        if not isinstance(name, str) or not name:
+            errors.append(f"sections[{index}] has an invalid name: {name!r}")
+        elif isinstance(bars, bool) or not isinstance(bars, int) or not 1 <= bars <= MAX_SECTION_BARS:
+            errors.append(f"sections[{index}] must have between 1 and {MAX_SECTION_BARS} bars, got {bars!r}")
+        elif time_signature is None:
+            normalised.append((name, bars))
+        else:
+            message = _check_time_signature(time_signature)
+            if message:
+                errors.append(f"sections[{index}]: {message}")
+            else:
+                normalised.append((name, bars, time_signature))
+    return normalised
+
+# 3. Validate Song Spec
+def validate_song_spec(raw_spec):
+    """
+    Validate a song spec and fill in genre defaults.
+
+    Args:
+        raw_spec (dict): The spec as loaded from a file.
+
+    Returns:
+        dict: create_midi keyword arguments.
+
+    Raises:
+        ValueError: If the spec is invalid; the message lists every problem found.
+    """
+    if not isinstance(raw_spec, dict):
+        raise ValueError(f"Song spec must be a mapping, got {type(raw_spec).__name__}.")
+
+    errors = []
+    unknown = sorted(set(raw_spec) - KNOWN_FIELDS)
+    if unknown:
+        errors.append(f"unknown fields: {unknown}")
+
+    genre = raw_spec.get("genre")
+    if genre is None:
+        errors.append("genre is required")
+    config = get_config()  # Includes genres added by plug-ins
+    genre_key = genre if isinstance(genre, str) else None  # Other values (reported below) may be unhashable
+    defaults = config.genre_defaults.get(genre_key, {})
+
+    spec = {
+        "file_name": raw_spec.get("file_name", DEFAULT_FILE_NAME),
+        "bpm": raw_spec.get("bpm", 120),
+        "time_signature": raw_spec.get("time_signature", defaults.get("time_signature", "4/4")),
+        "scale": raw_spec.get("scale", defaults.get("scale", "Major")),
+        "key": raw_spec.get("key", defaults.get("key", "C")),
+        "genre": genre,
+        "instruments": raw_spec.get("instruments", defaults.get("instruments", [])),
+    }
+    if isinstance(spec["instruments"], (list, tuple)):
+        spec["instruments"] = list(spec["instruments"])  # A copy, never the configuration's own list
+    for field, check in FIELD_CHECKS.items():
+        if field == "genre" and genre is None:
+            continue
+        message = check(spec[field])
+        if message:
+            errors.append(message)
+
+    spec["sections"] = normalise_sections(raw_spec.get("sections", config.genre_sections.get(genre_key, [])), errors)
+
+    options = raw_spec.get("options", {})
+    if not isinstance(options, dict):
+        errors.append("options must be a mapping")
+        options = {}
+    for name, value in options.items():
+        if name in BOOLEAN_OPTIONS:
+            if not isinstance(value, bool):
+                errors.append(f"option {name} must be true or false, got {value!r}")
+        elif name in VALUE_OPTIONS:
+            if isinstance(value, bool) or not isinstance(value, VALUE_OPTIONS[name]):
+                errors.append(f"option {name} has the wrong type: {value!r}")
+            elif name == "ppq" and not 1 <= value <= MAX_PPQ:
+                errors.append(f"option ppq must be between 1 and {MAX_PPQ}, got {value}")
+            elif name == "tempo_resolution" and not 0 < value < float("inf"):
+                errors.append(f"option tempo_resolution must be a positive number, got {value}")
+        else:
+            errors.append(f"unknown option: {name}")
+            continue
+        spec[name] = value
+
+    if errors:
+        raise ValueError("Invalid song spec: " + "; ".join(errors))
+    return spec
+
+# 4. Parse Spec Text
+def parse_song_spec(text, file_format="json"):
+    """
+    Parse the text of a song spec.
+
+    Args:
+        text (str): The spec text.
+        file_format (str): "json", "toml" or "yaml".
+
+    Returns:
+        dict: The raw (unvalidated) spec.
+    """
+    if file_format == "json":
+        return json.loads(text)
+    if file_format == "toml":
+        try:
+            import tomllib  # Python 3.11+; imported here so JSON-only runs start quickly
+        except ImportError:
+            raise ValueError("TOML song specs need Python 3.11 or newer.")
+        return tomllib.loads(text)
+    if file_format == "yaml":
+        try:
+            import yaml  # Optional dependency (PyYAML)
+        except ImportError:
+            raise ValueError("YAML song specs need the PyYAML package (pip install pyyaml).")
+        return yaml.safe_load(text)
+    raise ValueError(f"Unsupported song spec format: {file_format}")
+
+# 5. Load Song Spec
+def load_song_spec(file_name):
+    """
+    Load and validate a song spec file; the format is chosen from the file extension.
+
+    Args:
+        file_name (str): Path to a .json, .toml, .yaml or .yml file.
+
+    Returns:
+        dict: create_midi keyword arguments.
+    """
+    extension = os.path.splitext(file_name)[1].lower()
+    file_format = {".json": "json", ".toml": "toml", ".yaml": "yaml", ".yml": "yaml"}.get(extension)
+    if file_format is None:
+        raise ValueError(f"Unsupported song spec file: {file_name}")
+    with open(file_name, "r", encoding="utf-8") as spec_file:
+        return validate_song_spec(parse_song_spec(spec_file.read(), file_format))
+
+# 6. Iterate Manifest
+def iter_manifest(manifest, strict=False):
+    """
+    Stream validated song specs from a JSON-Lines manifest, one spec per line.
+
+    Blank lines and lines starting with '#' are ignored. Invalid lines are logged and
+    skipped unless strict is set.
+
+    Args:
+        manifest (str or file): Path to the manifest, or an open text file.
+        strict (bool): Raise on the first invalid line instead of skipping it.
+
+    Yields:
+        dict: create_midi keyword arguments.
+    """
+    if isinstance(manifest, str):
+        with open(manifest, "r", encoding="utf-8") as manifest_file:
+            yield from iter_manifest(manifest_file, strict)
+        return
+
+    for line_number, line in enumerate(manifest, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            yield validate_song_spec(json.loads(line))
+        except ValueError as e:  # json.JSONDecodeError is a ValueError
+            if strict:
+                raise ValueError(f"Manifest line {line_number}: {e}") from e
+            logging.error(f"Skipping manifest line {line_number}: {e}")
+
+# 7. Render Manifest
+def render_manifest(manifest, output_dir=None, processes=None, dedupe_index=None, archive_file=None):
+    """
+    Render every song of a manifest in parallel, to separate files or to one song archive.
+
+    Args:
+        manifest (str or file): Path to the manifest, or an open text file.
+        output_dir (str): Optional directory that relative file names are resolved against.
+        processes (int): Number of worker processes.
+        dedupe_index (FingerprintIndex): Optional index; near-duplicate songs are regenerated or skipped.
+        archive_file (str): Optional song archive to append the songs to instead of writing files.
+
+    Returns:
+        list: Paths of the files that were written, or names of the songs that were archived.
+    """
+    # Deferred: the process pool is only needed for batches
+    from modules.batch_render import render_batch, render_batch_archive
+    if archive_file:
+        return render_batch_archive(iter_manifest(manifest), archive_file, processes, dedupe_index)
+    return render_batch(iter_manifest(manifest), output_dir, processes, dedupe_index)
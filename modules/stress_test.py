@@ -0,0 +1,228 @@
+'''
+Stress Test Module for MIDI Song Generator Application
+
+This module runs the generator over large grids of parameters and checks what it writes. It includes functions for:-
+                - producing grid cases that cover every genre, key, scale and flag combination
+                - producing fuzz cases from random but valid song specs
+                - composing and encoding each case with its sections stretched to a large length
+                - checking invariants of the encoded file with modules.smf_reader.validate_midi
+                  (valid MIDI ranges, monotonic times, paired note on/off events, no stuck
+                  notes, notes inside the song)
+                - recording the time and peak memory of every case in a JSON-Lines report
+
+In grid mode every (genre, key, scale) case gets the next of the 2^8 flag combinations in
+turn, so all of them are exercised without rendering the full product; --exhaustive renders
+the full product instead. Peak memory is measured with tracemalloc, which slows the
+generator down; run with --no-memory to time the cases without it.
+
+Example:
+    python -m modules.stress_test --bars 256 --genres Pop,Jazz --report stress.jsonl
+    python -m modules.stress_test --fuzz 500 --seed 7
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.midi_generator import compose_song, write_song
+from modules.song_spec import BOOLEAN_OPTIONS, MAX_BPM, MIN_BPM, validate_song_spec
+from modules.smf_reader import validate_midi
+from modules.note_stream import DEFAULT_PPQ
+from modules.config_registry import get_config
+from collections import namedtuple
+from itertools import product
+import argparse
+import io
+import json
+import random
+import time
+import tracemalloc
+import logging
+
+DEFAULT_STRESS_BARS = 128  # Bars of every section in grid cases
+FUZZ_TIME_SIGNATURES = ("4/4", "3/4", "2/4", "6/8", "5/4", "7/8", "12/8")
+FLAG_COMBINATIONS = [dict(zip(BOOLEAN_OPTIONS, values)) for values in product((False, True), repeat=len(BOOLEAN_OPTIONS))]
+
+# The outcome of one case; seconds and peak_bytes cover composing and encoding
+CaseResult = namedtuple("CaseResult", ["name", "spec", "seconds", "peak_bytes", "notes", "size", "failures"])
+
+# 1. Grid Cases
+def iter_grid_cases(genres, keys, scales, bars=DEFAULT_STRESS_BARS, exhaustive=False, seed=0):
+    """
+    Yield raw song specs covering every genre, key, scale and flag combination.
+
+    Args:
+        genres (list): Genres.
+        keys (list): Keys.
+        scales (list): Scales.
+        bars (int): Bars of every section (each genre keeps its own section names).
+        exhaustive (bool): Render every flag combination for every (genre, key, scale).
+        seed (int): Seed of the first case; each case uses the next one.
+
+    Yields:
+        tuple: (case name, raw song spec)
+    """
+    config = get_config()
+    count = 0
+    for genre, key, scale in product(genres, keys, scales):
+        sections = [[section[0], bars] + list(section[2:]) for section in config.genre_sections.get(genre, [])]
+        combinations = FLAG_COMBINATIONS if exhaustive else [FLAG_COMBINATIONS[count % len(FLAG_COMBINATIONS)]]
+        for flags in combinations:
+            flag_bits = "".join("1" if flags[name] else "0" for name in BOOLEAN_OPTIONS)
+            yield (f"{genre}/{key}/{scale}/{flag_bits}",
+                   {"genre": genre, "key": key, "scale": scale, "sections": sections,
+                    "options": dict(flags, seed=seed + count)})
+            count += 1
+
+# 2. Fuzz Cases
+def iter_fuzz_cases(count, max_bars=DEFAULT_STRESS_BARS, seed=0):
+    """
+    Yield random, valid song specs.
+
+    Tempo, metre, instruments, section count and lengths (including per-section metre
+    changes) and every flag are drawn at random.
+
+    Args:
+        count (int): Number of cases.
+        max_bars (int): Longest section.
+        seed (int): Seed of the case generator.
+
+    Yields:
+        tuple: (case name, raw song spec)
+    """
+    config = get_config()
+    rng = random.Random(seed)
+    genres, instruments = list(config.genre_defaults), sorted(config.instrument_map)
+    for index in range(count):
+        sections = []
+        for number in range(rng.randint(1, 8)):
+            section = [rng.choice(["Intro", "Verse", "Chorus", "Bridge", "Solo", "Outro", f"Part{number}"]),
+                       rng.choice([1, 2, rng.randint(1, max_bars), max_bars])]
+            if rng.random() < 0.2:
+                section.append(rng.choice(FUZZ_TIME_SIGNATURES))
+            sections.append(section)
+        options = {name: rng.random() < 0.5 for name in BOOLEAN_OPTIONS}
+        options["seed"] = rng.getrandbits(32)
+        yield (f"fuzz/{index}",
+               {"genre": rng.choice(genres), "key": rng.choice(config.keys), "scale": rng.choice(config.scales),
+                "bpm": rng.randint(MIN_BPM, MAX_BPM), "time_signature": rng.choice(FUZZ_TIME_SIGNATURES),
+                "instruments": rng.sample(instruments, rng.randint(1, 6)), "sections": sections,
+                "options": options})
+
+# 3. Run Case
+def run_case(name, raw_spec, trace_memory=True):
+    """
+    Compose, encode and check one case.
+
+    Args:
+        name (str): The case name.
+        raw_spec (dict): The raw song spec.
+        trace_memory (bool): Measure the peak memory of the case with tracemalloc.
+
+    Returns:
+        CaseResult: The outcome; an exception raised by the generator is reported as a failure.
+    """
+    if trace_memory:
+        tracemalloc.start()
+    started = time.perf_counter()
+    try:
+        spec = validate_song_spec(raw_spec)
+        del spec["file_name"]
+        ppq = spec.pop("ppq", DEFAULT_PPQ)
+        song = compose_song(**spec)
+        buffer = io.BytesIO()
+        write_song(song, ppq=ppq).writeFile(buffer)
+        data = buffer.getvalue()
+    except Exception as e:
+        logging.debug(f"Case {name} raised", exc_info=True)
+        failures, notes, data = [f"{type(e).__name__}: {e}"], 0, b""
+    else:
+        last = song.spans[-1]
+        validation = validate_midi(data, round((last.start + last.length) * ppq))
+        failures, notes = validation.problems, validation.notes
+    seconds = time.perf_counter() - started
+    peak_bytes = 0
+    if trace_memory:
+        peak_bytes = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return CaseResult(name, raw_spec, seconds, peak_bytes, notes, len(data), failures)
+
+# 4. Run Stress Test
+def run_stress_test(cases, report_file=None, trace_memory=True):
+    """
+    Run cases and report their outcomes.
+
+    Args:
+        cases (iterable): (case name, raw song spec) pairs.
+        report_file (str): Optional JSON-Lines file receiving one record per case.
+        trace_memory (bool): Measure the peak memory of every case.
+
+    Returns:
+        list: CaseResult tuples, in case order.
+    """
+    results = []
+    report = open(report_file, "w", encoding="utf-8") if report_file else None
+    try:
+        for name, raw_spec in cases:
+            result = run_case(name, raw_spec, trace_memory)
+            results.append(result)
+            if result.failures:
+                logging.error(f"{name} failed: {'; '.join(result.failures[:5])}")
+            else:
+                logging.info(f"{name}: {result.notes} notes in {result.seconds * 1000:.0f} ms, "
+                             f"peak {result.peak_bytes / 1048576:.1f} MiB")
+            if report is not None:
+                report.write(json.dumps(result._asdict()) + "\n")
+    finally:
+        if report is not None:
+            report.close()
+    return results
+
+# Run the stress test from the command line
+if __name__ == "__main__":
+    from modules.param_sweep import parse_names
+
+    config = get_config()
+    parser = argparse.ArgumentParser(description="Render large grids of songs and check the files written.")
+    parser.add_argument("--genres", default="all", help="Comma-separated genres, or 'all' (default).")
+    parser.add_argument("--keys", default="all", help="Comma-separated keys, or 'all' (default).")
+    parser.add_argument("--scales", default="all", help="Comma-separated scales, or 'all' (default).")
+    parser.add_argument("--bars", type=int, default=DEFAULT_STRESS_BARS, help="Bars of every section.")
+    parser.add_argument("--exhaustive", action="store_true", help="Render every flag combination of every case.")
+    parser.add_argument("--fuzz", type=int, default=0, help="Render this many random specs instead of the grid.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the cases.")
+    parser.add_argument("--limit", type=int, help="Stop after this many cases.")
+    parser.add_argument("--report", help="JSON-Lines file receiving the outcome of every case.")
+    parser.add_argument("--no-memory", action="store_true", help="Do not trace memory (faster, timing only).")
+    parser.add_argument("--verbose", action="store_true", help="Log every case, not only failures.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR,
+                        format="%(asctime)s - %(levelname)s - %(message)s")
+    try:
+        if args.fuzz:
+            cases = iter_fuzz_cases(args.fuzz, args.bars, args.seed)
+        else:
+            cases = iter_grid_cases(parse_names(args.genres, config.genre_defaults, "genres"),
+                                    parse_names(args.keys, config.keys, "keys"),
+                                    parse_names(args.scales, config.scales, "scales"),
+                                    args.bars, args.exhaustive, args.seed)
+    except ValueError as e:
+        sys.exit(f"error: {e}")
+    if args.limit:
+        cases = (case for _, case in zip(range(args.limit), cases))
+    results = run_stress_test(cases, args.report, not args.no_memory)
+
+    failed = [result for result in results if result.failures]
+    slowest = max(results, key=lambda result: result.seconds, default=None)
+    print(f"{len(results)} cases, {len(failed)} failed.")
+    if slowest is not None:
+        print(f"Slowest: {slowest.name} ({slowest.seconds:.2f} s, {slowest.notes} notes); "
+              f"largest peak memory: {max(result.peak_bytes for result in results) / 1048576:.1f} MiB")
+    for result in failed:
+        print(f"FAILED {result.name}: {'; '.join(result.failures[:5])}")
+    sys.exit(1 if failed else 0)
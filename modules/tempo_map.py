@@ -0,0 +1,230 @@
+'''
+Tempo Map Module for MIDI Song Generator Application
+
+This module plans the tempo and metre of a whole song before any notes are written. It includes functions for:-
+                - laying sections out in time, each with its own time signature
+                - sampling tempo ramps (ritardando, accelerando) at a fixed resolution
+                - coalescing the samples so only real tempo changes become MIDI events
+                - converting between quarter notes and seconds through cumulative tables
+                - writing the tempo and time signature events to the tempo track
+
+Sections are (name, bars) pairs, or (name, bars, time_signature) triples for a change of
+metre. With dynamic tempo enabled, each section's tempo curve comes from the configuration's
+SECTION_TEMPO table. Times are in quarter notes, as everywhere else in the application.
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.config_registry import get_config
+from modules.rhythm_grid import parse_time_signature
+from array import array
+from bisect import bisect_right
+from collections import namedtuple
+import math
+import logging
+
+DEFAULT_TEMPO_RESOLUTION = 1.0  # Quarter notes between tempo samples inside a ramp
+MICROSECONDS_PER_MINUTE = 60000000
+MIN_BPM = 4  # Lowest tempo a ramp may reach (the MIDI tempo field holds at most ~3.6 BPM)
+
+# Shapes of a tempo ramp: progress (0-1) through the section -> progress of the tempo change
+TEMPO_CURVES = {
+    "constant": lambda progress: 0.0,
+    "linear": lambda progress: progress,
+    "ease_in": lambda progress: progress * progress,  # Changes slowly at first (ritardando at the end)
+    "ease_out": lambda progress: 1.0 - (1.0 - progress) ** 2,  # Changes quickly at first
+}
+
+# Where one section sits in the song
+SectionSpan = namedtuple("SectionSpan", ["name", "bars", "time_signature", "start", "length"])
+
+# 1. Lay Out Sections
+def get_section_spans(sections, time_signature):
+    """
+    Place each section in time.
+
+    Args:
+        sections (list): (name, bars) pairs or (name, bars, time_signature) triples.
+        time_signature (str): Time signature of sections that do not give their own.
+
+    Returns:
+        list: SectionSpan tuples with start and length in quarter notes.
+    """
+    spans = []
+    start = 0.0
+    for section in sections:
+        name, bars = section[0], section[1]
+        section_signature = section[2] if len(section) > 2 and section[2] else time_signature
+        beats_per_bar, beat_unit = parse_time_signature(section_signature)
+        length = bars * beats_per_bar * 4 / beat_unit
+        spans.append(SectionSpan(name, bars, section_signature, start, length))
+        start += length
+    return spans
+
+# Tempo and metre of a whole song, with lookup tables between quarter notes and seconds
+class TempoMap:
+    def __init__(self, tempo_events, time_signatures):
+        """
+        Args:
+            tempo_events (list): (time, bpm) changes, sorted by time, starting at 0.
+            time_signatures (list): (time, time_signature) changes, sorted by time.
+        """
+        self.tempo_events = list(tempo_events)
+        self.time_signatures = list(time_signatures)
+        self.times = array("d", (time for time, _ in tempo_events))
+        self.tempos = array("l", (get_midi_tempo(bpm) for _, bpm in tempo_events))  # Microseconds per quarter
+
+        # Cumulative seconds at each tempo change
+        self.seconds = array("d", [0.0])
+        for index in range(1, len(self.times)):
+            elapsed = (self.times[index] - self.times[index - 1]) * self.tempos[index - 1] / 1e6
+            self.seconds.append(self.seconds[-1] + elapsed)
+
+    def __len__(self):
+        return len(self.times)
+
+    def __repr__(self):
+        return f"TempoMap({len(self)} tempo events, {len(self.time_signatures)} time signatures)"
+
+    def bpm_at(self, time):
+        """Return the tempo in beats per minute at a time in quarter notes."""
+        index = max(0, bisect_right(self.times, time) - 1)
+        return MICROSECONDS_PER_MINUTE / self.tempos[index]
+
+    def seconds_at(self, time):
+        """Convert a time in quarter notes to seconds from the start of the song."""
+        index = max(0, bisect_right(self.times, time) - 1)
+        return self.seconds[index] + (time - self.times[index]) * self.tempos[index] / 1e6
+
+    def time_at(self, seconds):
+        """Convert seconds from the start of the song to a time in quarter notes."""
+        index = max(0, bisect_right(self.seconds, seconds) - 1)
+        return self.times[index] + (seconds - self.seconds[index]) * 1e6 / self.tempos[index]
+
+    def region(self, start, end):
+        """Return the tempo map of the span start..end, shifted so that start becomes time 0."""
+        first = max(0, bisect_right(self.times, start) - 1)
+        tempo_events = [(0.0, self.tempo_events[first][1])]
+        tempo_events += [(time - start, bpm) for time, bpm in self.tempo_events[first + 1:] if time < end]
+
+        signature_times = [time for time, _ in self.time_signatures]
+        first = max(0, bisect_right(signature_times, start) - 1)
+        time_signatures = [(0.0, self.time_signatures[first][1])]
+        time_signatures += [(time - start, signature) for time, signature in self.time_signatures[first + 1:]
+                            if time < end]
+        return TempoMap(tempo_events, time_signatures)
+
+# 2. MIDI Tempo
+def get_midi_tempo(bpm):
+    """
+    Return the tempo in microseconds per quarter note, rounded the way midiutil writes it.
+
+    Args:
+        bpm (float): The tempo in beats per minute.
+
+    Returns:
+        int: Microseconds per quarter note.
+    """
+    return int(MICROSECONDS_PER_MINUTE / bpm)
+
+# 3. Sample Tempo Curve
+def sample_tempo_curve(start, length, start_bpm, end_bpm, curve="linear", resolution=DEFAULT_TEMPO_RESOLUTION):
+    """
+    Sample a tempo ramp over one section.
+
+    Args:
+        start (float): Start of the section in quarter notes.
+        length (float): Length of the section in quarter notes.
+        start_bpm (float): Tempo at the start of the section.
+        end_bpm (float): Tempo reached by the last sample of the section.
+        curve (str): A name in TEMPO_CURVES.
+        resolution (float): Quarter notes between samples.
+
+    Returns:
+        list: (time, bpm) samples.
+    """
+    if curve not in TEMPO_CURVES:
+        raise ValueError(f"Unknown tempo curve: {curve}")
+    if resolution <= 0:
+        raise ValueError(f"Tempo resolution must be positive, got {resolution}")
+    shape = TEMPO_CURVES[curve]
+    steps = max(1, math.ceil(length / resolution))
+    if curve == "constant" or start_bpm == end_bpm or steps == 1:
+        return [(start, start_bpm)]
+    change = end_bpm - start_bpm
+    return [(start + step * resolution, start_bpm + change * shape(step / (steps - 1))) for step in range(steps)]
+
+# 4. Build Tempo Map
+def build_tempo_map(sections, bpm, time_signature, enable_dynamic_tempo=False,
+                    resolution=DEFAULT_TEMPO_RESOLUTION, config=None):
+    """
+    Plan the tempo and time signature changes of a song.
+
+    Samples that round to the same MIDI tempo (microseconds per quarter note) as the
+    previous event are dropped, as are repeated time signatures.
+
+    Args:
+        sections (list): (name, bars) pairs or (name, bars, time_signature) triples.
+        bpm (float): The base tempo.
+        time_signature (str): The song's time signature.
+        enable_dynamic_tempo (bool): Apply the section tempo curves of SECTION_TEMPO.
+        resolution (float): Quarter notes between samples inside a tempo ramp.
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
+
+    Returns:
+        TempoMap: The coalesced tempo map.
+    """
+    section_tempo = (config or get_config()).section_tempo
+    tempo_events = []
+    time_signatures = []
+    for span in get_section_spans(sections, time_signature):
+        if not time_signatures or time_signatures[-1][1] != span.time_signature:
+            time_signatures.append((span.start, span.time_signature))
+
+        automation = section_tempo.get(span.name.lower()) if enable_dynamic_tempo else None
+        if automation:
+            samples = sample_tempo_curve(span.start, span.length, bpm + automation.get("start", 0),
+                                         bpm + automation.get("end", 0), automation.get("curve", "linear"),
+                                         resolution)
+        else:
+            samples = [(span.start, bpm)]
+
+        for time, sample_bpm in samples:
+            sample_bpm = max(MIN_BPM, sample_bpm)
+            if not tempo_events or get_midi_tempo(tempo_events[-1][1]) != get_midi_tempo(sample_bpm):
+                tempo_events.append((time, sample_bpm))
+
+    if not tempo_events:
+        tempo_events.append((0.0, bpm))
+        time_signatures.append((0.0, time_signature))
+    logging.debug(f"Tempo map: {len(tempo_events)} tempo events, {len(time_signatures)} time signatures")
+    return TempoMap(tempo_events, time_signatures)
+
+# 5. Write Tempo Map
+def write_tempo_map(midi, tempo_map, track=0):
+    """
+    Write the tempo and time signature events of a tempo map.
+
+    Event times are converted to ticks if the MIDI file takes its times in ticks.
+
+    Args:
+        midi (MIDIFile): The MIDI file object (the events go to its tempo track).
+        tempo_map (TempoMap): The planned tempo map.
+        track (int): Track to add the events to.
+    """
+    ppq = midi.ticks_per_quarternote if midi.eventtime_is_ticks else None
+    for time, signature in tempo_map.time_signatures:
+        beats_per_bar, beat_unit = parse_time_signature(signature)
+        # The metronome clicks once per pulse: a dotted beat in compound metres (e.g. 6/8, 9/8, 12/8)
+        compound = beat_unit >= 8 and beats_per_bar % 3 == 0 and beats_per_bar > 3
+        clocks_per_click = 96 // beat_unit * (3 if compound else 1)
+        midi.addTimeSignature(track, round(time * ppq) if ppq else time, beats_per_bar,
+                              beat_unit.bit_length() - 1, clocks_per_click)
+    for time, bpm in tempo_map.tempo_events:
+        midi.addTempo(track, round(time * ppq) if ppq else time, bpm)
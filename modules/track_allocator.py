@@ -0,0 +1,150 @@
+'''
+Track Allocator Module for MIDI Song Generator Application
+
+This module decides which track, port, channel and program every part of a song uses.
+It includes functions for:-
+                - mapping instrument names to General MIDI programs through INSTRUMENT_MAP
+                - assigning musical roles (melody, harmony, rhythm, bass, ...) to instruments
+                - allocating channels with the drum channel reserved
+                - spreading more than 15 melodic voices over several MIDI ports
+                - writing all track setup events in one batch before any notes
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+from modules.config_registry import get_config
+from midiutil.MidiFile import GenericEvent, writeVarLength
+from collections import namedtuple
+import struct
+import logging
+
+DRUM_CHANNEL = 9  # General MIDI percussion channel
+MELODIC_CHANNELS = tuple(channel for channel in range(16) if channel != DRUM_CHANNEL)
+MELODIC_ROLES = ("melody", "harmony", "rhythm", "bass")  # Filled in this order; extra instruments layer the harmony
+
+# Where one part of the song is written and how it sounds
+TrackAssignment = namedtuple("TrackAssignment", ["track", "port", "channel", "program", "instrument", "role"])
+
+# MIDI Port meta event (FF 21), which midiutil does not provide
+class MidiPortEvent(GenericEvent):
+    evtname = "MidiPort"
+    sec_sort_order = 0
+
+    def __init__(self, tick, port, insertion_order=0):
+        self.port = port
+        super(MidiPortEvent, self).__init__(tick, insertion_order)
+
+    def serialize(self, previous_event_tick):
+        """Return the event as Standard MIDI File bytes."""
+        delta = bytes(writeVarLength(self.tick - previous_event_tick))
+        return delta + struct.pack(">BBBB", 0xFF, 0x21, 0x01, self.port)
+
+# 1. Instrument Program
+def get_program(instrument, config=None):
+    """
+    Look up the General MIDI program of an instrument.
+
+    Args:
+        instrument (str): The instrument name.
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
+
+    Returns:
+        int: The program number (0-127); unknown instruments fall back to 0 (Piano).
+    """
+    instrument_map = (config or get_config()).instrument_map
+    if instrument not in instrument_map:
+        logging.warning(f"Unknown instrument '{instrument}'. Using program 0 (Piano).")
+    return instrument_map.get(instrument, 0)
+
+# 2. Assign Roles
+def assign_roles(instruments):
+    """
+    Pair each melodic instrument with a musical role.
+
+    The first instrument whose name contains "Bass" plays the bass line; the others fill
+    melody, harmony, rhythm and bass in order, and any further instruments layer the harmony.
+
+    Args:
+        instruments (list): Melodic instrument names.
+
+    Returns:
+        list: (instrument, role) pairs in the original instrument order.
+    """
+    roles = [None] * len(instruments)
+    for index, instrument in enumerate(instruments):
+        if "Bass" in instrument:
+            roles[index] = "bass"
+            break
+
+    free_roles = [role for role in MELODIC_ROLES if role not in roles]
+    for index in range(len(instruments)):
+        if roles[index] is None:
+            roles[index] = free_roles.pop(0) if free_roles else "harmony"
+    return list(zip(instruments, roles))
+
+# 3. Allocate Tracks
+def allocate_tracks(instruments, enable_countermelody=False, enable_percussion=True, config=None):
+    """
+    Allocate a track, port, channel and program for every part of the song.
+
+    Channel 9 is reserved for percussion. Each port offers the remaining 15 channels,
+    so the 16th melodic voice moves to port 1, and so on.
+
+    Args:
+        instruments (list): The chosen instrument names.
+        enable_countermelody (bool): Add a countermelody track.
+        enable_percussion (bool): Add a percussion track on the drum channel.
+        config (ConfigSnapshot): Configuration to use; defaults to the current snapshot.
+
+    Returns:
+        list: TrackAssignment tuples, one per track, in track order.
+    """
+    config = config or get_config()
+    melodic = [name for name in instruments if name not in config.drum_instruments]
+    drums = [name for name in instruments if name in config.drum_instruments]
+    if drums and not enable_percussion:
+        logging.info(f"Percussion disabled; ignoring drum instruments {drums}.")
+
+    parts = assign_roles(melodic)
+    if enable_countermelody:
+        melody_instrument = next((name for name, role in parts if role == "melody"), "Piano")
+        parts.append((melody_instrument, "countermelody"))
+
+    assignments = []
+    for voice, (instrument, role) in enumerate(parts):
+        port, channel_index = divmod(voice, len(MELODIC_CHANNELS))
+        assignments.append(TrackAssignment(len(assignments), port, MELODIC_CHANNELS[channel_index],
+                                           get_program(instrument, config), instrument, role))
+    if enable_percussion:
+        assignments.append(TrackAssignment(len(assignments), 0, DRUM_CHANNEL, 0,
+                                           drums[0] if drums else "Drums", "percussion"))
+
+    logging.debug(f"Allocated tracks: {assignments}")
+    return assignments
+
+# 4. Write Setup Events
+def add_track_setup(midi, assignments, time=0):
+    """
+    Write the track name, port and program change of every track in one batch.
+
+    Args:
+        midi (MIDIFile): The MIDI file object.
+        assignments (list): TrackAssignment tuples from allocate_tracks.
+        time (float): Time of the setup events.
+    """
+    multi_port = any(assignment.port for assignment in assignments)
+    for assignment in assignments:
+        midi.addTrackName(assignment.track, time, f"{assignment.instrument} ({assignment.role})")
+        if multi_port:
+            track_index = assignment.track + 1 if midi.header.numeric_format == 1 else assignment.track
+            midi.tracks[track_index].eventList.append(
+                MidiPortEvent(midi.time_to_ticks(time), assignment.port, insertion_order=midi.event_counter))
+            midi.event_counter += 1
+        if assignment.channel != DRUM_CHANNEL:
+            midi.addProgramChange(assignment.track, assignment.channel, time, assignment.program)
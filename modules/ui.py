@@ -7,18 +7,31 @@ if project_root not in sys.path:
     sys.path.insert(0, project_root)
 
 # Import necessary modules
-from modules.midi_generator import create_midi
-from modules.configuration import GENRE_DEFAULTS, GENRE_SECTIONS, SONG_SECTIONS, KEYS, SCALES
-from modules.configuration import load_default_sections
+from modules.midi_generator import create_midi, compose_song
+from modules.preview import SongPreview
+from modules.configuration import KEYS, SCALES
+from modules.config_registry import get_config
 
 from PyQt5.QtCore import Qt
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QGroupBox,
-    QPushButton, QSlider, QComboBox, QCheckBox, QListWidget, QMessageBox, QWidget, QSpinBox
+    QPushButton, QSlider, QComboBox, QCheckBox, QListWidget, QListWidgetItem, QMessageBox, QWidget, QSpinBox
 )
-from pygame import mixer
+import io
 import logging
 
+_mixer = None  # pygame.mixer, imported and initialised by the first preview
+
+def get_mixer():
+    """Import and initialise pygame's mixer on first use, so the window opens without the audio stack."""
+    global _mixer
+    if _mixer is None:
+        from pygame import mixer
+        mixer.init()
+        _mixer = mixer
+        logging.info("Pygame mixer initialized successfully.")
+    return _mixer
+
 ''' GRAPHIC USER INTERFACE '''
 
 # This class creates the GUI for the MIDI song generator application.
@@ -33,13 +46,15 @@ class MidiGeneratorApp(QMainWindow):
         # Initialise attributes
         self.main_layout = QVBoxLayout(self.central_widget)
         self.instrument_comboboxes = []  # list for instrument comboboxes
+        self.preview = None  # SongPreview of the last previewed settings
+        self.preview_settings = None
         self.setup_ui()
 
     def setup_ui(self):
         """Set up the user interface."""
         # Initialize genre_combobox
         self.genre_combobox = QComboBox()
-        self.genre_combobox.addItems(list(GENRE_DEFAULTS.keys()))  # Populate genres dynamically
+        self.genre_combobox.addItems(list(get_config().genre_defaults.keys()))  # Populate genres dynamically
         logging.info(f"Genre combobox initialized with items: {self.genre_combobox.count()} genres")
 
         # File Settings Group
@@ -88,7 +103,7 @@ class MidiGeneratorApp(QMainWindow):
 
         # Initialise genre combobox with default genres
         self.genre_combobox = QComboBox()
-        self.genre_combobox.addItems(list(GENRE_DEFAULTS.keys()))  # Populate genres dynamically
+        self.genre_combobox.addItems(list(get_config().genre_defaults.keys()))  # Populate genres dynamically
         genre_layout.addWidget(self.genre_combobox)
 
         # connect signal for genre selection
@@ -162,6 +177,19 @@ class MidiGeneratorApp(QMainWindow):
         button_layout.addWidget(self.preview_button)
         self.main_layout.addLayout(button_layout)
 
+        ''' Preview Seek Controls '''
+        seek_layout = QHBoxLayout()
+        seek_layout.addWidget(QLabel("Preview From:"))
+        self.preview_section_combobox = QComboBox()
+        self.preview_section_combobox.setToolTip("Jump to a section of the preview.")
+        self.preview_section_combobox.activated.connect(self.seek_preview)
+        seek_layout.addWidget(self.preview_section_combobox)
+        self.loop_section_checkbox = QCheckBox("Loop Section")
+        self.loop_section_checkbox.setToolTip("Repeat the selected section instead of playing on.")
+        self.loop_section_checkbox.stateChanged.connect(self.seek_preview)
+        seek_layout.addWidget(self.loop_section_checkbox)
+        self.main_layout.addLayout(seek_layout)
+
         ''' Add Reset Button '''
         reset_button = QPushButton("Reset")
         reset_button.clicked.connect(self.reset_ui)
@@ -193,7 +221,7 @@ class MidiGeneratorApp(QMainWindow):
 
         # Get the selected genre
         selected_genre = self.genre_combobox.currentText()
-        default_instruments = GENRE_DEFAULTS.get(selected_genre, {}).get("instruments", [])
+        default_instruments = list(get_config().genre_defaults.get(selected_genre, {}).get("instruments", []))
 
         # Add comboboxes for the default instruments
         for instrument in default_instruments:
@@ -212,17 +240,15 @@ class MidiGeneratorApp(QMainWindow):
         selected_genre = self.genre_combobox.currentText()
         logging.info(f"Updating sections for genre: {selected_genre}")
     
-        # Load default sections for the selected genre
-        load_default_sections(selected_genre)
-    
-        # Log the contents of SONG_SECTIONS for debugging
-        logging.info(f"SONG_SECTIONS after loading: {SONG_SECTIONS}")
+        # Load default sections for the selected genre (from the current configuration, including plug-ins)
+        default_sections = get_config().genre_sections.get(selected_genre, [])
+        logging.info(f"Loaded sections for genre '{selected_genre}': {default_sections}")
     
         # Populate the section list with default sections
-        for section in SONG_SECTIONS:
+        for section in default_sections:
             try:
                 section_name, length = section[:2]  # Unpack only the first two elements
-                self.section_list.addItem(f"{section_name}: {length} bars")
+                self.add_section_item(section_name, length)
             except ValueError:
                 logging.error(f"Invalid section format: {section}")
                 continue
@@ -236,7 +262,7 @@ class MidiGeneratorApp(QMainWindow):
     def update_section_dropdown(self):
         """Update the section name dropdown based on the selected genre."""
         selected_genre = self.genre_combobox.currentText()
-        sections = GENRE_SECTIONS.get(selected_genre, [])
+        sections = get_config().genre_sections.get(selected_genre, [])
         self.section_name_dropdown.clear()
         self.section_name_dropdown.addItems([name for name, _ in sections])
 
@@ -245,7 +271,17 @@ class MidiGeneratorApp(QMainWindow):
         section_name = self.section_name_dropdown.currentText()
         section_length = self.section_length_input.value()
         if section_name:
-            self.section_list.addItem(f"{section_name}: {section_length} bars")
+            self.add_section_item(section_name, section_length)
+
+    def add_section_item(self, section_name, length):
+        """Add a section to the list, keeping the (name, bars) pair alongside its label."""
+        item = QListWidgetItem(f"{section_name}: {length} bars")
+        item.setData(Qt.UserRole, (section_name, length))
+        self.section_list.addItem(item)
+
+    def get_sections(self):
+        """Return the (name, bars) pairs of the section list."""
+        return [self.section_list.item(i).data(Qt.UserRole) for i in range(self.section_list.count())]
 
     def update_genre_data(self):
         """Update scale, key, sections, and instruments based on the selected genre."""
@@ -268,7 +304,7 @@ class MidiGeneratorApp(QMainWindow):
     
     def update_scale_and_key(self, genre):
         """Update the scale and key dropdowns based on the selected genre."""
-        genre_defaults = GENRE_DEFAULTS.get(genre, {})
+        genre_defaults = get_config().genre_defaults.get(genre, {})
         default_scale = genre_defaults.get("scale", "Major")
         default_key = genre_defaults.get("key", "C")
     
@@ -294,16 +330,7 @@ class MidiGeneratorApp(QMainWindow):
         instruments = [combobox.currentText() for combobox in self.instrument_comboboxes]
 
         # Get sections from the section list
-        sections = []
-        for i in range(self.section_list.count()):
-            section_item = self.section_list.item(i).text()  # Properly retrieve the section item
-            try:
-                section_name, length = section_item.split(":")
-                sections.append((section_name.strip(), int(length.split()[0])))
-            except ValueError:
-                QMessageBox.warning(self, "Warning", f"Invalid section format: {section_item}")
-                logging.warning(f"Generate failed: Invalid section format: {section_item}")
-                return
+        sections = self.get_sections()
 
         # Validate inputs
         if not instruments:
@@ -339,13 +366,13 @@ class MidiGeneratorApp(QMainWindow):
             logging.error(f"Failed to generate MIDI file: {e}")
 
     def preview_midi(self):
-        """Preview the generated MIDI file."""
-        file_name = "preview.mid"
-
+        """Preview the song; it is composed once per set of settings and cached for seeking."""
         # Ensure mixer is initialized
-        if not mixer.get_init():
-            QMessageBox.critical(self, "Error", "Audio mixer is not initialized.")
-            logging.error("Audio mixer is not initialized.")
+        try:
+            mixer = get_mixer()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Audio mixer could not be initialized: {e}")
+            logging.error(f"Audio mixer could not be initialized: {e}")
             return
 
         # Stop playback if already playing
@@ -362,16 +389,7 @@ class MidiGeneratorApp(QMainWindow):
         instruments = [combobox.currentText() for combobox in self.instrument_comboboxes]
 
         # Get sections from the section list
-        sections = []
-        for i in range(self.section_list.count()):
-            section_item = self.section_list.item(i).text()  # Properly retrieve the section item
-            try:
-                section_name, length = section_item.split(":")
-                sections.append((section_name.strip(), int(length.split()[0])))
-            except ValueError:
-                QMessageBox.warning(self, "Warning", f"Invalid section format: {section_item}")
-                logging.warning(f"Preview failed: Invalid section format: {section_item}")
-                return
+        sections = self.get_sections()
 
         # Validate inputs
         if not instruments:
@@ -387,28 +405,46 @@ class MidiGeneratorApp(QMainWindow):
         scale = self.scale_combobox.currentText()
         key = self.key_combobox.currentText()
 
+        settings = (bpm, time_signature, scale, key, genre, tuple(instruments), tuple(sections))
         try:
-            logging.info("Generating MIDI file for preview...")
-            # Call create_midi with all required arguments
-            create_midi(
-                file_name=file_name,
-                bpm=bpm,
-                time_signature=time_signature,
-                scale=scale,
-                key=key,
-                genre=genre,
-                instruments=instruments,
-                sections=sections
-            )
-            logging.info(f"MIDI file written to {file_name}")
-
-            # Play the generated MIDI file
-            mixer.music.load(file_name)
-            mixer.music.play()
-            self.preview_button.setText("Stop Preview")
-            logging.info("MIDI preview started.")
+            # Compose the song only when the settings changed since the last preview
+            if settings != self.preview_settings:
+                logging.info("Composing song for preview...")
+                self.preview = SongPreview(compose_song(bpm, time_signature, scale, key, genre, instruments, sections))
+                self.preview_settings = settings
+                self.preview_section_combobox.clear()
+                self.preview_section_combobox.addItems(
+                    [f"{section.name} ({section.start_seconds:.1f}s)" for section in self.preview.sections])
+
+            self.play_preview_region(max(0, self.preview_section_combobox.currentIndex()))
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to preview MIDI file: {e}")
             logging.error(f"Failed to preview MIDI file: {e}")
 
+    def play_preview_region(self, section_index):
+        """Play the cached preview from a section, or loop that section."""
+        loop = self.loop_section_checkbox.isChecked()
+        data = self.preview.render_region(section_index, section_index if loop else None)
+        mixer = get_mixer()
+        mixer.music.load(io.BytesIO(data), "mid")
+        mixer.music.play(loops=-1 if loop else 0)
+        self.preview_button.setText("Stop Preview")
+        section = self.preview.sections[section_index]
+        logging.info(f"MIDI preview started at section '{section.name}' ({section.start_seconds:.1f}s, loop={loop}).")
+
+    def seek_preview(self):
+        """Jump to the selected section if a preview is playing."""
+        if self.preview is None or _mixer is None or not _mixer.music.get_busy():
+            return
+        try:
+            self.play_preview_region(max(0, self.preview_section_combobox.currentIndex()))
+        except Exception as e:
+            logging.error(f"Failed to seek preview: {e}")
+
+    def stop_preview(self):
+        """Stop the preview playback."""
+        get_mixer().music.stop()
+        self.preview_button.setText("Preview MIDI")
+        logging.info("MIDI preview stopped.")
+
     ''' END OF UI.PY SCRIPT '''
@@ -0,0 +1,106 @@
+'''
+Startup Benchmark for MIDI Song Generator Application
+
+This script measures how long the application takes to open its main window. It includes functions for:-
+                - launching the packaged executable (or the source script) repeatedly
+                - timing each launch from process start to exit
+                - reporting the bundle size of a packaged build
+
+The application quits as soon as its main window is shown when the environment variable
+MIDI_GENERATOR_EXIT_AFTER_STARTUP is set to 1, so each run measures the cold launch only.
+The first run is usually slower (disk cache); compare the median between builds.
+
+Examples:
+    python scripts/benchmark_startup.py                      # dist/MIDISongGenerator/MIDISongGenerator
+    python scripts/benchmark_startup.py --source             # python MIDISongGenerator.py
+    python scripts/benchmark_startup.py --runs 20 --offscreen
+
+'''
+
+import sys
+import os
+# Add the project root directory to sys.path (troubleshooting whilst experiencing execution problems)
+project_root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if project_root not in sys.path:
+    sys.path.insert(0, project_root)
+
+import argparse
+import statistics
+import subprocess
+import time
+
+DIST_DIR = os.path.join(project_root, "dist", "MIDISongGenerator")
+EXECUTABLE_NAME = "MIDISongGenerator.exe" if os.name == "nt" else "MIDISongGenerator"
+SOURCE_SCRIPT = os.path.join(project_root, "MIDISongGenerator.py")
+
+# 1. Bundle Size
+def get_bundle_size(directory):
+    """
+    Return the total size of the files in a directory tree.
+
+    Args:
+        directory (str): The directory.
+
+    Returns:
+        tuple: (total size in bytes, number of files)
+    """
+    total, count = 0, 0
+    for folder, _, file_names in os.walk(directory):
+        for file_name in file_names:
+            total += os.path.getsize(os.path.join(folder, file_name))
+            count += 1
+    return total, count
+
+# 2. Time Launches
+def time_launches(command, runs, offscreen=False, timeout=60):
+    """
+    Launch the application repeatedly and time each run until it exits.
+
+    Args:
+        command (list): The command to run.
+        runs (int): Number of launches.
+        offscreen (bool): Use Qt's offscreen platform (for machines without a display).
+        timeout (float): Seconds before a launch is considered hung.
+
+    Returns:
+        list: The launch times in seconds.
+    """
+    env = dict(os.environ, MIDI_GENERATOR_EXIT_AFTER_STARTUP="1")
+    if offscreen:
+        env["QT_QPA_PLATFORM"] = "offscreen"
+
+    timings = []
+    for run in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run(command, env=env, cwd=project_root, timeout=timeout,
+                                   stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        elapsed = time.perf_counter() - start
+        if completed.returncode != 0:
+            raise RuntimeError(f"Launch {run + 1} failed ({completed.returncode}): "
+                               f"{completed.stderr.decode(errors='replace').strip()}")
+        timings.append(elapsed)
+    return timings
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure the cold-launch time of the MIDI Song Generator.")
+    parser.add_argument("--runs", type=int, default=10, help="Number of launches (default 10).")
+    parser.add_argument("--source", action="store_true", help="Run MIDISongGenerator.py instead of the build.")
+    parser.add_argument("--executable", help="Path to a packaged executable (default: the onedir build in dist/).")
+    parser.add_argument("--offscreen", action="store_true", help="Use Qt's offscreen platform.")
+    args = parser.parse_args()
+
+    if args.source:
+        command = [sys.executable, SOURCE_SCRIPT]
+    else:
+        command = [args.executable or os.path.join(DIST_DIR, EXECUTABLE_NAME)]
+        if not os.path.exists(command[0]):
+            sys.exit(f"{command[0]} not found. Build it first with: pyinstaller MIDISongGenerator.spec")
+        size, count = get_bundle_size(os.path.dirname(os.path.abspath(command[0])))
+        print(f"Bundle: {size / (1024 * 1024):.1f} MB in {count} files")
+
+    timings = time_launches(command, args.runs, args.offscreen)
+    print(f"Launches: {len(timings)}")
+    print(f"First:  {timings[0] * 1000:.0f} ms")
+    print(f"Median: {statistics.median(timings) * 1000:.0f} ms")
+    print(f"Min:    {min(timings) * 1000:.0f} ms")
+    print(f"Max:    {max(timings) * 1000:.0f} ms")